@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Follows the calibration of a structure evaluation by evaluation. The trace
+of the best objective function so far shows how fast an algorithm
+converges, so the algorithms can be compared by the runs they need.
+
+If the best value did not improve for a given amount of evaluations, the
+calibration counts as stalled and the rest of its budget is skipped: the
+model returns failed runs without simulating (see
+LumpedModelCMF.simulation). This works with every algorithm of spotpy, no
+matter if it checks for a stop itself. Failed and skipped runs hand the
+algorithms the worst objective function instead of NaN, which they can not
+rank.
+
+The algorithms with a population or chains need a minimal budget, which
+depends on the amount of parameters. sample_options checks the budget and
+sizes their settings to it, as their defaults need more runs than a
+structure usually gets.
+"""
+import numpy as np
+
+# Algorithms of spotpy that minimize the objective function. The model
+# hands them the negative objective function.
+MINIMIZING = ["sceua"]
+
+# Algorithms of spotpy that draw every parameter set from the prior. The
+# structures simulated without spotpy (by a scheduler, in batches or with
+# the emulator) always get a latin hypercube sample, which equals these.
+SAMPLING = ["lhs", "mc"]
+
+
+def minimum_repetitions(algorithm, parameters):
+    """
+    Smallest budget an algorithm of spotpy works with.
+
+    :param algorithm: name of the algorithm (see lookup.get_algorithm)
+    :param parameters: amount of parameters of the structure
+    :return: amount of simulations
+    """
+    if algorithm == "sceua":
+        # Two complexes of 2 * parameters + 1 points, the initial population
+        # takes at most half of the budget
+        return 4 * (2 * parameters + 1)
+    elif algorithm == "dream":
+        # Ten generations of the seven chains DREAM needs at least
+        # (2 * delta + 1)
+        return 7 * 10
+    elif algorithm == "demcz":
+        # The seed of the three chains spans the parameter space, followed
+        # by ten generations
+        return 3 * (max(int(np.ceil(2 * parameters / 3)), 2) + 10)
+    elif algorithm == "fast":
+        # Every parameter needs more than 4 * M ** 2 runs with M = 4
+        return 65 * parameters
+    return 1
+
+
+def sample_options(algorithm, repetitions, parameters):
+    """
+    Checks the budget of an algorithm and sizes its settings to it.
+
+    :param algorithm: name of the algorithm (see lookup.get_algorithm)
+    :param repetitions: amount of simulations
+    :param parameters: amount of parameters of the structure
+    :raises ValueError: if the budget is smaller than minimum_repetitions
+    :return: dictionary with the keyword arguments of sample
+    """
+    minimum = minimum_repetitions(algorithm, parameters)
+    if repetitions < minimum:
+        raise ValueError("{} needs at least {} repetitions with {} "
+                         "parameters, not {}".format(algorithm, minimum,
+                                                     parameters,
+                                                     repetitions))
+    if algorithm == "sceua":
+        return {"ngs": min(20, repetitions // (2 * (2 * parameters + 1)))}
+    elif algorithm == "dream":
+        return {"runs_after_convergence": min(100, repetitions // 10)}
+    elif algorithm == "demcz":
+        # The burn in counts the generations of the three chains
+        return {"burnIn": min(100, repetitions // (2 * 3))}
+    return {}
+
+
+def sampler_objective(like, minimize):
+    """
+    Converts an objective function to the one handed to an algorithm.
+    Failed and skipped runs (NaN) become the worst value.
+
+    :param like: objective function, higher is better
+    :param minimize: the algorithm minimizes
+    :return: objective function for the algorithm
+    """
+    if np.isnan(like):
+        like = -np.inf
+    if minimize:
+        return -like
+    return like
+
+
+class ConvergenceTrace:
+    def __init__(self, stall_evaluations=None, min_improvement=0.0):
+        """
+        :param stall_evaluations: stop after this many evaluations without
+        improvement. None uses the whole budget.
+        :param min_improvement: smaller improvements do not count
+        """
+        self.stall_evaluations = stall_evaluations
+        self.min_improvement = min_improvement
+        # Objective function of every evaluation and the best one so far
+        self.objectives = []
+        self.best = []
+        # Amount of evaluations at the last improvement
+        self.last_improvement = 0
+        self.stopped = False
+
+    def record(self, objective):
+        """
+        Adds the objective function of an evaluation. Ignored after the
+        calibration stopped.
+
+        :param objective: objective function, NaN for a failed run
+        :return: None
+        """
+        if self.stopped:
+            return
+        previous = self.best[-1] if self.best else -np.inf
+        self.objectives.append(objective)
+        if objective > previous + self.min_improvement:
+            self.last_improvement = len(self.objectives)
+        self.best.append(max(previous, objective)
+                         if not np.isnan(objective) else previous)
+        if (self.stall_evaluations is not None and
+                len(self.objectives) - self.last_improvement >=
+                self.stall_evaluations):
+            self.stopped = True
+
+    def best_objective(self):
+        """
+        Returns the best objective function so far, NaN if no run
+        succeeded.
+        """
+        if not self.best or np.isinf(self.best[-1]):
+            return np.nan
+        return self.best[-1]
+
+    def summary(self):
+        """
+        Describes the calibration.
+
+        :return: dictionary with the amount of evaluations, the best
+        objective function, if it stalled and the trace of the best
+        objective function so far
+        """
+        return {"evaluations": len(self.objectives),
+                "best": self.best_objective(),
+                "stopped": self.stopped,
+                "trace": list(self.best)}
@@ -13,12 +13,28 @@ connection to the outlet.
 import acme.cmf_model_generators.lumped_CMF_model_template as template
 import acme.genetics.genetic as genetic
 import datetime
+import hashlib
 import random
 import os
 import copy
-import spotpy
 import time
+import numpy as np
 import acme.cmf_model_generators.genome_arrange as genome_arrange
+import acme.cmf_model_generators.solver_settings as solver_settings
+import acme.cmf_model_generators.numpy_emulator as numpy_emulator
+import acme.cmf_model_generators.search_state as search_state
+import acme.cmf_model_generators.lookup as lookup
+import acme.cmf_model_generators.weather_stations_cmf as weather_stations
+import acme.cmf_model_generators.calibration as calibration
+from acme.cmf_model_generators.timeout_policy import TimeoutPolicy
+from acme.cmf_model_generators.fidelity import FidelityLevels
+from acme.scheduler import Scheduler
+from acme.file_queue import FileScheduler
+
+# Setup of the worker processes of the scheduler, see init_worker. The key
+# is the name of the SearchState, so the setups of several searches in one
+# process stay apart.
+_worker_setup = {}
 
 
 class LumpedCMFGenerator:
@@ -50,10 +66,6 @@ class LumpedCMFGenerator:
               river_params)
     gene_set = storages + connections + params
 
-    # Dictionary to save all models that have been tested so far. The key is
-    # the genes in the model and the value the best objective function value.
-    models_so_far = {}
-
     def __init__(self, begin_calibration,
                  end_calibration,
                  begin_validation,
@@ -71,7 +83,36 @@ class LumpedCMFGenerator:
                  pool_size=10,
                  max_seconds=None,
                  search_iterations=1,
-                 obj_func_increment=0.1
+                 obj_func_increment=0.1,
+                 algorithm="lhs",
+                 repetitions=10,
+                 stall_evaluations=None,
+                 validation_top_k=None,
+                 prune=False,
+                 prune_threshold=None,
+                 timeout=60,
+                 watchdog=False,
+                 solver_tier="final",
+                 auto_select_solver=False,
+                 collect_statistics=False,
+                 cost_penalty=0.0,
+                 et_method=None,
+                 spin_up=False,
+                 stream_objective=False,
+                 batch_cells=None,
+                 batch_threads=None,
+                 emulator_samples=None,
+                 workers=1,
+                 adaptive_timeout=False,
+                 fidelity_years=None,
+                 isolate=False,
+                 recycle_after=None,
+                 max_worker_memory=None,
+                 fork_server=True,
+                 mpi=False,
+                 queue_directory=None,
+                 output_directory=None,
+                 log_file=None
                  ):
         """
         Sets everything up, ready to be solved.
@@ -91,6 +132,94 @@ class LumpedCMFGenerator:
         :param max_seconds:
         :param search_iterations:
         :param obj_func_increment:
+        :param algorithm: Name of the spotpy algorithm that calibrates every
+        structure (see lookup.get_algorithm). Structures evaluated by a
+        scheduler, in batches, with the emulator or on fidelity levels
+        always get a latin hypercube sample, so only "lhs" and "mc" can be
+        combined with these options.
+        :param repetitions: Amount of simulations per structure. Has to be
+        at least calibration.minimum_repetitions of the algorithm for the
+        structure with the most parameters.
+        :param stall_evaluations: Stop the calibration of a structure after
+        this many simulations without improvement (see calibration). None
+        uses all repetitions.
+        :param validation_top_k: If given, the models are only simulated
+        for the calibration period during the search. Afterwards the best
+        validation_top_k parameter sets of every structure are run for the
+        whole period to determine the validation performance.
+        :param prune: Stop simulations as soon as they cannot beat the best
+        run of their structure anymore.
+        :param prune_threshold: Fixed lower bound of the objective function
+        below which simulations are stopped.
+        :param timeout: Maximal time in seconds for a single simulation
+        :param watchdog: Run the simulations in a watched worker process,
+        which is replaced when a simulation exceeds the timeout.
+        :param solver_tier: Tier of the solver settings used during the
+        search (see solver_settings.TIERS). The validation pass always uses
+        the "final" tier.
+        :param auto_select_solver: Determine the fastest solver settings for
+        every set of storages with short trial runs of its first structure.
+        The tolerance of the solver is taken from solver_tier.
+        :param collect_statistics: Collect the integrator statistics and
+        wall times of all simulations and aggregate them per structure.
+        :param cost_penalty: Subtracted from the objective function for
+        every second of wall time a structure needs (on average) per
+        simulated year. Needs collect_statistics.
+        :param et_method: Calculate the potential evapotranspiration once
+        with this method (see lookup.get_evapotranspiration) instead of in
+        every solver step.
+        :param spin_up: Start every simulation at begin_calibration with
+        the storage volumes of a spin up, which runs once per structure
+        with the median parameters.
+        :param stream_objective: Update the objective function with every
+        solver step instead of keeping the simulated series, so a run needs
+        the same memory for any length of the record.
+        :param batch_cells: If given, the parameter sets of a structure are
+        solved in batches of this size, each batch as one CMF project with
+        one cell per parameter set. Structures with snow are simulated one
+        parameter set after the other, as the snow threshold of CMF is the
+        same for all cells.
+        :param batch_threads: Amount of OpenMP threads CMF uses for a
+        batch. None shares the cores between the workers.
+        :param emulator_samples: If given, this many parameter sets of
+        every structure are screened with the numpy emulator first. Only
+        the best of them are then simulated with CMF.
+        :param workers: Amount of worker processes. They are split between
+        structures evaluated at the same time and the parameter sets of a
+        single structure, see scheduler.split_workers. The initial pool and
+        then the children of every generation (one per parent of the pool)
+        are evaluated at once. Automatic solver selection is not done with
+        several workers.
+        :param adaptive_timeout: Derive the timeout of every structure from
+        the runtimes observed so far (see timeout_policy). timeout is then
+        only used until the first runtimes are known.
+        :param fidelity_years: List of amounts of calibration years, e.g.
+        [1, 3]. New structures are screened on windows of this many years
+        first and only promoted to the whole calibration period if they
+        look promising (see fidelity). Only used for structures evaluated
+        in this process. The time saved by every level is written to
+        acme_fidelity_*.csv.
+        :param isolate: Run the simulations in supervised worker processes
+        even with a single worker. A crashing or hanging worker then only
+        fails its structure instead of the whole search.
+        :param recycle_after: Replace a worker process after this many jobs
+        :param max_worker_memory: Replace a worker process when its memory
+        exceeds this many bytes
+        :param fork_server: Fork the worker processes from a server process,
+        which has the model template and its dependencies imported and the
+        data loaded, so replacing a worker takes milliseconds.
+        :param mpi: Distribute the search over MPI ranks (see mpi_scheduler).
+        Rank 0 runs the genetic engine, all other ranks evaluate the
+        structures. Every rank has to run the same script, e.g. with
+        mpirun -n 4. workers is then ignored. Requires mpi4py.
+        :param queue_directory: Distribute the search over worker processes
+        on any node with access to this shared directory (see file_queue).
+        The workers are started separately with acme-worker <directory>,
+        workers is the amount of them expected.
+        :param output_directory: Directory the result files are written to.
+        None uses the current working directory.
+        :param log_file: File the progress of the search is appended to.
+        None prints it.
         """
 
         # Calibration/Validation stuff
@@ -111,6 +240,14 @@ class LumpedCMFGenerator:
             "t_max": t_max
         }
 
+        # Everything learned during the search, separate for every generator
+        self.state = search_state.SearchState(
+            output_directory or "",
+            name=search_name(output_directory or "", self.data,
+                             begin_calibration, end_calibration,
+                             begin_validation, end_validation))
+        self.log_file = log_file
+
         # Arguments for genetics behaviour
         self.max_age = max_age
         self.pool_size = pool_size
@@ -118,33 +255,184 @@ class LumpedCMFGenerator:
         self.obj_func_increment = obj_func_increment
         self.max_seconds = max_seconds
 
-    def solve(self):
+        # Calibration behaviour, an unknown algorithm raises a NameError
+        lookup.get_algorithm(algorithm)
+        calibration.sample_options(algorithm, repetitions, len(
+            template.LumpedModelCMF.create_params_from_genes(self.gene_set)))
+        if algorithm not in calibration.SAMPLING and (
+                workers > 1 or isolate or mpi or
+                queue_directory is not None or batch_cells is not None or
+                emulator_samples is not None or fidelity_years):
+            raise ValueError("The structures evaluated by a scheduler, in "
+                             "batches, with the emulator or on fidelity "
+                             "levels get a latin hypercube sample, {} can "
+                             "not be used".format(algorithm))
+        self.algorithm = algorithm
+        self.repetitions = repetitions
+        self.stall_evaluations = stall_evaluations
+
+        # Validation behaviour
+        self.validation_top_k = validation_top_k
+
+        # Options handed over to every model template
+        self.template_options = {"prune": prune,
+                                 "prune_threshold": prune_threshold,
+                                 "timeout": timeout,
+                                 "watchdog": watchdog,
+                                 "solver_settings":
+                                     solver_settings.get_solver_settings(
+                                         solver_tier),
+                                 "collect_statistics": collect_statistics,
+                                 "et_method": et_method,
+                                 "spin_up": spin_up,
+                                 "stream_objective": stream_objective}
+        self.cost_penalty = cost_penalty
+        self.auto_select_solver = auto_select_solver
+        self.solver_tier = solver_tier
+        self.batch_cells = batch_cells
+        if batch_threads is None:
+            batch_threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+        self.batch_threads = batch_threads
+        self.emulator_samples = emulator_samples
+        self.workers = workers
+        self.isolate = isolate
+        self.recycle_after = recycle_after
+        self.max_worker_memory = max_worker_memory
+        self.fork_server = fork_server
+        self.mpi = mpi
+        self.queue_directory = queue_directory
+        self.timeout_policy = None
+        if adaptive_timeout:
+            self.timeout_policy = TimeoutPolicy(default=timeout)
+        self.fidelity = None
+        if fidelity_years:
+            self.fidelity = FidelityLevels.from_years(
+                prec, begin_calibration, end_calibration, fidelity_years)
+
+    def worker_setup(self):
+        """
+        Returns the arguments of init_worker for this search.
+
+        :return: tuple of the arguments
+        """
+        return (self.state.name, self.data,
+                self.begin_calibration, self.end_calibration,
+                self.begin_validation, self.end_validation,
+                self.validation_top_k is not None, self.template_options,
+                self.batch_cells, self.batch_threads)
+
+    def create_scheduler(self):
+        """
+        Creates the scheduler chosen by the options of this search.
+
+        :return: MPIScheduler, FileScheduler, Scheduler or None if
+        everything runs in this process
+        """
+        initargs = self.worker_setup()
+        if self.mpi:
+            # Only imported here, as mpi4py is optional
+            from acme.mpi_scheduler import MPIScheduler
+            return MPIScheduler(initializer=init_worker, initargs=initargs)
+        if self.queue_directory is not None:
+            return FileScheduler(self.queue_directory, self.workers,
+                                 initializer=init_worker, initargs=initargs)
+        if self.workers > 1 or self.isolate:
+            return Scheduler(self.workers, initializer=init_worker,
+                             initargs=initargs,
+                             isolate=self.isolate,
+                             max_jobs=self.recycle_after,
+                             max_rss=self.max_worker_memory,
+                             fork_server=self.fork_server,
+                             preload=[template.__name__])
+        return None
+
+    def solve(self, scheduler=None):
         """
         Starts the process of model selection.
         Calls the genetic file with all needed information.
 
+        :param scheduler: Scheduler shared with other searches (see
+        multi_catchment). Its workers have to be set up with
+        init_workers, including the worker_setup of this search. It is not
+        closed at the end. None creates the scheduler of this search.
         :return: None, but writes the best found model to a file
         """
+        if (scheduler is not None and
+                self.algorithm not in calibration.SAMPLING):
+            raise ValueError("The structures evaluated by a scheduler get "
+                             "a latin hypercube sample, {} can not be "
+                             "used".format(self.algorithm))
         # Make the needed variables available for the helper functions.
         data = self.data
+        state = self.state
+        if self.log_file is not None:
+            state.log = open(self.log_file, "a")
         # Calibration/Validation stuff
         begin_calibration = self.begin_calibration
         end_calibration = self.end_calibration
         begin_validation = self.begin_validation
         end_validation = self.end_validation
+        top_k = self.validation_top_k
+        template_options = self.template_options
+        solver_tier = self.solver_tier if self.auto_select_solver else None
+        cost_penalty = self.cost_penalty
+        batch_cells = self.batch_cells
+        batch_threads = self.batch_threads
+        emulator_samples = self.emulator_samples
+        timeout_policy = self.timeout_policy
+        fidelity = self.fidelity
+
+        shared_scheduler = scheduler is not None
+        if not shared_scheduler:
+            scheduler = self.create_scheduler()
+            if self.mpi and not scheduler.is_master:
+                # The other ranks only evaluate, until rank 0 is done
+                scheduler.serve()
+                return
+        initial_pool = []
 
         # Helper functions used as interface to genetic.
 
         def fn_create():
+            if initial_pool:
+                return initial_pool.pop()
             return create()
 
         def fn_display(candidate):
-            display(candidate, start_time)
+            display(candidate, start_time, state.log)
 
         def fn_get_fitness(genes):
             return get_fitness(genes, data,
                                begin_calibration, end_calibration,
-                               begin_validation, end_validation)
+                               begin_validation, end_validation,
+                               calibrate_only=top_k is not None,
+                               top_k=top_k,
+                               template_options=template_options,
+                               solver_tier=solver_tier,
+                               cost_penalty=cost_penalty,
+                               batch_cells=batch_cells,
+                               batch_threads=batch_threads,
+                               emulator_samples=emulator_samples,
+                               scheduler=scheduler,
+                               timeout_policy=timeout_policy,
+                               state=state, fidelity=fidelity,
+                               algorithm=self.algorithm,
+                               repetitions=self.repetitions,
+                               stall_evaluations=self.stall_evaluations)
+
+        def fn_get_fitnesses(genes_list):
+            # The children of a generation are evaluated together, so the
+            # workers are split between all of them
+            evaluate_structures(state, genes_list, scheduler, data,
+                                begin_calibration, end_calibration,
+                                begin_validation, end_validation,
+                                top_k=top_k, cost_penalty=cost_penalty,
+                                emulator_samples=emulator_samples,
+                                et_method=template_options["et_method"],
+                                repetitions=self.repetitions,
+                                timeout_policy=timeout_policy,
+                                timeout=template_options["timeout"])
+            return [fn_get_fitness(genes) for genes in genes_list]
 
         def fn_mutate(genes):
             mutate(genes, fn_get_fitness)
@@ -152,43 +440,142 @@ class LumpedCMFGenerator:
         def fn_crossover(parent, donor):
             return crossover(parent, donor)
 
-        # Save the starting time
-        start_time = datetime.datetime.now()
-
-        # Give all definitions to the get_best function of genetic to start
-        # the whole process of evolutionary selection
-        best = genetic.get_best(fn_get_fitness, None, self.optimal_fitness,
-                                None, fn_display, fn_mutate, fn_create,
-                                max_age=self.max_age,
-                                pool_size=self.pool_size,
-                                crossover=fn_crossover,
-                                max_seconds=self.max_seconds)
-
-        # At this place it might be handy to nest the while loop into a
-        # for loop. The for loop starts with a value for the objective
-        # function below the desired one and the gives the while loop some
-        # time to find best model. If this is accomplished a new run is
-        # started with a bit higher value of the objective function. This is
-        #  repeated until the algorithm is no longer able to find a model
-        # which satisfies the condition.
-
-        # Something like
-        if self.search_iterations > 1:
-            for iteration in range(self.search_iterations):
-                pass
-
-        else:
-            # Run the process until the desired fitness value is reached.
-            while not self.optimal_fitness > best.fitness:
-                pass
+        # The scheduler of this search is closed even if the search fails,
+        # so its workers (or the other MPI ranks) do not wait forever
+        try:
+            # With several workers the initial pool is created beforehand,
+            # so all its structures can be evaluated at the same time
+            if scheduler is not None:
+                initial_pool = [create() for _ in range(self.pool_size)]
+                evaluate_structures(state, initial_pool, scheduler, data,
+                                    begin_calibration, end_calibration,
+                                    begin_validation, end_validation,
+                                    top_k=top_k, cost_penalty=cost_penalty,
+                                    emulator_samples=emulator_samples,
+                                    et_method=template_options["et_method"],
+                                    repetitions=self.repetitions,
+                                    timeout_policy=timeout_policy,
+                                    timeout=template_options["timeout"])
+
+            # Save the starting time
+            start_time = datetime.datetime.now()
+
+            # Give all definitions to the get_best function of genetic to
+            # start the whole process of evolutionary selection
+            best = genetic.get_best(fn_get_fitness, None,
+                                    self.optimal_fitness, None, fn_display,
+                                    fn_mutate, fn_create,
+                                    max_age=self.max_age,
+                                    pool_size=self.pool_size,
+                                    crossover=fn_crossover,
+                                    max_seconds=self.max_seconds,
+                                    get_fitnesses=(fn_get_fitnesses
+                                                   if scheduler is not None
+                                                   else None))
+
+            # At this place it might be handy to nest the while loop into a
+            # for loop. The for loop starts with a value for the objective
+            # function below the desired one and the gives the while loop
+            # some time to find best model. If this is accomplished a new
+            # run is started with a bit higher value of the objective
+            # function. This is repeated until the algorithm is no longer
+            # able to find a model which satisfies the condition.
+
+            # Something like
+            if self.search_iterations > 1:
+                for iteration in range(self.search_iterations):
+                    pass
+
+            else:
+                # Run the process until the desired fitness value is
+                # reached.
+                while not self.optimal_fitness > best.fitness:
+                    pass
+
+            if scheduler is not None and not shared_scheduler:
+                write_worker_report(scheduler.report(),
+                                    directory=state.output_directory)
+        finally:
+            if scheduler is not None and not shared_scheduler:
+                scheduler.close()
+        print("Evaluations coalesced with one in flight: {}".format(
+            state.in_flight.coalesced), file=state.log)
+
+        # Run the validation period for the best parameter sets only
+        if top_k is not None:
+            validate_best_models(state, data, begin_calibration,
+                                 end_calibration, begin_validation,
+                                 end_validation,
+                                 et_method=template_options["et_method"],
+                                 spin_up=template_options["spin_up"])
+            write_validation_results(state)
+
+        if template_options["collect_statistics"]:
+            write_structure_costs(state)
+
+        write_runtime_predictions(state)
+
+        if timeout_policy is not None:
+            write_timeouts(state)
+
+        if fidelity is not None:
+            write_fidelity_levels(state, fidelity)
+
+        if state.convergence:
+            write_convergence(state)
 
         # Write the best model to file.
-        write_all_models()
+        write_all_models(state)
+
+        self.clear_caches()
+        if state.log is not None:
+            state.log.close()
+            state.log = None
+
+    def clear_caches(self):
+        """
+        Removes the spin ups, the forcing and the worker setup of this
+        search from the caches of this process, which are kept for the
+        lifetime of the process otherwise.
+
+        :return: None
+        """
+        template.clear_spin_up_cache(self.data)
+        weather_stations.clear_forcing_cache(self.data)
+        _worker_setup.pop(self.state.name, None)
+
+
+def search_name(output_directory, data, begin_calibration, end_calibration,
+                begin_validation, end_validation):
+    """
+    Derives the name of a search from its output directory, data and
+    windows. Every MPI rank builds its own generator, so a random name
+    would differ between the ranks and the workers would not find the
+    setup the jobs of rank 0 refer to.
+
+    :param output_directory: directory of the result files
+    :param data: dictionary of the forcing and discharge timeseries
+    :return: name of the search
+    """
+    hasher = hashlib.sha1(output_directory.encode())
+    for date in [begin_calibration, end_calibration, begin_validation,
+                 end_validation]:
+        hasher.update(str(date).encode())
+    for key in sorted(data):
+        hasher.update(key.encode())
+        hasher.update(str(getattr(data[key], "begin", "")).encode())
+        hasher.update(np.asarray(data[key], dtype=float).tobytes())
+    return hasher.hexdigest()
 
 
 def get_fitness(genes, data,
                 begin_calibration, end_calibration,
-                begin_validation, end_validation):
+                begin_validation, end_validation,
+                calibrate_only=False, top_k=None, template_options=None,
+                solver_tier=None, cost_penalty=0.0, batch_cells=None,
+                batch_threads=None, emulator_samples=None, scheduler=None,
+                timeout_policy=None, state=None, fidelity=None,
+                algorithm="lhs", repetitions=10, stall_evaluations=None):
     """
         Calculates the fitness of a given genotype.
 
@@ -198,53 +585,216 @@ def get_fitness(genes, data,
     :param end_calibration:
     :param begin_validation:
     :param end_validation:
+    :param calibrate_only: Only simulate until the end of the calibration
+    :param top_k: Amount of best parameter sets, which are saved for the
+    validation pass
+    :param template_options: Dictionary of further keyword arguments for
+    the model template
+    :param solver_tier: If given, the fastest solver settings for the
+    structure are determined with the tolerance of this tier.
+    :param cost_penalty: Subtracted from the objective function per second
+    of wall time per simulated year (only with collect_statistics)
+    :param batch_cells: If given, the parameter sets are solved in batches
+    of this size in one CMF project
+    :param batch_threads: Amount of threads CMF uses for a batch
+    :param emulator_samples: If given, this many parameter sets are
+    screened with the numpy emulator and the best of them are simulated
+    with CMF
+    :param scheduler: If given, the parameter sets are split between the
+    worker processes of this scheduler
+    :param timeout_policy: If given, the timeout of the simulations is
+    taken from this TimeoutPolicy and the runtimes are added to it
+    :param state: SearchState the results are saved in and known structures
+    are looked up in. If None, a new one is used.
+    :param fidelity: If given, new structures are screened on the reduced
+    levels of this FidelityLevels first. Structures that are not promoted
+    get their predicted fitness and are marked in
+    state.screened_structures. Not used with a scheduler.
+    :param algorithm: Name of the spotpy algorithm that calibrates the
+    structure. Only used without scheduler, batches and emulator and not
+    on the fidelity levels, which all simulate a latin hypercube sample.
+    :param repetitions: Amount of simulations of the structure
+    :param stall_evaluations: Stop the calibration after this many
+    simulations without improvement
     :return: Fitness value
     """
-    def find_effective_structure():
-        # Check if the model to be generated is able to connect to an output
-        genome_arrange.check_for_connection(genes,
-                                            LumpedCMFGenerator.connections)
+    if state is None:
+        state = search_state.SearchState()
 
-        # Find the effective structure of the current genes
-        effective_structure = genome_arrange.find_active_genes(
-            genes,
-            LumpedCMFGenerator.storages)
-        return effective_structure
+    def find_effective_structure():
+        return effective_structure(genes)
 
     def compare_to_old_models(effective_structure):
-        # Compare if the genes the function gets, have already been calculated
-        #  as a model
-        for old_model in LumpedCMFGenerator.models_so_far.keys():
-            # Find the effective structure
-            # Turn model in list version
-            old_model_genes = old_model.split()
-            # Find out if the model has already been calculated. If so, simply
-            # return the fitness value of the old model
-            if set(old_model_genes) == set(genes):
-                return LumpedCMFGenerator.models_so_far[old_model]
-            if set(old_model_genes) == set(effective_structure):
-                return LumpedCMFGenerator.models_so_far[old_model]
+        fitness = known_fitness(state, genes, effective_structure)
+        if fitness is None and fidelity is not None:
+            fitness = fidelity.screened_fitness(
+                structure_key(effective_structure))
+        return fitness
+
+    def select_solver(effective_structure):
+        # The stiffness of a structure depends mostly on its storages, so
+        # the trials are only run for the first structure of every set of
+        # storages
+        storages = " ".join(sorted(gene for gene in effective_structure
+                                   if gene in LumpedCMFGenerator.storages))
+        if storages not in state.solver_choices:
+            # Time the different solver settings on a separate model, so
+            # the one used for the calibration starts fresh
+            trial_model = template.LumpedModelCMF(effective_structure, data,
+                                                  begin_calibration,
+                                                  end_calibration,
+                                                  begin_validation,
+                                                  end_validation,
+                                                  preallocate=True)
+            state.solver_choices[storages] = solver_settings.select_solver(
+                trial_model, solver_tier)
+            trial_model.close()
+        return state.solver_choices[storages]
 
     def run_model(effective_structure):
+        if scheduler is not None:
+            evaluate_structures(state, [genes], scheduler, data,
+                                begin_calibration, end_calibration,
+                                begin_validation, end_validation,
+                                top_k=top_k, cost_penalty=cost_penalty,
+                                emulator_samples=emulator_samples,
+                                et_method=(template_options or {}).get(
+                                    "et_method"),
+                                repetitions=repetitions,
+                                timeout_policy=timeout_policy,
+                                timeout=(template_options or {}).get(
+                                    "timeout"))
+            return known_fitness(state, genes, effective_structure)
+        options = dict(template_options or {})
+        if timeout_policy is not None:
+            options["timeout"] = timeout_policy.timeout(effective_structure)
+        if solver_tier is not None:
+            options["solver_settings"] = select_solver(effective_structure)
+        if batch_cells is not None or emulator_samples is not None:
+            return run_parameter_sets(effective_structure, options)
         # If not call the template and run the model
         current_model = template.LumpedModelCMF(effective_structure, data,
                                                 begin_calibration,
                                                 end_calibration,
                                                 begin_validation,
-                                                end_validation)
+                                                end_validation,
+                                                preallocate=True,
+                                                calibrate_only=calibrate_only,
+                                                **options)
         # Find out if the model should run parallel (for supercomputer)
         parallel = 'mpi' if 'OMPI_COMM_WORLD_SIZE' in os.environ else 'seq'
-        # Connect the model to the dream algorithm.
-        sampler = spotpy.algorithms.lhs(current_model, parallel=parallel,
-                                        dbformat="noData")
-        sampler.sample(10)
-        # Extract the best value from the model
-        best_like = sampler.bestlike
-        # Save the current model in the all models list
-        model_key = " ".join(genes)
-        LumpedCMFGenerator.models_so_far[model_key] = best_like
-        # Return best_like
-        return best_like
+        current_model.trace = calibration.ConvergenceTrace(stall_evaluations)
+        current_model.minimize = algorithm in calibration.MINIMIZING
+        # Connect the model to the algorithm. The results are only kept in
+        # memory, when the best parameter sets are needed later.
+        algorithm_class = lookup.get_algorithm(algorithm)
+        if top_k is None:
+            sampler = algorithm_class(current_model, parallel=parallel,
+                                      dbformat="noData")
+        else:
+            sampler = algorithm_class(current_model, parallel=parallel,
+                                      dbformat="ram", save_sim=False)
+        sampler.sample(repetitions, **calibration.sample_options(
+            algorithm, repetitions, len(current_model.params)))
+        current_model.close()
+        results = None
+        if top_k is not None:
+            results = np.array(sampler.getdata())
+            if current_model.minimize:
+                results["like1"] = -results["like1"]
+        # The best value is taken from the trace, as the algorithms store
+        # it differently
+        best_like = current_model.trace.best_objective()
+        return save_results(current_model, best_like, results)
+
+    def run_parameter_sets(effective_structure, options):
+        # Simulate the parameter sets without spotpy, either in batches
+        # or as best guesses of the emulator
+        current_model = create_model(effective_structure, data,
+                                     begin_calibration, end_calibration,
+                                     begin_validation, end_validation,
+                                     calibrate_only, options,
+                                     batch_cells, batch_threads)
+        current_model.trace = calibration.ConvergenceTrace(stall_evaluations)
+        vectors = draw_parameter_sets(effective_structure, data,
+                                      begin_calibration, end_calibration,
+                                      begin_validation, end_validation,
+                                      emulator_samples,
+                                      options.get("et_method"),
+                                      repetitions)
+        results = evaluate_parameter_sets(current_model, vectors)
+        current_model.close()
+        return save_results(current_model, None, results)
+
+    def save_results(current_model, best_like, results):
+        pruning = None
+        if current_model.prune:
+            pruning = {"pruned_runs": current_model.pruned_runs,
+                       "days_saved": current_model.days_saved}
+        run_statistics = None
+        if current_model.collect_statistics:
+            run_statistics = current_model.run_statistics
+        timeout = None
+        if timeout_policy is not None:
+            timeout = current_model.timeout
+            timeout_policy.record(current_model.genes,
+                                  current_model.run_times)
+        return store_fitness(state, genes, results, best_like=best_like,
+                             run_statistics=run_statistics,
+                             timeouts=current_model.timeouts,
+                             pruning=pruning, top_k=top_k,
+                             cost_penalty=cost_penalty, timeout=timeout,
+                             convergence=current_model.trace.summary())
+
+    def screen(structure):
+        # Evaluate the structure on the reduced levels first. Returns the
+        # predicted fitness if it is not promoted to the whole period, which
+        # is also saved in the results.
+        key = structure_key(structure)
+        options = dict(template_options or {})
+        for level, (first, last) in enumerate(fidelity.windows):
+            start_time = time.time()
+            current_model = template.LumpedModelCMF(structure, data,
+                                                    first, last,
+                                                    begin_validation,
+                                                    end_validation,
+                                                    preallocate=True,
+                                                    calibrate_only=True,
+                                                    **options)
+            vectors = draw_parameter_sets(structure, data, first, last,
+                                          begin_validation, end_validation,
+                                          emulator_samples,
+                                          options.get("et_method"),
+                                          repetitions)
+            likes = evaluate_parameter_sets(current_model, vectors)["like1"]
+            current_model.close()
+            objective = (np.nanmax(likes) if not np.isnan(likes).all()
+                         else -np.inf)
+            if not fidelity.promote(key, level, objective,
+                                    time.time() - start_time):
+                fitness = fidelity.screened_fitness(key)
+                state.models_so_far[" ".join(genes)] = fitness
+                state.screened_structures[" ".join(genes)] = level
+                return fitness
+        return None
+
+    def evaluate(structure):
+        # Checked again, as the structure might have been finished since
+        old_best_like = compare_to_old_models(structure)
+        if old_best_like is not None:
+            return old_best_like
+        if fidelity is not None:
+            screened = screen(structure)
+            if screened is not None:
+                return screened
+        predicted = expected_cost(state, structure)
+        start_time = time.time()
+        fitness = run_model(structure)
+        seconds = time.time() - start_time
+        record_runtime(state, genes, structure, predicted, seconds)
+        if fidelity is not None:
+            fidelity.record(structure_key(structure), fitness, seconds)
+        return fitness
 
     structure = find_effective_structure()
     old_best_like = compare_to_old_models(structure)
@@ -253,16 +803,607 @@ def get_fitness(genes, data,
     # fitness.
     if old_best_like is not None:
         return old_best_like
-    else:
+    elif scheduler is not None:
+        # evaluate_structures coalesces the evaluations itself and the
+        # scheduler records the runtimes of its workers
         return run_model(structure)
+    else:
+        return state.in_flight.do(structure_key(structure),
+                                  lambda: evaluate(structure))
+
+
+def structure_key(structure):
+    """
+    Key of an effective structure, which does not depend on the order of
+    its genes.
+
+    :param structure: list of genes
+    :return: string of the sorted genes
+    """
+    return " ".join(sorted(set(structure)))
+
+
+def effective_structure(genes):
+    """
+    Makes sure the genes are connected to the outlet and returns their
+    effective structure.
+
+    :param genes: genotype, a connection to the outlet is added if needed
+    :return: list of the active genes
+    """
+    # Check if the model to be generated is able to connect to an output
+    genome_arrange.check_for_connection(genes,
+                                        LumpedCMFGenerator.connections)
+
+    # Find the effective structure of the current genes
+    return genome_arrange.find_active_genes(genes,
+                                            LumpedCMFGenerator.storages)
+
+
+def known_fitness(state, genes, structure):
+    """
+    Looks up the fitness of genes that have already been calculated.
+
+    :param state: SearchState
+    :param genes: genotype
+    :param structure: effective structure of the genes
+    :return: the fitness or None if the genes are new
+    """
+    # Compare if the genes the function gets, have already been calculated
+    #  as a model
+    for old_model in state.models_so_far.keys():
+        # Find the effective structure
+        # Turn model in list version
+        old_model_genes = old_model.split()
+        # Find out if the model has already been calculated. If so, simply
+        # return the fitness value of the old model
+        if set(old_model_genes) == set(genes):
+            return state.models_so_far[old_model]
+        if set(old_model_genes) == set(structure):
+            return state.models_so_far[old_model]
+
+
+def store_fitness(state, genes, results, best_like=None, run_statistics=None,
+                  timeouts=0, pruning=None, top_k=None, cost_penalty=0.0,
+                  timeout=None, convergence=None):
+    """
+    Saves the results of a structure in the SearchState and returns its
+    fitness.
+
+    :param state: SearchState
+    :param genes: genotype
+    :param results: structured array as returned by sampler.getdata() or
+    None if the sampler did not save its results
+    :param best_like: best objective function value. If None it is taken
+    from results.
+    :param run_statistics: list of the run statistics, if collected
+    :param timeouts: amount of timed out runs
+    :param pruning: dictionary with "pruned_runs" and "days_saved", if
+    pruned
+    :param top_k: amount of best parameter sets saved for the validation
+    :param cost_penalty: Subtracted from the objective function per second
+    of wall time per simulated year
+    :param timeout: timeout of a single simulation, if it was chosen for
+    this structure
+    :param convergence: summary of the ConvergenceTrace of the calibration
+    :return: Fitness value
+    """
+    if best_like is None:
+        likes = results["like1"]
+        best_like = np.nanmax(likes) if not np.isnan(likes).all() else np.nan
+    # Save the current model in the all models list
+    model_key = " ".join(genes)
+    state.models_so_far[model_key] = best_like
+    if run_statistics is not None:
+        costs = summarize_run_statistics(run_statistics, timeouts)
+        costs["objective"] = best_like
+        state.structure_costs[model_key] = costs
+        # Penalise expensive structures
+        if cost_penalty and not np.isnan(costs["seconds_per_year"]):
+            best_like -= cost_penalty * costs["seconds_per_year"]
+            state.models_so_far[model_key] = best_like
+    if pruning is not None:
+        state.pruning_statistics[model_key] = pruning
+    if timeout is not None:
+        state.timeout_statistics[model_key] = {
+            "timeout": timeout, "timeouts": timeouts}
+    if convergence is not None:
+        state.convergence[model_key] = convergence
+    if top_k is not None:
+        state.best_parameter_sets[model_key] = \
+            select_best_parameter_sets(results, top_k)
+    return best_like
+
+
+def create_model(structure, data, begin_calibration, end_calibration,
+                 begin_validation, end_validation, calibrate_only, options,
+                 batch_cells=None, batch_threads=None):
+    """
+    Creates the model template of a structure.
+
+    :return: LumpedModelCMF or BatchedLumpedModelCMF if batch_cells is given
+    and the structure has no snow storage, whose threshold can not differ
+    between the cells of a batch
+    """
+    if batch_cells is None or "snow" in structure:
+        return template.LumpedModelCMF(structure, data,
+                                       begin_calibration, end_calibration,
+                                       begin_validation, end_validation,
+                                       preallocate=True,
+                                       calibrate_only=calibrate_only,
+                                       **options)
+    return template.BatchedLumpedModelCMF(structure, data,
+                                          begin_calibration, end_calibration,
+                                          begin_validation, end_validation,
+                                          cells=batch_cells,
+                                          threads=batch_threads,
+                                          calibrate_only=calibrate_only,
+                                          **options)
+
+
+def draw_parameter_sets(structure, data, begin_calibration, end_calibration,
+                        begin_validation, end_validation,
+                        emulator_samples=None, et_method=None,
+                        repetitions=10):
+    """
+    Draws the parameter sets of a structure, either as latin hypercube or
+    as the best guesses of the emulator.
+
+    :return: array with one parameter vector per row
+    """
+    if emulator_samples is None:
+        params = template.LumpedModelCMF.create_params_from_genes(structure)
+        return latin_hypercube(params, repetitions)
+    return screen_with_emulator(structure, data,
+                                begin_calibration, end_calibration,
+                                begin_validation, end_validation,
+                                emulator_samples, repetitions,
+                                et_method=et_method)
+
+
+def expected_cost(state, structure):
+    """
+    Expected runtime of the evaluation of a structure in seconds.
+
+    :param state: SearchState
+    :param structure: effective structure
+    :return: expected cost
+    """
+    return state.runtime_predictor.predict(structure)
+
+
+def record_runtime(state, genes, structure, predicted, actual):
+    """
+    Saves the predicted and the measured runtime of a structure and
+    improves the runtime model with it.
+
+    :param state: SearchState
+    :param genes: genotype
+    :param structure: effective structure
+    :param predicted: predicted runtime in seconds
+    :param actual: measured runtime in seconds (summed over all workers)
+    :return: None
+    """
+    state.runtime_predictor.record(structure, actual)
+    state.runtime_predictions[" ".join(genes)] = {
+        "predicted": predicted, "actual": actual}
+
 
+def init_workers(setups):
+    """
+    Hands the setups of several searches over to a worker process of a
+    shared scheduler.
+
+    :param setups: list of the arguments of init_worker of every search
+    :return: None
+    """
+    for setup in setups:
+        init_worker(*setup)
+
+
+def init_worker(name, data, begin_calibration, end_calibration,
+                begin_validation, end_validation, calibrate_only,
+                template_options, batch_cells=None, batch_threads=None):
+    """
+    Hands the setup over to a worker process of the scheduler.
+
+    :param name: name of the SearchState of the search
+    :return: None
+    """
+    _worker_setup[name] = {"data": data,
+                           "begin_calibration": begin_calibration,
+                           "end_calibration": end_calibration,
+                           "begin_validation": begin_validation,
+                           "end_validation": end_validation,
+                           "calibrate_only": calibrate_only,
+                           "template_options": template_options,
+                           "batch_cells": batch_cells,
+                           "batch_threads": batch_threads}
+
+
+def evaluate_chunk(job):
+    """
+    Simulates a chunk of the parameter sets of a structure in a worker
+    process.
+
+    :param job: tuple of the name of the SearchState, the effective
+    structure, the parameter vectors and the timeout (None for the timeout
+    of the template options)
+    :return: dictionary with the results, the run statistics, the timeouts,
+    the runtimes and the pruning counters of the chunk
+    """
+    name, structure, vectors, timeout = job
+    start_time = time.time()
+    setup = _worker_setup[name]
+    options = dict(setup["template_options"] or {})
+    if timeout is not None:
+        options["timeout"] = timeout
+    model = create_model(structure, setup["data"],
+                         setup["begin_calibration"], setup["end_calibration"],
+                         setup["begin_validation"], setup["end_validation"],
+                         setup["calibrate_only"], options,
+                         setup["batch_cells"], setup["batch_threads"])
+    results = evaluate_parameter_sets(model, vectors)
+    model.close()
+    return {"results": results,
+            "run_statistics": (model.run_statistics
+                               if model.collect_statistics else None),
+            "timeouts": model.timeouts,
+            "run_times": model.run_times,
+            "pruning": ({"pruned_runs": model.pruned_runs,
+                         "days_saved": model.days_saved}
+                        if model.prune else None),
+            "wall_time": time.time() - start_time}
+
+
+def evaluate_structures(state, genes_list, scheduler, data,
+                        begin_calibration, end_calibration,
+                        begin_validation, end_validation,
+                        top_k=None, cost_penalty=0.0, emulator_samples=None,
+                        et_method=None, repetitions=10, timeout_policy=None,
+                        timeout=None):
+    """
+    Evaluates several genotypes with the workers of a scheduler. The workers
+    are split between the structures and their parameter sets according to
+    the expected cost of the structures and the jobs are handed out longest
+    expected first. Genotypes already calculated are skipped.
+
+    Parameter sets of jobs whose worker crashed or hung count as failed
+    runs. If all jobs of a structure failed, its fitness is -inf.
+
+    Structures requested twice or already evaluated elsewhere (e.g. by
+    another thread) are not evaluated again, but wait for the first
+    evaluation (see SearchState.in_flight).
+
+    :param state: SearchState the results are saved in
+    :param genes_list: list of genotypes
+    :param scheduler: Scheduler
+    :param data: the weather data in the form of a dict of lists
+    :param begin_calibration:
+    :param end_calibration:
+    :param begin_validation:
+    :param end_validation:
+    :param top_k: amount of best parameter sets saved for the validation
+    :param cost_penalty: Subtracted from the objective function per second
+    of wall time per simulated year
+    :param emulator_samples: If given, the parameter sets are the best
+    guesses of the emulator
+    :param et_method: Method of the potential evapotranspiration of the
+    emulator
+    :param repetitions: amount of parameter sets per structure
+    :param timeout_policy: If given, the timeout of the simulations is
+    taken from this TimeoutPolicy and the runtimes are added to it
+    :param timeout: timeout of a single simulation, if there is no
+    timeout_policy. A job exceeding twice the timeout of all its
+    simulations (plus a minute for the setup) counts as hung.
+    :return: None, the results are saved like by get_fitness
+    """
+    in_flight = state.in_flight
+    tasks = []
+    claimed = []
+    waiting = []
+    for genes in genes_list:
+        structure = effective_structure(genes)
+        if known_fitness(state, genes, structure) is not None:
+            continue
+        future, first = in_flight.claim(structure_key(structure))
+        if first:
+            tasks.append((genes, structure))
+            claimed.append((structure_key(structure), future))
+        else:
+            waiting.append(future)
+    try:
+        _evaluate_tasks(state, tasks, scheduler, data, begin_calibration,
+                        end_calibration, begin_validation, end_validation,
+                        top_k, cost_penalty, emulator_samples, et_method,
+                        repetitions, timeout_policy, timeout)
+    except BaseException as error:
+        for key, future in claimed:
+            if not future.done():
+                in_flight.fail(key, error)
+        raise
+    for future in waiting:
+        future.result()
+
+
+def _evaluate_tasks(state, tasks, scheduler, data, begin_calibration,
+                    end_calibration, begin_validation, end_validation,
+                    top_k, cost_penalty, emulator_samples, et_method,
+                    repetitions, timeout_policy, timeout):
+    """
+    Evaluates the new structures claimed by evaluate_structures and resolves
+    their evaluations in flight.
+    """
+    predictions = [expected_cost(state, structure)
+                   for genes, structure in tasks]
+    shares = scheduler.plan(predictions, max_share=repetitions)
+    timeouts = [None] * len(tasks)
+    if timeout_policy is not None:
+        timeouts = [timeout_policy.timeout(structure)
+                    for genes, structure in tasks]
+    jobs = []
+    costs = []
+    owners = []
+    job_timeouts = []
+    for index, ((genes, structure), share) in enumerate(zip(tasks, shares)):
+        vectors = draw_parameter_sets(structure, data,
+                                      begin_calibration, end_calibration,
+                                      begin_validation, end_validation,
+                                      emulator_samples, et_method,
+                                      repetitions)
+        for chunk in np.array_split(vectors, share):
+            jobs.append((state.name, structure, chunk, timeouts[index]))
+            run_timeout = (timeout if timeouts[index] is None
+                           else timeouts[index])
+            job_timeouts.append(None if run_timeout is None else
+                                2 * run_timeout * len(chunk) + 60)
+            costs.append(predictions[index] * len(chunk) / len(vectors))
+            owners.append(index)
+    outputs = scheduler.map(evaluate_chunk, jobs, costs, job_timeouts)
+
+    for index, (genes, structure) in enumerate(tasks):
+        chunks = []
+        failed = 0
+        for job, owner, output in zip(jobs, owners, outputs):
+            if owner != index:
+                continue
+            if output is None:
+                failed += 1
+                output = failed_chunk(structure, job[2])
+            chunks.append(output)
+        best_like = None
+        if failed:
+            state.failed_structures[" ".join(genes)] = failed
+            if failed == len(chunks):
+                best_like = -np.inf
+        record_runtime(state, genes, structure, predictions[index],
+                       sum(chunk["wall_time"] for chunk in chunks))
+        if timeout_policy is not None:
+            timeout_policy.record(structure, [run_time for chunk in chunks
+                                              for run_time in
+                                              chunk["run_times"]])
+        run_statistics = None
+        if any(chunk["run_statistics"] is not None for chunk in chunks):
+            run_statistics = [statistics for chunk in chunks
+                              for statistics in
+                              chunk["run_statistics"] or []]
+        pruning = None
+        if any(chunk["pruning"] is not None for chunk in chunks):
+            pruning = dict((name, sum(chunk["pruning"][name]
+                                      for chunk in chunks
+                                      if chunk["pruning"] is not None))
+                           for name in ["pruned_runs", "days_saved"])
+        fitness = store_fitness(state, genes,
+                                np.concatenate([chunk["results"]
+                                                for chunk in chunks]),
+                                best_like=best_like,
+                                run_statistics=run_statistics,
+                                timeouts=sum(chunk["timeouts"]
+                                             for chunk in chunks),
+                                pruning=pruning, top_k=top_k,
+                                cost_penalty=cost_penalty,
+                                timeout=timeouts[index])
+        state.in_flight.resolve(structure_key(structure), fitness)
+
+
+def failed_chunk(structure, vectors):
+    """
+    Creates the output of a job whose worker crashed or hung, see
+    evaluate_chunk. All its parameter sets count as failed runs (NaN).
+
+    :param structure: effective structure
+    :param vectors: parameter vectors of the job
+    :return: dictionary like the one returned by evaluate_chunk
+    """
+    params = template.LumpedModelCMF.create_params_from_genes(structure)
+    dtype = [("like1", float)] + [("par" + param.name, float)
+                                  for param in params]
+    results = np.empty(len(vectors), dtype=dtype)
+    results["like1"] = np.nan
+    for i, param in enumerate(params):
+        results["par" + param.name] = vectors[:, i]
+    return {"results": results, "run_statistics": None, "timeouts": 0,
+            "run_times": [], "pruning": None, "wall_time": 0.0}
+
+
+def latin_hypercube(params, repetitions, random_state=None):
+    """
+    Draws a latin hypercube sample of the parameters, like the lhs sampler
+    of spotpy. Every parameter range is split into as many strata as
+    there are repetitions and every stratum is used exactly once.
+
+    :param params: list of spotpy parameters
+    :param repetitions: amount of parameter sets
+    :param random_state: numpy RandomState or None for a new one
+    :return: array with one parameter set per row
+    """
+    if random_state is None:
+        random_state = np.random.RandomState()
+    samples = np.empty((repetitions, len(params)))
+    for i, param in enumerate(params):
+        strata = random_state.permutation(repetitions)
+        position = (strata + random_state.uniform(size=repetitions)) / \
+            repetitions
+        samples[:, i] = (param.minbound +
+                         position * (param.maxbound - param.minbound))
+    return samples
+
+
+def screen_with_emulator(genes, data, begin_calibration, end_calibration,
+                         begin_validation, end_validation, samples, k,
+                         et_method=None):
+    """
+    Screens a latin hypercube sample of the parameters with the numpy
+    emulator over the calibration period.
+
+    :param genes: active genome
+    :param data: the weather data in the form of a dict of lists
+    :param begin_calibration:
+    :param end_calibration:
+    :param begin_validation:
+    :param end_validation:
+    :param samples: amount of screened parameter sets
+    :param k: amount of parameter sets to return
+    :param et_method: Method of the potential evapotranspiration
+    :return: array with the k best parameter vectors, best first
+    """
+    emulator = numpy_emulator.NumpyEmulator(genes, data,
+                                            begin_calibration,
+                                            end_calibration,
+                                            begin_validation,
+                                            end_validation,
+                                            calibrate_only=True,
+                                            et_method=et_method)
+    vectors = latin_hypercube(emulator.params, samples)
+    likes = emulator.objectivefunction(emulator.simulate(vectors))
+    likes = np.where(np.isnan(likes), -np.inf, likes)
+    return vectors[np.argsort(-likes)[:k]]
+
+
+def evaluate_parameter_sets(model, vectors):
+    """
+    Simulates the given parameter vectors. Batched models get them in
+    batches as large as the model has cells.
+
+    :param model: LumpedModelCMF or BatchedLumpedModelCMF
+    :param vectors: array with one parameter vector per row
+    :return: structured array with the fields "like1" and "par<name>", like
+    sampler.getdata() of spotpy
+    """
+    repetitions = len(vectors)
+    evaluation = model.evaluation()
+    likes = np.empty(repetitions)
+    if isinstance(model, template.BatchedLumpedModelCMF):
+        for start in range(0, repetitions, model.cells):
+            if model.trace is not None and model.trace.stopped:
+                # The calibration stalled, the other batches are skipped
+                likes[start:] = np.nan
+                break
+            batch = vectors[start:start + model.cells]
+            likes[start:start + len(batch)] = model.objectivefunction_batch(
+                model.simulation_batch(batch), evaluation)
+    else:
+        for i, vector in enumerate(vectors):
+            likes[i] = model.objectivefunction(model.simulation(vector),
+                                               evaluation)
+    dtype = [("like1", float)] + [("par" + param.name, float)
+                                  for param in model.params]
+    results = np.empty(repetitions, dtype=dtype)
+    results["like1"] = likes
+    for i, param in enumerate(model.params):
+        results["par" + param.name] = vectors[:, i]
+    return results
+
+
+def select_best_parameter_sets(results, k):
+    """
+    Selects the k best parameter sets out of the results of a spotpy sampler.
+
+    :param results: structured array as returned by sampler.getdata()
+    :param k: amount of parameter sets to keep
+    :return: list of (objective function value, parameter dictionary)
+    tuples, best first
+    """
+    likes = np.asarray(results["like1"], dtype=float)
+    # Failed runs (NaN) are sorted to the end
+    likes = np.where(np.isnan(likes), -np.inf, likes)
+    fields = [name for name in results.dtype.names
+              if name.startswith("par")]
+    best_sets = []
+    for index in np.argsort(-likes)[:k]:
+        param_dict = dict((field[3:], float(results[field][index]))
+                          for field in fields)
+        best_sets.append((float(likes[index]), param_dict))
+    return best_sets
+
+
+def validate_best_models(state, data, begin_calibration, end_calibration,
+                         begin_validation, end_validation,
+                         et_method=None, spin_up=False):
+    """
+    Runs the saved best parameter sets of all structures for the whole
+    period and calculates their validation performance. This is only needed
+    when the search itself ran the calibration period only.
+
+    :param state: SearchState with the best parameter sets
+    :param data: the weather data in the form of a dict of lists
+    :param begin_calibration:
+    :param end_calibration:
+    :param begin_validation:
+    :param end_validation:
+    :param et_method: Method of the precalculated potential
+    evapotranspiration, same as during the calibration
+    :param spin_up: Start with the spin up volumes, same as during the
+    calibration
+    :return: None, the results are saved in state.validation_results
+    """
+    for model_key, best_sets in state.best_parameter_sets.items():
+        structure = genome_arrange.find_active_genes(
+            model_key.split(), LumpedCMFGenerator.storages)
+        model = template.LumpedModelCMF(structure, data,
+                                        begin_calibration, end_calibration,
+                                        begin_validation, end_validation,
+                                        preallocate=True,
+                                        et_method=et_method,
+                                        spin_up=spin_up)
+        results = []
+        for like, param_dict in best_sets:
+            vector = [param_dict[param.name] for param in model.params]
+            simulation = model.simulation(vector)
+            results.append((like, model.validation_objective(simulation),
+                            param_dict))
+        state.validation_results[model_key] = results
+
+
+def summarize_run_statistics(run_statistics, timeouts=0):
+    """
+    Aggregates the statistics of all runs of a structure.
+
+    :param run_statistics: list of dictionaries as collected by the template
+    :param timeouts: amount of runs that exceeded the timeout
+    :return: dictionary with the amount of runs and timeouts and the mean
+    of all statistics
+    """
+    summary = {"runs": len(run_statistics), "timeouts": timeouts}
+    keys = ["steps", "rhs_evaluations", "failed_steps",
+            "nonlinear_iterations", "wall_time", "seconds_per_year"]
+    for key in keys:
+        values = np.array([statistics[key] for statistics in run_statistics],
+                          dtype=float)
+        if len(values) == 0 or np.isnan(values).all():
+            summary[key] = np.nan
+        else:
+            summary[key] = float(np.nanmean(values))
+    return summary
 
-def display(candidate, start_time):
+
+def display(candidate, start_time, log=None):
     """
     Display the current candidate and his fitness.
 
     :param candidate: Model/genotype that is to be displayed
     :param start_time: Time when the current program started
+    :param log: open file to write to, None prints
     :return: None
     """
     time_diff = datetime.datetime.now() - start_time
@@ -275,7 +1416,7 @@ def display(candidate, start_time):
            "Time: {}".format(
                             " ".join(map(str, candidate.genes)), activity,
                             candidate.fitness, candidate.Strategy.name,
-                            time_diff)))
+                            time_diff)), file=log, flush=True)
 
 
 def mutate(genes, gene_set):
@@ -437,31 +1578,261 @@ def create(test=False):
     return genes
 
 
-def write_all_models(test=False):
+def write_validation_results(state, test=False):
+    """
+    Writes the results of the validation pass to a file.
+
+    :param state: SearchState
+    :param: test: Determines if the function is called in test mode,
+    which enables the deletion of the file at the end.
+    :return: None
+    """
+    name = os.path.join(state.output_directory,
+                        'acme_validation_' + str(time.time()) + '.csv')
+    outfile = open(name, 'w')
+
+    header = "Calibration" + ", " + "Validation" + ", " + "Genes" + "\n"
+    outfile.write(header)
+
+    for genes, results in state.validation_results.items():
+        genes_copy = genome_arrange.find_active_genes(
+            genes.split(),
+            LumpedCMFGenerator.storages)
+        genes_copy = ", ".join(genes_copy)
+        for calibration_like, validation_like, param_dict in results:
+            line = (str(calibration_like) + ", " + str(validation_like) +
+                    ", " + genes_copy + "\n")
+            outfile.write(line)
+    outfile.close()
+
+    if test:
+        os.remove(name)
+
+
+def write_structure_costs(state, test=False):
+    """
+    Writes the aggregated simulation costs of all structures to a file.
+
+    :param state: SearchState
+    :param: test: Determines if the function is called in test mode,
+    which enables the deletion of the file at the end.
+    :return: None
+    """
+    name = os.path.join(state.output_directory,
+                        'acme_costs_' + str(time.time()) + '.csv')
+    outfile = open(name, 'w')
+
+    keys = ["objective", "runs", "timeouts", "steps", "rhs_evaluations",
+            "failed_steps", "nonlinear_iterations", "wall_time",
+            "seconds_per_year"]
+    header = ", ".join(keys) + ", " + "Genes" + "\n"
+    outfile.write(header)
+
+    for genes, costs in state.structure_costs.items():
+        genes_copy = genome_arrange.find_active_genes(
+            genes.split(),
+            LumpedCMFGenerator.storages)
+        genes_copy = ", ".join(genes_copy)
+        line = (", ".join(str(costs[key]) for key in keys) + ", " +
+                genes_copy + "\n")
+        outfile.write(line)
+    outfile.close()
+
+    if test:
+        os.remove(name)
+
+
+def write_runtime_predictions(state, test=False):
+    """
+    Writes the predicted and the measured runtime of all structures to a
+    file.
+
+    :param state: SearchState
+    :param: test: Determines if the function is called in test mode,
+    which enables the deletion of the file at the end.
+    :return: None
+    """
+    name = os.path.join(state.output_directory,
+                        'acme_runtimes_' + str(time.time()) + '.csv')
+    outfile = open(name, 'w')
+
+    header = "Predicted, Actual, Genes\n"
+    outfile.write(header)
+
+    for genes, runtimes in state.runtime_predictions.items():
+        genes_copy = genome_arrange.find_active_genes(
+            genes.split(),
+            LumpedCMFGenerator.storages)
+        genes_copy = ", ".join(genes_copy)
+        line = (str(runtimes["predicted"]) + ", " +
+                str(runtimes["actual"]) + ", " + genes_copy + "\n")
+        outfile.write(line)
+    outfile.close()
+
+    if test:
+        os.remove(name)
+
+
+def write_timeouts(state, test=False):
+    """
+    Writes the timeout chosen for every structure and the amount of
+    simulations that exceeded it to a file.
+
+    :param state: SearchState
+    :param: test: Determines if the function is called in test mode,
+    which enables the deletion of the file at the end.
+    :return: None
+    """
+    name = os.path.join(state.output_directory,
+                        'acme_timeouts_' + str(time.time()) + '.csv')
+    outfile = open(name, 'w')
+
+    header = "Timeout, Timeouts, Genes\n"
+    outfile.write(header)
+
+    for genes, timeouts in state.timeout_statistics.items():
+        genes_copy = genome_arrange.find_active_genes(
+            genes.split(),
+            LumpedCMFGenerator.storages)
+        genes_copy = ", ".join(genes_copy)
+        line = (str(timeouts["timeout"]) + ", " +
+                str(timeouts["timeouts"]) + ", " + genes_copy + "\n")
+        outfile.write(line)
+    outfile.close()
+
+    if test:
+        os.remove(name)
+
+
+def write_convergence(state, test=False):
+    """
+    Writes the amount of simulations of the calibration of every structure,
+    if it stalled and the best objective function after every simulation to
+    a file.
+
+    :param state: SearchState
+    :param: test: Determines if the function is called in test mode,
+    which enables the deletion of the file at the end.
+    :return: None
+    """
+    name = os.path.join(state.output_directory,
+                        'acme_convergence_' + str(time.time()) + '.csv')
+    outfile = open(name, 'w')
+
+    header = "Evaluations, Stalled, Best, Trace, Genes\n"
+    outfile.write(header)
+
+    for genes, convergence in state.convergence.items():
+        genes_copy = genome_arrange.find_active_genes(
+            genes.split(),
+            LumpedCMFGenerator.storages)
+        genes_copy = ", ".join(genes_copy)
+        trace = " ".join(str(value) for value in convergence["trace"])
+        line = (str(convergence["evaluations"]) + ", " +
+                str(convergence["stopped"]) + ", " +
+                str(convergence["best"]) + ", " + trace + ", " +
+                genes_copy + "\n")
+        outfile.write(line)
+    outfile.close()
+
+    if test:
+        os.remove(name)
+
+
+def write_fidelity_levels(state, fidelity, test=False):
+    """
+    Writes the window of every fidelity level, how many structures were
+    evaluated and stopped on it, its rank correlation to the whole
+    calibration period and its runtime and the seconds it saved compared to
+    the evaluation on the whole period to a file.
+
+    :param state: SearchState
+    :param fidelity: FidelityLevels
+    :param: test: Determines if the function is called in test mode,
+    which enables the deletion of the file at the end.
+    :return: None
+    """
+    name = os.path.join(state.output_directory,
+                        'acme_fidelity_' + str(time.time()) + '.csv')
+    outfile = open(name, 'w')
+
+    header = ("Begin, End, Evaluated, Screened, Correlation, Seconds, "
+              "Full Seconds, Saved Seconds\n")
+    outfile.write(header)
+
+    for level in fidelity.summary():
+        line = (level["begin"].strftime("%Y-%m-%d") + ", " +
+                level["end"].strftime("%Y-%m-%d") + ", " +
+                str(level["evaluated"]) + ", " + str(level["screened"]) +
+                ", " + str(level["correlation"]) + ", " +
+                str(level["seconds"]) + ", " + str(level["full_seconds"]) +
+                ", " + str(level["saved"]) + "\n")
+        outfile.write(line)
+    outfile.close()
+
+    if test:
+        os.remove(name)
+
+
+def write_worker_report(report, test=False, directory=""):
+    """
+    Writes the counters of every worker process to a file.
+
+    :param report: list of dictionaries as returned by Scheduler.report
+    :param: test: Determines if the function is called in test mode,
+    which enables the deletion of the file at the end.
+    :param directory: directory of the file, default is the current working
+    directory
+    :return: None
+    """
+    name = os.path.join(directory,
+                        'acme_workers_' + str(time.time()) + '.csv')
+    outfile = open(name, 'w')
+
+    keys = ["jobs", "failed", "recycled", "timeouts", "crashes", "restarts",
+            "rss", "peak_rss", "startup", "server_startup"]
+    header = "Worker, " + ", ".join(keys) + "\n"
+    outfile.write(header)
+
+    for number, statistics in enumerate(report):
+        line = (str(number) + ", " +
+                ", ".join(str(statistics[key]) for key in keys) + "\n")
+        outfile.write(line)
+    outfile.close()
+
+    if test:
+        os.remove(name)
+
+
+def write_all_models(state, test=False):
     """
-    Writes all the models to a file.
+    Writes all the models to a file. Screened marks the structures whose
+    fitness is the prediction of a reduced fidelity level.
 
+    :param state: SearchState
     :param: test: Determines if the function is called in test mode,
     which enables the deletion of the file at the end.
     :return: None
     """
     # Open the output file
-    name = 'acme_results_' + str(time.time()) + '.csv'
+    name = os.path.join(state.output_directory,
+                        'acme_results_' + str(time.time()) + '.csv')
     outfile = open(name, 'w')
 
     # Make the header
-    header = "Like" + ", " + "Genes" + "\n"
+    header = "Like" + ", " + "Screened" + ", " + "Genes" + "\n"
     outfile.write(header)
 
     # Write the entries
-    for genes, like in LumpedCMFGenerator.models_so_far.items():
+    for genes, like in state.models_so_far.items():
         # Exclude the non active genes before writing it down
         genes_copy = genes.split()
         genes_copy = genome_arrange.find_active_genes(
             genes_copy,
             LumpedCMFGenerator.storages)
         genes_copy = ", ".join(genes_copy)
-        line = str(like) + ", " + genes_copy + "\n"
+        screened = genes in state.screened_structures
+        line = str(like) + ", " + str(screened) + ", " + genes_copy + "\n"
         outfile.write(line)
     outfile.close()
 
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Cheap screening of structures on a part of the calibration period. Every
+fidelity level is a window of consecutive calibration years, whose yearly
+precipitation spans the wettest and driest years as far as possible. The
+years have to be consecutive, as CMF simulates continuously. As the model
+always integrates from the begin of the forcing to the end of a window, the
+earliest window with nearly the largest spread is taken: a late window
+would cost almost as much as the whole period. A window that starts at the
+begin of the calibration also shares the spin up with the whole period.
+
+A new structure is evaluated on the shortest window first. It is only
+promoted to the next, longer window (and finally to the whole calibration
+period) if the objective function on the window predicts a good objective
+function on the whole period. The prediction is a linear fit of the window
+to the whole period objectives of all structures evaluated on both, which
+is only trusted once enough structures were evaluated on both and both rank
+the structures similarly. Until then every structure is promoted.
+
+The runtime of every evaluation on a level and on the whole period is
+recorded, so the summary shows the time the screening actually saved.
+"""
+import datetime
+import numpy as np
+import acme.cmf_model_generators.metrics as metrics
+
+
+def annual_precipitation(precipitation, begin, end):
+    """
+    Sums up the precipitation of every calendar year between begin and end.
+    The first and last year can be incomplete.
+
+    :param precipitation: daily series that can be sliced with dates, e.g.
+    a cmf.timeseries
+    :param begin: first day
+    :param end: last day
+    :return: list of (year, first day, last day, sum) tuples
+    """
+    years = []
+    for year in range(begin.year, end.year + 1):
+        first = max(begin, datetime.datetime(year, 1, 1))
+        last = min(end, datetime.datetime(year, 12, 31))
+        total = np.nansum(np.asarray(
+            precipitation[first:last + datetime.timedelta(days=1)],
+            dtype=float))
+        years.append((year, first, last, total))
+    return years
+
+
+def select_window(precipitation, begin, end, years, min_spread=0.75):
+    """
+    Selects the earliest window of consecutive years of the calibration
+    period whose yearly precipitation differs nearly as much as in the
+    window that differs most. The earliest window is simulated the fastest,
+    as the model integrates from the begin of the forcing.
+
+    :param precipitation: daily series that can be sliced with dates
+    :param begin: begin of the calibration period
+    :param end: end of the calibration period
+    :param years: amount of years in the window
+    :param min_spread: share of the largest spread of the yearly
+    precipitation a window needs to qualify. 1 takes the window with the
+    largest spread.
+    :return: first and last day of the window
+    """
+    totals = annual_precipitation(precipitation, begin, end)
+    if years >= len(totals):
+        return begin, end
+    windows = []
+    for start in range(len(totals) - years + 1):
+        sums = [total for _, _, _, total in totals[start:start + years]]
+        windows.append((max(sums) - min(sums), totals[start][1],
+                        totals[start + years - 1][2]))
+    largest = max(spread for spread, _, _ in windows)
+    for spread, first, last in windows:
+        if spread >= min_spread * largest:
+            return first, last
+
+
+class FidelityLevels:
+    def __init__(self, windows, min_pairs=5, min_correlation=0.7,
+                 promote_quantile=0.5):
+        """
+        :param windows: list of (first day, last day) of the reduced levels,
+        shortest first
+        :param min_pairs: amount of structures evaluated on a level and on
+        the whole period, before the level is used to stop structures
+        :param min_correlation: a level whose rank correlation to the whole
+        period is lower promotes every structure
+        :param promote_quantile: a structure is promoted if its predicted
+        objective function reaches this quantile of the objective functions
+        of the structures evaluated on the whole period
+        """
+        self.windows = list(windows)
+        self.min_pairs = min_pairs
+        self.min_correlation = min_correlation
+        self.promote_quantile = promote_quantile
+        # Objective function of every structure on every level. The key is
+        # the structure key, the value a list with one value per level
+        # reached.
+        self.objectives = {}
+        # Objective function of the structures on the whole period
+        self.full = {}
+        # Structures that were not promoted. The key is the structure key,
+        # the value a tuple of the level and the predicted objective
+        # function.
+        self.screened = {}
+        # Runtimes in seconds of the evaluations on every level (one list
+        # per level) and on the whole period
+        self.seconds = [[] for _ in self.windows]
+        self.full_seconds = []
+
+    @classmethod
+    def from_years(cls, precipitation, begin_calibration, end_calibration,
+                   years, min_spread=0.75, **options):
+        """
+        Creates the levels with windows of the given lengths.
+
+        :param precipitation: daily series that can be sliced with dates
+        :param begin_calibration: begin of the calibration period
+        :param end_calibration: end of the calibration period
+        :param years: list of the amount of years of every level
+        :param min_spread: see select_window
+        :param options: further arguments of FidelityLevels
+        :return: FidelityLevels
+        """
+        windows = [select_window(precipitation, begin_calibration,
+                                 end_calibration, amount, min_spread)
+                   for amount in sorted(years)]
+        return cls(windows, **options)
+
+    def pairs(self, level):
+        """
+        Returns the objective functions of the structures evaluated on the
+        level and on the whole period.
+
+        :return: two arrays, the level objectives and the whole period ones
+        """
+        keys = [key for key in self.full
+                if len(self.objectives.get(key, [])) > level]
+        return (np.array([self.objectives[key][level] for key in keys]),
+                np.array([self.full[key] for key in keys]))
+
+    def correlation(self, level):
+        """
+        Rank correlation of the objective functions of a level and the whole
+        period. NaN if less than two structures are known.
+        """
+        cheap, full = self.pairs(level)
+        valid = np.isfinite(cheap) & np.isfinite(full)
+        if valid.sum() < 2:
+            return np.nan
+        return metrics.rank_correlation(cheap[valid], full[valid])
+
+    def predict(self, level, objective):
+        """
+        Predicts the objective function on the whole period from the one on
+        a level. None as long as the level is not trusted.
+        """
+        cheap, full = self.pairs(level)
+        valid = np.isfinite(cheap) & np.isfinite(full)
+        if (valid.sum() < self.min_pairs or
+                not self.correlation(level) >= self.min_correlation):
+            return None
+        slope, intercept = np.polyfit(cheap[valid], full[valid], 1)
+        return slope * objective + intercept
+
+    def promote(self, key, level, objective, seconds=None):
+        """
+        Saves the objective function of a structure on a level and decides
+        if it is evaluated on the next level.
+
+        :param key: structure key
+        :param level: index of the level
+        :param objective: objective function on the level
+        :param seconds: runtime of the evaluation on the level
+        :return: True if the structure is promoted
+        """
+        self.objectives.setdefault(key, []).append(objective)
+        if seconds is not None:
+            self.seconds[level].append(seconds)
+        predicted = self.predict(level, objective)
+        if predicted is None:
+            return True
+        full = np.array([value for value in self.full.values()
+                         if np.isfinite(value)])
+        if predicted >= np.quantile(full, self.promote_quantile):
+            return True
+        self.screened[key] = (level, predicted)
+        return False
+
+    def record(self, key, objective, seconds=None):
+        """
+        Saves the objective function of a structure on the whole period and
+        the runtime of its evaluation.
+        """
+        self.full[key] = objective
+        if seconds is not None:
+            self.full_seconds.append(seconds)
+
+    def screened_fitness(self, key):
+        """
+        Returns the predicted objective function of a structure that was
+        not promoted, or None.
+        """
+        if key in self.screened:
+            return self.screened[key][1]
+        return None
+
+    def summary(self):
+        """
+        Describes every level.
+
+        :return: list of dictionaries with the window, the amount of
+        structures evaluated on it, the amount stopped on it, the rank
+        correlation to the whole period, the mean runtime of an evaluation on
+        the level and on the whole period and the seconds saved by the
+        level. The saved seconds are the whole period evaluations the level
+        stopped minus the runtime of all evaluations on the level, so they
+        are negative if the level costs more than it saves. Their sum is
+        the time saved by the screening.
+        """
+        full_seconds = (np.mean(self.full_seconds) if self.full_seconds
+                        else np.nan)
+        summary = []
+        for level, (first, last) in enumerate(self.windows):
+            screened = sum(screened_level == level for screened_level, _
+                           in self.screened.values())
+            seconds = self.seconds[level]
+            summary.append({
+                "begin": first, "end": last,
+                "evaluated": sum(len(objectives) > level
+                                 for objectives in self.objectives.values()),
+                "screened": screened,
+                "correlation": self.correlation(level),
+                "seconds": np.mean(seconds) if seconds else np.nan,
+                "full_seconds": full_seconds,
+                "saved": ((screened * full_seconds if screened else 0.0) -
+                          sum(seconds))})
+        return summary
@@ -7,6 +7,8 @@ This delivers back the functions specified by user.
 """
 import spotpy
 import os
+import acme.cmf_model_generators.potential_et as potential_et
+import acme.cmf_model_generators.metrics as metrics
 if os.name == "nt":
     import cmf
 
@@ -52,6 +54,30 @@ def get_obj_func(obj_func):
         return spotpy.objectivefunctions.rsr
     else:
         raise NameError("No such objective function in spotpy")
+
+
+def get_metric(metric):
+    """
+    Returns the vectorized objective function as specified by metric. It is
+    called with (simulations, evaluation) and calculates one value per row
+    of the simulation matrix. The signatures have other arguments and are
+    taken directly from the metrics module.
+
+    :param metric: Name of the objective function
+    :return: function of the metrics module
+    """
+    if metric == "nse":
+        return metrics.nash_sutcliffe
+    elif metric == "log_nse":
+        return metrics.log_nash_sutcliffe
+    elif metric == "kge":
+        return metrics.kling_gupta
+    elif metric == "pbias":
+        return metrics.percent_bias
+    elif metric == "rmse":
+        return metrics.rmse
+    else:
+        raise NameError("No such metric")
     
     
 def get_algorithm(algorithm):
@@ -134,3 +160,24 @@ def get_evapotranspiration(et):
         return cmf.TurcET
     else:
         raise NameError("No such evapotranspiration in CMF")
+
+
+def get_potential_evapotranspiration(et):
+    """
+    Returns the vectorized numpy function for the potential
+    evapotranspiration as specified in "et". The names are the same as in
+    get_evapotranspiration.
+
+    :param et: name of the evapotranspiration method
+    :return: function of potential_et
+    """
+    if et == "Hargreave":
+        return potential_et.hargreave
+    elif et == "PenmanMonteith":
+        return potential_et.penman_monteith
+    elif et == "PriestleyTaylor":
+        return potential_et.priestley_taylor
+    elif et == "Turc":
+        return potential_et.turc
+    else:
+        raise NameError("No such potential evapotranspiration")
@@ -7,19 +7,64 @@ This template is called from the generator to be used as basis for all
 models which are generated during the evolutionary process. Also the class is
 the interface to spotpy.
 """
+import datetime
+import functools
+import os
+import threading
+import time
 import spotpy
 import numpy as np
 import cmf
 import acme.tests.get_storages_fluxes as get_storages_and_fluxes
 import acme.cmf_model_generators.spotpy_interface as spotpy_interface
+import acme.cmf_model_generators.metrics as metrics
+import acme.cmf_model_generators.calibration as calibration
 from acme.exit_after import exit_after
+from acme.watchdog import WatchdogWorker
 import acme.cmf_model_generators.weather_stations_cmf as weather_stations
+import acme.cmf_model_generators.solver_settings as \
+    solver_settings_module
+
+# Initial volumes of the storages at begin_calibration, determined by a spin
+# up with the median parameters. Computed once per structure and catchment
+# in each process. The key is the sorted genes, the id of the data
+# dictionary, begin_calibration, the method of the evapotranspiration and
+# the solver settings, the value the data dictionary (so its id stays
+# unique) and the volumes.
+_spin_up_cache = {}
+
+# CMF keeps the snow threshold and the amount of threads globally for the
+# whole process. Every model therefore applies its own values right before
+# it integrates and holds this lock meanwhile, so models in several threads
+# of one process do not change each other's settings. Models in different
+# worker processes are isolated anyway.
+cmf_lock = threading.RLock()
+# Snow threshold of CMF, used when the genes have no snow parameters
+DEFAULT_SNOW_THRESHOLD = 0.5
+
+
+def clear_spin_up_cache(data):
+    """
+    Removes the spin up volumes of a catchment from the cache of this
+    process, e.g. when its search is done.
+
+    :param data: data dictionary of the catchment
+    :return: None
+    """
+    for key in list(_spin_up_cache):
+        if key[1] == id(data):
+            del _spin_up_cache[key]
 
 
 class LumpedModelCMF(spotpy_interface.SpotpyInterface):
     def __init__(self, genes, data,
                  begin_calibration, end_calibration,
-                 begin_validation, end_validation):
+                 begin_validation, end_validation,
+                 preallocate=False, record_nodes=None,
+                 calibrate_only=False, prune=False, prune_threshold=None,
+                 timeout=60, watchdog=False, solver_settings=None,
+                 collect_statistics=False, et_method=None, spin_up=False,
+                 stream_objective=False):
         """
         Sets up the base model in regard to the genes provided.
 
@@ -29,6 +74,43 @@ class LumpedModelCMF(spotpy_interface.SpotpyInterface):
         :param end_calibration: end date of the calibration period
         :param begin_validation: start date of the validation period
         :param end_validation: end date of the validation period
+        :param preallocate: If True, run_model writes the outlet water
+        balance into a preallocated numpy array instead of a cmf.timeseries
+        :param record_nodes: Names of storages (keys of self.storages) whose
+        water balance is recorded in further columns next to the outlet.
+        Only used when preallocate is True.
+        :param calibrate_only: If True, run_model only simulates until
+        end_calibration. The validation period can be simulated later for
+        the best parameter sets only.
+        :param prune: If True, runs are stopped as soon as their
+        Nash-Sutcliffe efficiency cannot reach the best value so far
+        anymore. Pruned runs return NaN.
+        :param prune_threshold: Fixed lower bound for the Nash-Sutcliffe
+        efficiency, used for pruning even before a best value is known.
+        :param timeout: Maximal time in seconds a single run may take. None
+        disables the timeout.
+        :param watchdog: If True, the runs are done in a separate worker
+        process, which is killed and replaced when a run exceeds the
+        timeout. Otherwise exit_after is used, which only works in the main
+        thread.
+        :param solver_settings: Dictionary of settings for the CVode solver
+        (see solver_settings.TIERS). Default are the settings of the
+        "final" tier.
+        :param collect_statistics: If True, the statistics of the integrator
+        (steps, rhs evaluations, failed steps) and the wall time of every
+        run are collected in run_statistics.
+        :param et_method: If given, the potential evapotranspiration is
+        calculated once per catchment with this method (see
+        lookup.get_evapotranspiration) and given to CMF as a timeseries.
+        Otherwise cmf.HargreaveET calculates it in every solver step.
+        :param spin_up: If True, the storages are filled once per structure
+        by a spin up with the median parameters until begin_calibration.
+        Every run then starts with these volumes at begin_calibration,
+        instead of warming up from the start of the forcing data.
+        :param stream_objective: If True, runs keep no simulated series.
+        The objective functions are updated with every solver step instead
+        (see metrics.StreamingMetrics) and are ready in streamed when the
+        run ends. The runs then return an empty array.
         """
         #super().__init__()
         # Main things
@@ -40,6 +122,60 @@ class LumpedModelCMF(spotpy_interface.SpotpyInterface):
         self.end_calibration = end_calibration
         self.begin_validation = begin_validation
         self.end_validation = end_validation
+        self.calibrate_only = calibrate_only
+
+        # Pruning
+        self.prune = prune
+        self.prune_threshold = prune_threshold
+        self.best_objective = -np.inf
+        self.last_run_pruned = False
+        self.pruned_runs = 0
+        # Simulated days that were not needed due to pruning
+        self.days_saved = 0
+
+        # Calibration. trace is a calibration.ConvergenceTrace, which gets
+        # every objective function value. minimize hands the negative
+        # objective function to algorithms that minimize.
+        self.trace = None
+        self.minimize = False
+
+        # Solver
+        if solver_settings is None:
+            solver_settings = solver_settings_module.get_solver_settings(
+                "final")
+        self.solver_settings = solver_settings
+        self.collect_statistics = collect_statistics
+        self.run_statistics = []
+        self.last_run_statistics = None
+
+        # Timeout
+        self.timeout = timeout
+        self.timeouts = 0
+        # Wall times of all completed runs, needed to adapt the timeouts
+        self.run_times = []
+        self.watchdog = None
+        if watchdog:
+            self.watchdog = WatchdogWorker(functools.partial(
+                create_watchdog_target, genes, data,
+                begin_calibration, end_calibration,
+                begin_validation, end_validation,
+                preallocate=preallocate, record_nodes=record_nodes,
+                calibrate_only=calibrate_only, prune=prune,
+                prune_threshold=prune_threshold,
+                solver_settings=solver_settings,
+                collect_statistics=collect_statistics,
+                et_method=et_method, spin_up=spin_up,
+                stream_objective=stream_objective), timeout)
+
+        # Output collection
+        self.preallocate = preallocate
+        self.record_nodes = record_nodes or []
+        # Filled rows of the output buffer of the last run (preallocate only)
+        self.recorded = None
+        # Accumulated objective functions of the last run (stream_objective
+        # only). None if the run failed or was pruned.
+        self.stream_objective = stream_objective
+        self.streamed = None
 
         # Create params list
         self.params = self.create_params_from_genes(self.genes)
@@ -48,81 +184,110 @@ class LumpedModelCMF(spotpy_interface.SpotpyInterface):
         self.project = None
         self.outlet = None
         self.storages = None
+        self.et_method = et_method
+        # Applied to CMF before every run, see apply_cmf_settings
+        self.snow_threshold = DEFAULT_SNOW_THRESHOLD
 
-        def basic_model_setup():
-            """
-            Creates the basic layout needed for every model structure.
+        # Basic Layout, same for all possible models
+        # The forcing is only prepared once per catchment and process
+        forcing = weather_stations.get_forcing(data, end_validation,
+                                               et_method)
+        self.obs_discharge = data["discharge"]
+        self.build_project(forcing)
+        # The observations the runs are compared to while they run
+        self.observed = self.evaluation() if stream_objective else None
 
-            :return: None
-            """
-            # Basic Layout, same for all possible models
-            prec = data["prec"]
-            obs_discharge = data["discharge"]
-            t_mean = data["t_mean"]
-            t_min = data["t_min"]
-            t_max = data["t_max"]
-            self.obs_discharge = obs_discharge
-
-            # Use only one core (quicker for smaller models)
-            cmf.set_parallel_threads(1)
-
-            # Generate a project with one cell for a lumped model
-            self.project = cmf.project()
-            project = self.project
-
-            # Add one cell, which will include all other parts. The area is set
-            # to 1000 m², so the units are easier to understand
-            cell = project.NewCell(0, 0, 0, 1000)
-
-            # Add a first layer, this one is always present, as a model with no
-            # layers makes no sense
-            first_layer = cell.add_layer(2.0)
-
-            # Add an evapotranspiration
-            cmf.HargreaveET(first_layer, cell.transpiration)
+        # The initial volumes are only needed where the model runs
+        self.spin_up = spin_up
+        self.initial_volumes = None
+        if spin_up and self.watchdog is None:
+            self.initial_volumes = self.get_spin_up_volumes()
 
-            # Create the CMF meteo and rain stations
-            weather_stations.make_stations(self.project, prec, t_mean, t_min,
-                                           t_max)
+    def build_project(self, forcing):
+        """
+        Creates the project with one cell for a lumped model, the weather
+        stations, the outlet and all storages present in the genome.
 
-            # Create an outlet
-            self.outlet = project.NewOutlet("outlet", 10, 0, 0)
+        :param forcing: dictionary of the forcing timeseries
+        :return: None
+        """
+        # Generate a project with one cell for a lumped model
+        self.project = cmf.project()
+        cell = self.create_cell(self.project, forcing)
 
-        basic_model_setup()
+        # Create the CMF meteo and rain stations
+        weather_stations.make_stations(self.project, forcing["prec"],
+                                       forcing["t_mean"], forcing["t_min"],
+                                       forcing["t_max"])
 
-        def create_storages():
-            """
-            Creates all storages that are present in the genome.
+        # Create an outlet
+        self.outlet = self.project.NewOutlet("outlet", 10, 0, 0)
 
-            :return: None
-            """
-            cell = self.project[0]
-            # Make a dictionary to lookup the different storages
-            self.storages = {"first": cell.layers[0], "out": self.outlet}
+        self.storages = self.create_storages(cell, self.outlet)
+        self.river = self.storages["river"]
+        if "snow" in self.storages:
+            self.snow = self.storages["snow"]
+        if "canopy" in self.storages:
+            self.canopy = self.storages["canopy"]
 
-            # Now create all storages which are depended on the genes provided
-            if "snow" in self.genes:
-                self.snow = cell.add_storage("Snow", "S")
-                cmf.Snowfall(cell.snow, cell)
-                self.storages["snow"] = self.snow
+    def create_cell(self, project, forcing, x=0):
+        """
+        Adds a cell with the first layer and the evapotranspiration to the
+        project.
 
-            if "canopy" in self.genes:
-                self.canopy = cell.add_storage("Canopy", "C")
-                self.storages["canopy"] = self.canopy
+        :param project: cmf project
+        :param forcing: dictionary of the forcing timeseries
+        :param x: x position of the cell
+        :return: the new cell
+        """
+        # Add one cell, which will include all other parts. The area is set
+        # to 1000 m², so the units are easier to understand
+        cell = project.NewCell(x, 0, 0, 1000)
+
+        # Add a first layer, this one is always present, as a model with no
+        # layers makes no sense
+        first_layer = cell.add_layer(2.0)
+
+        # Add an evapotranspiration. A precalculated potential
+        # evapotranspiration saves the solver from calculating it in
+        # every step.
+        if self.et_method is None:
+            cmf.HargreaveET(first_layer, cell.transpiration)
+        else:
+            cmf.timeseriesETpot(first_layer, cell.transpiration,
+                                forcing["pet"])
+        return cell
+
+    def create_storages(self, cell, outlet):
+        """
+        Creates all storages that are present in the genome.
 
-            if "second" in self.genes:
-                self.storages["second"] = cell.add_layer(3.0)
+        :param cell: the cell the storages belong to
+        :param outlet: the outlet of the cell
+        :return: dictionary to lookup the storages by their names
+        """
+        # Make a dictionary to lookup the different storages
+        storages = {"first": cell.layers[0], "out": outlet}
+
+        # Now create all storages which are depended on the genes provided
+        if "snow" in self.genes:
+            storages["snow"] = cell.add_storage("Snow", "S")
+            cmf.Snowfall(cell.snow, cell)
+
+        if "canopy" in self.genes:
+            storages["canopy"] = cell.add_storage("Canopy", "C")
 
-            if "third" in self.genes:
-                self.storages["third"] = cell.add_layer(5.0)
+        if "second" in self.genes:
+            storages["second"] = cell.add_layer(3.0)
 
-            # Always create the river, but connect it later with a waterbalance
-            # connection to the outlet if it does not exist in the genes. This
-            # makes an easier connection with the other
-            self.river = cell.add_storage("River", "R")
-            self.storages["river"] = self.river
+        if "third" in self.genes:
+            storages["third"] = cell.add_layer(5.0)
 
-        create_storages()
+        # Always create the river, but connect it later with a waterbalance
+        # connection to the outlet if it does not exist in the genes. This
+        # makes an easier connection with the other
+        storages["river"] = cell.add_storage("River", "R")
+        return storages
 
     @staticmethod
     def create_params_from_genes(genes):
@@ -174,8 +339,19 @@ class LumpedModelCMF(spotpy_interface.SpotpyInterface):
         :return None
         """
         print(param_dict)
-        cell = self.project[0]
-        storages = self.storages
+        self.connect_cell(self.project[0], self.storages, param_dict)
+
+    def connect_cell(self, cell, storages, param_dict, snow_threshold=True):
+        """
+        Creates all connections of one cell.
+
+        :param cell: the cell to connect
+        :param storages: dictionary of the storages of the cell
+        :param param_dict: Dictionary of all the parameters and their values.
+        :param snow_threshold: Set the snow threshold of the model. It is a
+        global value in CMF and therefore the same for all cells.
+        :return: None
+        """
 
         def find_active_connections():
             active_connections = []
@@ -235,8 +411,9 @@ class LumpedModelCMF(spotpy_interface.SpotpyInterface):
                 cmf.SimpleTindexSnowMelt(cell.snow, cell.surfacewater, cell,
                                          rate=param_dict.get("snow_meltrate",
                                                              7))
-                cmf.Weather.set_snow_threshold(param_dict.get("snow_melt_temp",
-                                                              0.5))
+                if snow_threshold:
+                    self.snow_threshold = param_dict.get(
+                        "snow_melt_temp", DEFAULT_SNOW_THRESHOLD)
 
         def create_canopy():
             # Fill in the canopy parameters when they exist
@@ -265,30 +442,265 @@ class LumpedModelCMF(spotpy_interface.SpotpyInterface):
             :return: None
             """
             if "river" not in self.genes:
-                cmf.waterbalance_connection(self.storages["river"],
-                                            self.storages["out"])
+                cmf.waterbalance_connection(storages["river"],
+                                            storages["out"])
 
         create_connections(find_active_connections())
         create_snow()
         create_canopy()
         shortcircuit_river()
 
-    @exit_after(60)
-    def run_model(self, verbose=True):
+    def create_output_buffer(self, end):
+        """
+        Creates the array the results of a run are written to. Every day
+        from begin_calibration to end gets a row. The first column holds the
+        water balance of the outlet, all further columns the water balance
+        of the storages in record_nodes.
+
+        The array is in Fortran order, so every column (especially the
+        outlet) is contiguous in memory.
+
+        :param end: last day of the simulation
+        :return: the buffer and a cmf.node_list of all recorded nodes (None
+        if only the outlet is recorded)
+        """
+        days = (end - self.begin_calibration).days + 1
+        nodes = None
+        if self.record_nodes:
+            nodes = cmf.node_list()
+            nodes.append(self.outlet)
+            for name in self.record_nodes:
+                nodes.append(self.storages[name])
+        buffer = np.empty((days, len(self.record_nodes) + 1),
+                          dtype=np.float64, order="F")
+        return buffer, nodes
+
+    def simulation(self, vector):
+        """
+        For Spotpy. Runs the model in the watchdog worker, if there is one.
+        Otherwise the model runs in this process.
+        """
+        if self.trace is not None and self.trace.stopped:
+            # The calibration stalled, the rest of the budget is skipped
+            return self.failed_simulation()
+        if self.watchdog is None:
+            return super().simulation(vector)
+        result = self.watchdog.call(vector, self.best_objective,
+                                    timeout=self.timeout)
+        # The run took too long or the worker crashed
+        if result is None:
+            self.timeouts += 1
+            return self.failed_simulation()
+        simulation, counters = result
+        self.streamed = counters["streamed"]
+        self.last_run_pruned = counters["last_run_pruned"]
+        self.pruned_runs += counters["pruned_runs"]
+        self.days_saved += counters["days_saved"]
+        self.run_times.extend(counters["run_times"])
+        if counters["run_statistics"] is not None:
+            self.last_run_statistics = counters["run_statistics"]
+            self.run_statistics.append(self.last_run_statistics)
+        return simulation
+
+    def remote_simulation(self, vector, best_objective):
+        """
+        Runs the model for the watchdog worker process. As the counters
+        only change in the worker, their changes are sent back together
+        with the simulation.
+
+        :param vector: parameter vector
+        :param best_objective: best objective function value so far, needed
+        for the pruning
+        :return: simulation and dictionary of the counter changes
+        """
+        self.best_objective = max(self.best_objective, best_objective)
+        pruned_runs = self.pruned_runs
+        days_saved = self.days_saved
+        run_times = len(self.run_times)
+        self.last_run_statistics = None
+        simulation = np.array(super().simulation(vector))
+        counters = {"last_run_pruned": self.last_run_pruned,
+                    "pruned_runs": self.pruned_runs - pruned_runs,
+                    "days_saved": self.days_saved - days_saved,
+                    "run_times": self.run_times[run_times:],
+                    "run_statistics": self.last_run_statistics,
+                    "streamed": self.streamed}
+        return simulation, counters
+
+    def close(self):
+        """
+        Stops the watchdog worker, if there is one.
+
+        :return: None
+        """
+        if self.watchdog is not None:
+            self.watchdog.close()
+
+    def get_volumes(self):
+        """
+        Returns the current volumes of all storages.
+
+        :return: dictionary with the names of the storages as keys
+        """
+        return dict((name, storage.volume)
+                    for name, storage in self.storages.items()
+                    if name != "out")
+
+    def set_volumes(self, volumes):
+        """
+        Sets the volumes of the storages.
+
+        :param volumes: dictionary as returned by get_volumes
+        :return: None
+        """
+        for name, volume in volumes.items():
+            self.storages[name].volume = volume
+
+    def record_statistics(self, solver, simulated_days, wall_time):
+        """
+        Saves the statistics of the integrator after a run.
+
+        :param solver: the integrator of the run
+        :param simulated_days: amount of simulated days (including the warm
+        up period)
+        :param wall_time: time needed for the run in seconds
+        :return: None
+        """
+        statistics = solver_settings_module.get_statistics(solver)
+        statistics["wall_time"] = wall_time
+        statistics["simulated_days"] = simulated_days
+        years = simulated_days / 365.25
+        statistics["seconds_per_year"] = wall_time / years if years else np.nan
+        statistics["pruned"] = self.last_run_pruned
+        self.last_run_statistics = statistics
+        self.run_statistics.append(statistics)
+
+    def get_spin_up_volumes(self):
+        """
+        Returns the volumes of all storages at begin_calibration after a
+        spin up with the median (optguess) of every parameter. The volumes
+        are cached, so the spin up only runs once per structure.
+
+        :return: dictionary as returned by get_volumes
+        """
+        key = (" ".join(sorted(self.genes)), id(self.data),
+               self.begin_calibration, self.et_method,
+               tuple(sorted(self.solver_settings.items())))
+        if key not in _spin_up_cache:
+            param_dict = dict((param.name, param.optguess)
+                              for param in self.params)
+            self.setparameters(param_dict)
+            with cmf_lock:
+                self.apply_cmf_settings()
+                solver = solver_settings_module.create_solver(
+                    self.project, self.solver_settings)
+                for t in solver.run(self.project.meteo_stations[0].T.begin,
+                                    self.begin_calibration -
+                                    datetime.timedelta(days=1),
+                                    cmf.day):
+                    pass
+            _spin_up_cache[key] = (self.data, self.get_volumes())
+        return _spin_up_cache[key][1]
+
+    def run_model(self, verbose=True, timeout=None, end=None):
         """
         Starts the model. Used by spotpy
+
+        :param verbose: print the storages and fluxes of every day
+        :param timeout: Maximal time in seconds for this run. If None the
+        timeout of the template is used.
+        :param end: Last day of the run. If None the end of the calibration
+        or validation period is used.
+        :return: cmf.timeseries of the outlet water balance, or a view of the
+        first column of self.recorded if preallocate is set
+        """
+        if timeout is None:
+            timeout = self.timeout
+        with cmf_lock, self.error_state():
+            self.apply_cmf_settings()
+            # exit_after interrupts the main thread, so it can only be used
+            # when the model runs there
+            if (timeout is None or threading.current_thread() is not
+                    threading.main_thread()):
+                return self._run_model(verbose, end)
+            return exit_after(timeout)(self._run_model)(verbose, end)
+
+    def error_state(self):
+        """
+        Floating point error handling of a run. The streamed logarithm of
+        zero discharge is -inf on purpose, so its warnings are ignored once
+        for the whole run instead of in every time step.
+
+        :return: numpy.errstate
+        """
+        if self.stream_objective:
+            return np.errstate(divide="ignore", invalid="ignore")
+        return np.errstate()
+
+    def parallel_threads(self):
+        """
+        Amount of threads CMF uses for this model. Only one core, which is
+        quicker for smaller models.
+        """
+        return 1
+
+    def apply_cmf_settings(self):
+        """
+        Sets the global settings of CMF to the values of this model. Has to
+        be called with cmf_lock held.
+
+        :return: None
+        """
+        cmf.set_parallel_threads(self.parallel_threads())
+        cmf.Weather.set_snow_threshold(self.snow_threshold)
+
+    def _run_model(self, verbose, end=None):
+        """
+        Integrates the model, see run_model.
         """
         cell = self.project[0]
+        start_time = time.time()
+        solver = None
+        step = 0
+        self.streamed = None
         try:
             # Create a solver for differential equations
-            solver = cmf.CVodeIntegrator(self.project, 1e-8)
+            solver = solver_settings_module.create_solver(
+                self.project, self.solver_settings)
+
+            if end is None:
+                end = self.simulation_end()
+            days = (end - self.begin_calibration).days + 1
+            row = 0
+            accumulator = None
+            if self.stream_objective:
+                # Only the running sums of the objective functions are kept
+                accumulator = metrics.StreamingMetrics()
+                sim_dis = None
+            elif self.preallocate:
+                buffer, nodes = self.create_output_buffer(end)
+                sim_dis = None
+            else:
+                # New time series for model results
+                sim_dis = cmf.timeseries(self.begin_calibration, cmf.day)
+
+            # Prepare the pruning. The Nash-Sutcliffe efficiency is
+            # 1 - sse / sst. As the sum of squared errors (sse) can only
+            # grow, the run can be stopped as soon as it is so large, that
+            # the final NSE is below the threshold.
+            evaluation, max_sse = self.prune_limits()
+            sse = 0.0
+            self.last_run_pruned = False
 
-            # New time series for model results
-            sim_dis = cmf.timeseries(self.begin_calibration, cmf.day)
+            # Start with the spin up volumes right before begin_calibration
+            # or with the warm up period at the start of the data
+            if self.initial_volumes is not None:
+                self.set_volumes(self.initial_volumes)
+                begin = self.begin_calibration - datetime.timedelta(days=1)
+            else:
+                begin = self.project.meteo_stations[0].T.begin
             # starts the solver and calculates the daily time steps
-            end = self.end_validation
-            for t in solver.run(self.project.meteo_stations[0].T.begin, end,
-                                cmf.day):
+            for step, t in enumerate(solver.run(begin, end, cmf.day), 1):
                 # Fill the results (first year is included but not used to
                 # calculate the NS)
                 if verbose:
@@ -306,24 +718,360 @@ class LumpedModelCMF(spotpy_interface.SpotpyInterface):
                     print(fluxes)
                     print("\n")
                 if t >= self.begin_calibration:
-                    sim_dis.add(self.outlet.waterbalance(t))
-            return sim_dis
+                    if accumulator is not None:
+                        discharge = self.outlet.waterbalance(t)
+                        if row < len(self.observed):
+                            accumulator.update(discharge, self.observed[row])
+                    elif sim_dis is not None:
+                        discharge = self.outlet.waterbalance(t)
+                        sim_dis.add(discharge)
+                    elif nodes is None:
+                        discharge = buffer[row, 0] = \
+                            self.outlet.waterbalance(t)
+                    else:
+                        # One call for the outlet and all recorded nodes
+                        buffer[row] = nodes.water_balance(t)
+                        discharge = buffer[row, 0]
+                    if max_sse is not None and row < len(evaluation):
+                        sse += (discharge - evaluation[row]) ** 2
+                        if sse > max_sse:
+                            row += 1
+                            self.last_run_pruned = True
+                            self.pruned_runs += 1
+                            self.days_saved += days - row
+                            break
+                    row += 1
+            if self.last_run_pruned:
+                # Pruned runs are reported with NaN, like failed runs
+                return np.full(days, np.nan)
+            self.run_times.append(time.time() - start_time)
+            if accumulator is not None:
+                self.streamed = accumulator
+                return np.empty(0)
+            if sim_dis is not None:
+                return sim_dis
+            # Only hand out the filled rows. Slicing creates a view, so the
+            # outlet column is returned without a copy.
+            self.recorded = buffer[:row]
+            return self.recorded[:, 0]
         # Return an nan - array when a runtime error occurs
         except RuntimeError:
             print("Runtime Error")
-            return np.array(self.obs_discharge[
-                            self.begin_calibration:self.end_validation])*np.nan
+            return self.failed_simulation()
+        finally:
+            if self.collect_statistics and solver is not None:
+                self.record_statistics(solver, step, time.time() - start_time)
+
+    def prune_limits(self):
+        """
+        Determines the largest sum of squared errors over the calibration
+        period a run may reach before it is pruned. The threshold is the
+        best objective function value so far or prune_threshold, whatever is
+        higher.
+
+        :return: the evaluation data as numpy array and the maximal sum of
+        squared errors. Both are None if pruning is disabled or no
+        threshold is known yet.
+        """
+        if not self.prune:
+            return None, None
+        threshold = self.best_objective
+        if self.prune_threshold is not None:
+            threshold = max(threshold, self.prune_threshold)
+        if np.isinf(threshold):
+            return None, None
+        evaluation = self.evaluation()
+        sst = np.sum((evaluation - np.mean(evaluation)) ** 2)
+        return evaluation, (1 - threshold) * sst
 
     def objectivefunction(self, simulation, evaluation):
         """
         For Spotpy. Tells Spotpy how the model is to be evaluated.
         """
-        duration_validation = (self.end_validation -
-                               self.begin_validation).days
-        simulation_valid = simulation[:-duration_validation]
-        evaluation_valid = evaluation[:-duration_validation]
-        print("Len Sim: " + str(len(simulation_valid)))
-        print("Len Eval: " + str(len(evaluation_valid)))
-        # Todo: Hier noch hydrological signatures?
-        return spotpy.objectivefunctions.nashsutcliffe(evaluation_valid,
+        if self.stream_objective:
+            # The run already compared itself to the evaluation
+            like = np.nan
+            if self.streamed is not None:
+                like = self.streamed.nse()
+        else:
+            # The simulation starts at begin_calibration, like the
+            # evaluation. Everything behind the calibration period (the
+            # validation period if the whole window was simulated) is cut
+            # off.
+            simulation_valid = simulation[:len(evaluation)]
+            evaluation_valid = evaluation
+            print("Len Sim: " + str(len(simulation_valid)))
+            print("Len Eval: " + str(len(evaluation_valid)))
+            # Todo: Hier noch hydrological signatures?
+            like = spotpy.objectivefunctions.nashsutcliffe(evaluation_valid,
+                                                           simulation_valid)
+        # Remember the best value for the pruning of the following runs
+        if like > self.best_objective:
+            self.best_objective = like
+        if self.trace is not None:
+            self.trace.record(like)
+        return calibration.sampler_objective(like, self.minimize)
+
+    def validation_objective(self, simulation):
+        """
+        Calculates the objective function for the validation period. Needs a
+        simulation of the whole window (calibrate_only = False).
+
+        :param simulation: Simulated discharge starting at begin_calibration
+        :return: Nash-Sutcliffe efficiency of the validation period
+        """
+        evaluation = np.array(
+            self.obs_discharge[self.begin_validation:self.end_validation])
+        offset = (self.begin_validation - self.begin_calibration).days
+        simulation_valid = np.asarray(simulation)[offset:
+                                                  offset + len(evaluation)]
+        return spotpy.objectivefunctions.nashsutcliffe(evaluation,
                                                        simulation_valid)
+
+
+def create_watchdog_target(genes, data, begin_calibration, end_calibration,
+                           begin_validation, end_validation, **options):
+    """
+    Creates the model inside of a watchdog worker process and returns the
+    function the worker calls for every run. The model in the worker has no
+    timeout of its own, as the watchdog takes care of it.
+
+    :return: remote_simulation of the newly created model
+    """
+    model = LumpedModelCMF(genes, data,
+                           begin_calibration, end_calibration,
+                           begin_validation, end_validation,
+                           timeout=None, watchdog=False, **options)
+    return model.remote_simulation
+
+
+class BatchedLumpedModelCMF(LumpedModelCMF):
+    """
+    Solves several parameter sets of the same structure at once. Every
+    parameter set gets its own cell with its own outlet in one CMF project,
+    so the whole batch needs only one solver, one integration and one read
+    of the results per time step. The cells share the forcing.
+
+    The snow threshold is a global setting of CMF. All cells of a batch
+    therefore need the same snow_melt_temp, so structures with snow are
+    simulated with the lumped model instead (see
+    create_lumped_CMF_model.create_model). Pruning is not possible, as all
+    cells are integrated together.
+    """
+    def __init__(self, genes, data,
+                 begin_calibration, end_calibration,
+                 begin_validation, end_validation,
+                 cells=10, threads=None, **options):
+        """
+        :param cells: Amount of cells, the maximal batch size
+        :param threads: Amount of OpenMP threads CMF uses for the batch.
+        None uses one thread per core.
+        :param options: Further keyword arguments of LumpedModelCMF. The
+        batch always runs in this process and without pruning.
+        """
+        self.cells = cells
+        self.threads = threads
+        self.outlets = None
+        self.outlet_nodes = None
+        self.cell_storages = None
+        options["watchdog"] = False
+        options["prune"] = False
+        super().__init__(genes, data,
+                         begin_calibration, end_calibration,
+                         begin_validation, end_validation, **options)
+
+    def parallel_threads(self):
+        return self.threads or os.cpu_count() or 1
+
+    def build_project(self, forcing):
+        """
+        Creates the project with one cell, one outlet and the storages of
+        the genome for every parameter set of a batch.
+
+        :param forcing: dictionary of the forcing timeseries
+        :return: None
+        """
+        self.project = cmf.project()
+        cells = [self.create_cell(self.project, forcing, x=100 * i)
+                 for i in range(self.cells)]
+
+        # All cells use the same stations
+        weather_stations.make_stations(self.project, forcing["prec"],
+                                       forcing["t_mean"], forcing["t_min"],
+                                       forcing["t_max"])
+
+        self.outlets = []
+        self.outlet_nodes = cmf.node_list()
+        self.cell_storages = []
+        for i, cell in enumerate(cells):
+            outlet = self.project.NewOutlet("outlet {}".format(i),
+                                            100 * i + 10, 0, 0)
+            self.outlets.append(outlet)
+            self.outlet_nodes.append(outlet)
+            self.cell_storages.append(self.create_storages(cell, outlet))
+
+        # The first cell stands in for the lumped model
+        self.outlet = self.outlets[0]
+        self.storages = self.cell_storages[0]
+        self.river = self.storages["river"]
+        if "snow" in self.storages:
+            self.snow = self.storages["snow"]
+        if "canopy" in self.storages:
+            self.canopy = self.storages["canopy"]
+
+    def setparameters(self, param_dict: dict):
+        """
+        Gives all cells the same parameters.
+
+        :param param_dict: Dictionary of all the parameters and their values.
+        :return: None
+        """
+        self.setparameters_batch([param_dict] * self.cells)
+
+    def setparameters_batch(self, param_dicts):
+        """
+        Gives every cell its own parameters. Cells without a parameter set
+        (when the batch is smaller than the amount of cells) get the first
+        one.
+
+        :param param_dicts: list of parameter dictionaries, one per cell.
+        All of them need the same snow_melt_temp.
+        :return: None
+        """
+        if not 0 < len(param_dicts) <= self.cells:
+            raise ValueError("Batch size must be between 1 and {}".format(
+                self.cells))
+        thresholds = set(param_dict.get("snow_melt_temp",
+                                        DEFAULT_SNOW_THRESHOLD)
+                         for param_dict in param_dicts)
+        if "snow" in self.genes and len(thresholds) > 1:
+            raise ValueError("The cells of a batch need the same "
+                             "snow_melt_temp")
+        param_dicts = (list(param_dicts) +
+                       [param_dicts[0]] * (self.cells - len(param_dicts)))
+        for i, param_dict in enumerate(param_dicts):
+            self.connect_cell(self.project[i], self.cell_storages[i],
+                              param_dict, snow_threshold=False)
+        if "snow" in self.genes:
+            self.snow_threshold = float(thresholds.pop())
+
+    def set_volumes(self, volumes):
+        """
+        Sets the volumes of the storages of all cells.
+
+        :param volumes: dictionary as returned by get_volumes
+        :return: None
+        """
+        for storages in self.cell_storages:
+            for name, volume in volumes.items():
+                storages[name].volume = volume
+
+    def simulation_batch(self, vectors):
+        """
+        Runs a batch of parameter vectors.
+
+        :param vectors: list of parameter vectors
+        :return: array with one row of simulated discharge per vector
+        """
+        self.setparameters_batch(
+            [dict((pp.name, v) for pp, v in zip(self.params, vector))
+             for vector in vectors])
+        return self.run_batch()[:len(vectors)]
+
+    def objectivefunction_batch(self, simulations, evaluation):
+        """
+        Calculates the Nash-Sutcliffe efficiency of a whole batch at once,
+        see objectivefunction.
+
+        :param simulations: array with one simulation per row
+        :param evaluation: observed discharge of the calibration period
+        :return: array of the efficiencies
+        """
+        if not self.stream_objective:
+            likes = metrics.nash_sutcliffe(simulations, evaluation)
+        elif self.streamed is None:
+            likes = np.full(len(simulations), np.nan)
+        else:
+            likes = self.streamed.nse()[:len(simulations)]
+        if not np.isnan(likes).all():
+            self.best_objective = max(self.best_objective, np.nanmax(likes))
+        if self.trace is not None:
+            for like in likes:
+                self.trace.record(like)
+        return likes
+
+    def run_batch(self, timeout=None, end=None):
+        """
+        Integrates all cells at once.
+
+        :param timeout: Maximal time in seconds for the batch. If None the
+        timeout of the template times the amount of cells is used.
+        :param end: Last day of the run. If None the end of the calibration
+        or validation period is used.
+        :return: array with one row of simulated discharge per cell. If the
+        run fails, all rows are NaN.
+        """
+        if timeout is None and self.timeout is not None:
+            timeout = self.timeout * self.cells
+        try:
+            with cmf_lock, self.error_state():
+                self.apply_cmf_settings()
+                if (timeout is None or threading.current_thread() is not
+                        threading.main_thread()):
+                    return self._run_batch(end)
+                return exit_after(timeout)(self._run_batch)(end)
+        except KeyboardInterrupt:
+            self.timeouts += 1
+            return np.full((self.cells, len(self.failed_simulation())),
+                           np.nan)
+
+    def _run_batch(self, end=None):
+        """
+        Integrates all cells, see run_batch.
+        """
+        start_time = time.time()
+        solver = None
+        step = 0
+        if end is None:
+            end = self.simulation_end()
+        days = (end - self.begin_calibration).days + 1
+        self.streamed = None
+        try:
+            solver = solver_settings_module.create_solver(
+                self.project, self.solver_settings)
+            accumulator = None
+            if self.stream_objective:
+                # One running sum per cell instead of the series
+                accumulator = metrics.StreamingMetrics(self.cells)
+            else:
+                # One row per day, one column per cell. Every row is
+                # filled with one call for all outlets.
+                buffer = np.empty((days, self.cells), dtype=np.float64)
+            row = 0
+            if self.initial_volumes is not None:
+                self.set_volumes(self.initial_volumes)
+                begin = self.begin_calibration - datetime.timedelta(days=1)
+            else:
+                begin = self.project.meteo_stations[0].T.begin
+            for step, t in enumerate(solver.run(begin, end, cmf.day), 1):
+                if t >= self.begin_calibration:
+                    if accumulator is None:
+                        buffer[row] = self.outlet_nodes.water_balance(t)
+                    elif row < len(self.observed):
+                        accumulator.update(
+                            np.asarray(self.outlet_nodes.water_balance(t)),
+                            self.observed[row])
+                    row += 1
+            # The share of a single parameter set
+            self.run_times.append((time.time() - start_time) / self.cells)
+            if accumulator is not None:
+                self.streamed = accumulator
+                return np.empty((self.cells, 0))
+            self.recorded = buffer[:row]
+            return self.recorded.T
+        except RuntimeError:
+            print("Runtime Error")
+            return np.full((self.cells, days), np.nan)
+        finally:
+            if self.collect_statistics and solver is not None:
+                self.record_statistics(solver, step, time.time() - start_time)
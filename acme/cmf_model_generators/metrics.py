@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Objective functions and hydrological signatures for many simulations at
+once. All functions take a matrix with one simulation per row (e.g. the
+batch of a BatchedLumpedModelCMF or the archived runs of a calibration) and
+one observed series, and return one value per row.
+
+Time steps where the observation is NaN (missing data) are left out for all
+rows. A simulation that is NaN at one of the remaining time steps (a failed
+run) gets NaN, so it can never look better than a complete one.
+
+Simulations longer than the observation are cut to its length, like in
+LumpedModelCMF.objectivefunction.
+"""
+import numpy as np
+
+# Names of everything calculate returns
+OBJECTIVES = ["nse", "log_nse", "kge", "pbias", "rmse"]
+SIGNATURES = ["fdc_slope", "baseflow_index", "runoff_ratio"]
+
+
+def prepare(simulations, evaluation):
+    """
+    Brings the simulations and the observation to the same time steps and
+    removes the missing observations.
+
+    :param simulations: array with one simulation per row. A single
+    simulation can be given as 1D array.
+    :param evaluation: observed series
+    :return: 2D array of the simulations, 1D array of the observation and
+    the boolean mask of the time steps kept
+    """
+    evaluation = np.asarray(evaluation, dtype=float)
+    simulations = np.atleast_2d(np.asarray(simulations, dtype=float))
+    simulations = simulations[:, :len(evaluation)]
+    if simulations.shape[1] < len(evaluation):
+        raise ValueError("The simulations have {} time steps, the "
+                         "observation {}".format(simulations.shape[1],
+                                                 len(evaluation)))
+    valid = ~np.isnan(evaluation)
+    return simulations[:, valid], evaluation[valid], valid
+
+
+def nash_sutcliffe(simulations, evaluation):
+    """
+    Nash-Sutcliffe efficiency of every simulation.
+    """
+    simulations, evaluation, _ = prepare(simulations, evaluation)
+    sse = np.sum((simulations - evaluation) ** 2, axis=1)
+    sst = np.sum((evaluation - np.mean(evaluation)) ** 2)
+    return 1 - sse / sst
+
+
+def log_nash_sutcliffe(simulations, evaluation, epsilon=0.0):
+    """
+    Nash-Sutcliffe efficiency of the logarithms of every simulation, which
+    weights the low flows more.
+
+    :param epsilon: added before taking the logarithm, to allow zero flows
+    """
+    simulations, evaluation, _ = prepare(simulations, evaluation)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return nash_sutcliffe(np.log(simulations + epsilon),
+                              np.log(evaluation + epsilon))
+
+
+def kling_gupta(simulations, evaluation):
+    """
+    Kling-Gupta efficiency of every simulation.
+    """
+    simulations, evaluation, _ = prepare(simulations, evaluation)
+    return _kling_gupta(simulations, evaluation)
+
+
+def percent_bias(simulations, evaluation):
+    """
+    Percent bias of every simulation. Positive values mean the simulation
+    is too high, like spotpy.objectivefunctions.pbias.
+    """
+    simulations, evaluation, _ = prepare(simulations, evaluation)
+    return (100 * np.sum(simulations - evaluation, axis=1) /
+            np.sum(evaluation))
+
+
+def rmse(simulations, evaluation):
+    """
+    Root mean squared error of every simulation.
+    """
+    simulations, evaluation, _ = prepare(simulations, evaluation)
+    return np.sqrt(np.mean((simulations - evaluation) ** 2, axis=1))
+
+
+def fdc_slope(flows, low=0.33, high=0.66):
+    """
+    Slope of the middle part of the flow duration curve of every series,
+    between the flows exceeded low and high of the time (Sawicz et al.,
+    2011). Steep curves mean a flashy catchment.
+
+    :param flows: array with one series per row
+    :param low: exceedance probability of the upper flow
+    :param high: exceedance probability of the lower flow
+    :return: array of the slopes. Series with zero flows give inf or NaN.
+    """
+    flows = np.atleast_2d(np.asarray(flows, dtype=float))
+    upper, lower = np.percentile(flows, [100 * (1 - low), 100 * (1 - high)],
+                                 axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (np.log(upper) - np.log(lower)) / (high - low)
+
+
+def baseflow_index(flows, alpha=0.925):
+    """
+    Share of the baseflow in the total flow of every series. The baseflow
+    is separated with one forward pass of the digital filter of Lyne and
+    Hollick (1979), which runs for all series at once.
+
+    :param flows: array with one series per row
+    :param alpha: parameter of the filter
+    :return: array of the baseflow indices
+    """
+    flows = np.atleast_2d(np.asarray(flows, dtype=float))
+    quickflow = np.zeros(flows.shape[0])
+    baseflow = np.zeros(flows.shape[0])
+    for t in range(1, flows.shape[1]):
+        quickflow = (alpha * quickflow + (1 + alpha) / 2 *
+                     (flows[:, t] - flows[:, t - 1]))
+        # The quickflow can neither be negative nor larger than the flow
+        quickflow = np.clip(quickflow, 0, flows[:, t])
+        baseflow += flows[:, t] - quickflow
+    # The first time step is all baseflow
+    baseflow += flows[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return baseflow / np.sum(flows, axis=1)
+
+
+def runoff_ratio(flows, precipitation):
+    """
+    Share of the precipitation that leaves the catchment as discharge. Both
+    have to be in the same unit, e.g. mm/day.
+
+    :param flows: array with one series per row
+    :param precipitation: precipitation of the same time steps
+    :return: array of the runoff ratios
+    """
+    flows = np.atleast_2d(np.asarray(flows, dtype=float))
+    return (np.sum(flows, axis=1) /
+            np.sum(np.asarray(precipitation, dtype=float)))
+
+
+def rank_correlation(first, second):
+    """
+    Spearman rank correlation of two sequences without ties, e.g. the
+    objective functions of the same structures or parameter sets from two
+    models. Unlike the other functions, it compares two single series.
+
+    :param first: sequence of values
+    :param second: sequence of values of the same length
+    :return: rank correlation
+    """
+    first_ranks = np.argsort(np.argsort(first))
+    second_ranks = np.argsort(np.argsort(second))
+    return np.corrcoef(first_ranks, second_ranks)[0, 1]
+
+
+def _kling_gupta(simulations, evaluation):
+    """
+    Kling-Gupta efficiency of already prepared arrays.
+    """
+    simulation_mean = np.mean(simulations, axis=1)
+    evaluation_mean = np.mean(evaluation)
+    simulation_std = np.std(simulations, axis=1)
+    evaluation_std = np.std(evaluation)
+    covariance = np.mean((simulations - simulation_mean[:, None]) *
+                         (evaluation - evaluation_mean), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = covariance / (simulation_std * evaluation_std)
+    variability = simulation_std / evaluation_std
+    bias = simulation_mean / evaluation_mean
+    return 1 - np.sqrt((correlation - 1) ** 2 + (variability - 1) ** 2 +
+                       (bias - 1) ** 2)
+
+
+def calculate(simulations, evaluation, precipitation=None, epsilon=0.0):
+    """
+    Calculates all objective functions and signatures of every simulation.
+    The errors, means and the valid time steps are determined only once for
+    all of them.
+
+    :param simulations: array with one simulation per row
+    :param evaluation: observed series
+    :param precipitation: precipitation of the time steps of evaluation,
+    needed for the runoff ratio. Without it the runoff ratio is NaN.
+    :param epsilon: added before taking the logarithm for log_nse
+    :return: dictionary with the names in OBJECTIVES and SIGNATURES as keys
+    and arrays with one value per simulation as values
+    """
+    simulations, evaluation, valid = prepare(simulations, evaluation)
+    errors = simulations - evaluation
+    squared = np.sum(errors ** 2, axis=1)
+    sst = np.sum((evaluation - np.mean(evaluation)) ** 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_simulations = np.log(simulations + epsilon)
+        log_evaluation = np.log(evaluation + epsilon)
+        log_sse = np.sum((log_simulations - log_evaluation) ** 2, axis=1)
+        log_sst = np.sum((log_evaluation - np.mean(log_evaluation)) ** 2)
+        values = {"nse": 1 - squared / sst,
+                  "log_nse": 1 - log_sse / log_sst,
+                  "kge": _kling_gupta(simulations, evaluation),
+                  "pbias": 100 * np.sum(errors, axis=1) / np.sum(evaluation),
+                  "rmse": np.sqrt(squared / len(evaluation)),
+                  "fdc_slope": fdc_slope(simulations),
+                  "baseflow_index": baseflow_index(simulations)}
+    if precipitation is None:
+        values["runoff_ratio"] = np.full(len(simulations), np.nan)
+    else:
+        precipitation = np.asarray(precipitation,
+                                   dtype=float)[:len(valid)][valid]
+        values["runoff_ratio"] = runoff_ratio(simulations, precipitation)
+    return values
+
+
+class StreamingMetrics:
+    """
+    Objective functions of one or several simulations, updated one time
+    step at a time while the model runs. Only running sums are kept, so the
+    memory does not grow with the length of the record and the values are
+    ready as soon as the run ends.
+
+    The means, variances and the covariance are updated with the algorithm
+    of Welford, which stays accurate for long (e.g. hourly) records.
+    """
+    def __init__(self, size=None, epsilon=0.0):
+        """
+        :param size: amount of simulations updated together (e.g. the cells
+        of a batch). None for a single simulation, which is then updated
+        with plain floats.
+        :param epsilon: added before taking the logarithm for log_nse
+        """
+        zeros = 0.0 if size is None else np.zeros(size)
+        self.epsilon = epsilon
+        self.count = 0
+        self.simulation_mean = zeros
+        self.evaluation_mean = 0.0
+        # Sums of the squared deviations from the mean and of the products
+        # of the deviations of simulation and evaluation
+        self.simulation_deviations = zeros
+        self.evaluation_deviations = 0.0
+        self.codeviations = zeros
+        self.sse = zeros
+        self.log_sse = zeros
+        self.log_evaluation_mean = 0.0
+        self.log_evaluation_deviations = 0.0
+
+    def update(self, simulated, observed):
+        """
+        Adds one time step. Time steps with a missing (NaN) observation are
+        skipped, a NaN simulation makes all its values NaN. The logarithm
+        of zero discharge warns, so the warnings should be ignored once for
+        the whole run (see LumpedModelCMF.error_state), which is cheaper
+        than in every time step.
+
+        :param simulated: simulated value or array with one value per
+        simulation
+        :param observed: observed value of the time step
+        :return: None
+        """
+        if observed != observed:
+            return
+        self.count += 1
+        error = simulated - observed
+        self.sse = self.sse + error * error
+        simulation_delta = simulated - self.simulation_mean
+        self.simulation_mean = (self.simulation_mean +
+                                simulation_delta / self.count)
+        evaluation_delta = observed - self.evaluation_mean
+        self.evaluation_mean += evaluation_delta / self.count
+        evaluation_residual = observed - self.evaluation_mean
+        self.simulation_deviations = (
+            self.simulation_deviations +
+            simulation_delta * (simulated - self.simulation_mean))
+        self.evaluation_deviations += evaluation_delta * evaluation_residual
+        self.codeviations = (self.codeviations +
+                             simulation_delta * evaluation_residual)
+        log_simulated = np.log(simulated + self.epsilon)
+        log_observed = np.log(observed + self.epsilon)
+        log_error = log_simulated - log_observed
+        self.log_sse = self.log_sse + log_error * log_error
+        log_delta = log_observed - self.log_evaluation_mean
+        self.log_evaluation_mean += log_delta / self.count
+        self.log_evaluation_deviations += (
+            log_delta * (log_observed - self.log_evaluation_mean))
+
+    def nse(self):
+        """
+        Nash-Sutcliffe efficiency of the time steps so far.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return 1 - np.divide(self.sse, self.evaluation_deviations)
+
+    def log_nse(self):
+        """
+        Nash-Sutcliffe efficiency of the logarithms of the time steps so far.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return 1 - np.divide(self.log_sse, self.log_evaluation_deviations)
+
+    def kge(self):
+        """
+        Kling-Gupta efficiency of the time steps so far.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = self.codeviations / np.sqrt(
+                self.simulation_deviations * self.evaluation_deviations)
+            variability = np.sqrt(np.divide(self.simulation_deviations,
+                                            self.evaluation_deviations))
+            bias = np.divide(self.simulation_mean, self.evaluation_mean)
+        return 1 - np.sqrt((correlation - 1) ** 2 + (variability - 1) ** 2 +
+                           (bias - 1) ** 2)
+
+    def pbias(self):
+        """
+        Percent bias of the time steps so far, see percent_bias.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return 100 * np.divide(self.simulation_mean -
+                                   self.evaluation_mean, self.evaluation_mean)
+
+    def rmse(self):
+        """
+        Root mean squared error of the time steps so far.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.sqrt(np.divide(self.sse, self.count))
+
+    def results(self):
+        """
+        Returns all objective functions.
+
+        :return: dictionary with the names in OBJECTIVES as keys
+        """
+        return {"nse": self.nse(), "log_nse": self.log_nse(),
+                "kge": self.kge(), "pbias": self.pbias(),
+                "rmse": self.rmse()}
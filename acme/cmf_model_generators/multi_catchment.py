@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Runs the structure searches of many catchments at once. All searches share
+one pool of worker processes, which is set up once with the data of all
+catchments (and, with the fork server, imports everything only once). Every
+search runs in its own thread of this process and hands its evaluations to
+the shared pool, where they are interleaved: a free worker always takes the
+most expensive job left of any catchment, so no worker idles while one
+catchment finishes its last structures.
+
+The results and the progress of every catchment are written to their own
+directory.
+"""
+import os
+import sys
+import threading
+import traceback
+import acme.cmf_model_generators.create_lumped_CMF_model as generator
+import acme.cmf_model_generators.lumped_CMF_model_template as template
+from acme.scheduler import Scheduler
+
+# Keys of a catchment, which are passed on to LumpedCMFGenerator
+CATCHMENT_KEYS = ["begin_calibration", "end_calibration",
+                  "begin_validation", "end_validation", "prec", "discharge",
+                  "t_mean", "t_min", "t_max"]
+
+
+def create_generators(catchments, workers, output_directory, **options):
+    """
+    Creates one generator per catchment.
+
+    :param catchments: list of dictionaries with a unique "name" and the
+    keys in CATCHMENT_KEYS (windows, forcing and discharge)
+    :param workers: amount of worker processes of the shared pool
+    :param output_directory: every catchment writes to a directory named
+    after it in here
+    :param options: further keyword arguments of LumpedCMFGenerator, the
+    same for all catchments
+    :return: list of LumpedCMFGenerator
+    """
+    names = [catchment["name"] for catchment in catchments]
+    if len(set(names)) != len(names):
+        raise ValueError("The names of the catchments are not unique")
+    generators = []
+    for catchment in catchments:
+        directory = os.path.join(output_directory, catchment["name"])
+        os.makedirs(directory, exist_ok=True)
+        arguments = dict(options)
+        arguments.update((key, catchment[key]) for key in CATCHMENT_KEYS)
+        generators.append(generator.LumpedCMFGenerator(
+            workers=workers, output_directory=directory,
+            log_file=os.path.join(directory, "acme_log.txt"), **arguments))
+    return generators
+
+
+def run_catchments(catchments, workers, output_directory=".",
+                   recycle_after=None, max_worker_memory=None,
+                   fork_server=True, **options):
+    """
+    Runs the structure searches of all catchments on one shared pool of
+    worker processes.
+
+    :param catchments: list of dictionaries with a unique "name" and the
+    keys in CATCHMENT_KEYS (windows, forcing and discharge)
+    :param workers: amount of worker processes
+    :param output_directory: every catchment writes its results and log to
+    a directory named after it in here
+    :param recycle_after: a worker process is replaced after this many jobs
+    :param max_worker_memory: a worker process is replaced when its memory
+    exceeds this many bytes
+    :param fork_server: fork the worker processes from a server, which has
+    everything imported and the data of all catchments loaded
+    :param options: further keyword arguments of LumpedCMFGenerator, the
+    same for all catchments
+    :return: list of the generators in the order of catchments
+    """
+    generators = create_generators(catchments, workers, output_directory,
+                                   **options)
+    # Creates the pool and the fork server before the threads start
+    scheduler = Scheduler(workers, initializer=generator.init_workers,
+                          initargs=([search.worker_setup()
+                                     for search in generators],),
+                          isolate=True, max_jobs=recycle_after,
+                          max_rss=max_worker_memory, fork_server=fork_server,
+                          preload=[template.__name__])
+    failed = []
+
+    def solve(catchment, search):
+        try:
+            search.solve(scheduler=scheduler)
+        except Exception:
+            failed.append(catchment["name"])
+            with open(os.path.join(search.state.output_directory,
+                                   "acme_log.txt"), "a") as log:
+                traceback.print_exc(file=log)
+            traceback.print_exc(file=sys.stderr)
+            # A failed search does not clean up after itself
+            search.clear_caches()
+
+    threads = [threading.Thread(target=solve, args=(catchment, search))
+               for catchment, search in zip(catchments, generators)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        generator.write_worker_report(scheduler.report(),
+                                      directory=output_directory)
+    finally:
+        scheduler.close()
+    if failed:
+        raise RuntimeError("The search failed for the catchments: "
+                           "{}".format(", ".join(failed)))
+    return generators
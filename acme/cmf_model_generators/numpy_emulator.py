@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Emulates the lumped CMF models of the template with explicit time steps in
+numpy. All parameter sets of a structure are integrated at once, the
+parameters and storages are arrays with one value per parameter set. This
+is much cheaper than CMF and therefore used to screen many parameter sets,
+whose best ones are then refined in CMF.
+
+The emulator follows the same genes as LumpedModelCMF:
+- kinematic waves q = V0 * (V / V0) ** beta / tr between the storages
+- snowfall below and a degree day snow melt above the snow threshold
+- the canopy intercepts the precipitation according to its closure, the
+  overflow above LAI * 0.1 mm drips to the ground
+- the potential evapotranspiration (Hargreaves, or the et_method) is taken
+  from the canopy first and then from the first layer. It is reduced
+  linearly when the first layer is less than half full.
+- without the river gene, everything reaching the river goes straight to
+  the outlet
+
+The processes of CMF (infiltration, suction stress, smooth snow threshold)
+are only approximated. agreement_report compares both.
+
+The cell has an area of 1000 m², so 1 mm equals 1 m³, as in the template.
+"""
+import datetime
+import time
+import os
+import numpy as np
+import acme.cmf_model_generators.lumped_CMF_model_template as template
+import acme.cmf_model_generators.lookup as lookup
+import acme.cmf_model_generators.potential_et as potential_et
+import acme.cmf_model_generators.metrics as metrics
+
+# Depth of the layers in m, same as in the template
+LAYER_DEPTHS = {"first": 2.0, "second": 3.0, "third": 5.0}
+# Porosity of the layers
+POROSITY = 0.5
+# Area of the cell in m²
+AREA = 1000.
+# Interception capacity of the canopy per unit of LAI in mm
+INTERCEPTION_PER_LAI = 0.1
+
+
+class NumpyEmulator:
+    def __init__(self, genes, data,
+                 begin_calibration, end_calibration,
+                 begin_validation, end_validation,
+                 calibrate_only=False, substeps=8, et_method=None,
+                 latitude=51.0):
+        """
+        :param genes: active genome that is to be emulated
+        :param data: dictionary of all data needed for a run
+        :param begin_calibration: start date of the calibration period
+        :param end_calibration: end date of the calibration period
+        :param begin_validation: start date of the validation period
+        :param end_validation: end date of the validation period
+        :param calibrate_only: If True, only simulate until end_calibration
+        :param substeps: Amount of explicit steps per day
+        :param et_method: Method of the potential evapotranspiration (see
+        lookup.get_potential_evapotranspiration). None means Hargreaves,
+        like cmf.HargreaveET.
+        :param latitude: latitude of the catchment in degree
+        """
+        self.genes = genes
+        self.begin_calibration = begin_calibration
+        self.end_calibration = end_calibration
+        self.begin_validation = begin_validation
+        self.end_validation = end_validation
+        self.calibrate_only = calibrate_only
+        self.substeps = substeps
+        self.params = template.LumpedModelCMF.create_params_from_genes(genes)
+        self.connections = [gene.split("_")[1:] for gene in genes
+                            if gene.startswith("tr_")]
+
+        # Forcing as numpy arrays, starting at the begin of the data
+        begin = data["prec"].begin.AsDate()
+        self.begin = datetime.datetime(begin.year, begin.month, begin.day)
+        end = end_calibration if calibrate_only else end_validation
+        length = (end - self.begin).days + 1
+        self.prec = np.array(data["prec"])[:length]
+        self.t_mean = np.array(data["t_mean"])[:length]
+        t_min = np.array(data["t_min"])[:length]
+        t_max = np.array(data["t_max"])[:length]
+        doy = potential_et.day_of_year(self.begin.year, self.begin.month,
+                                       self.begin.day, length)
+        et_function = (potential_et.hargreave if et_method is None else
+                       lookup.get_potential_evapotranspiration(et_method))
+        self.pet = potential_et.calculate(et_function, doy, self.t_mean,
+                                          t_min, t_max, latitude)
+        offset = (begin_calibration - self.begin).days
+        self.evaluation_data = np.array(
+            data["discharge"][begin_calibration:end_calibration])
+        self.offset = offset
+        self.days = (end - begin_calibration).days + 1
+
+    def connection_parameters(self, param_dicts):
+        """
+        Collects tr, beta and V0 of every connection in the same way as
+        LumpedModelCMF.connect_cell.
+
+        :param param_dicts: dictionary of parameter arrays
+        :return: list of (source, target, tr, beta, V0)
+        """
+        connections = []
+        for source, target in self.connections:
+            name = "tr_{}_{}".format(source, target)
+            connection_params = {"beta": 1.0, "V0": 1.0}
+            for param in param_dicts:
+                try:
+                    kind, source_param, target_param = param.split("_")
+                except ValueError:
+                    continue
+                if (kind in connection_params and source_param == source
+                        and target_param == target):
+                    connection_params[kind] = param_dicts[param]
+            connections.append((source, target, param_dicts[name],
+                                connection_params["beta"],
+                                connection_params["V0"]))
+        return connections
+
+    def simulate(self, vectors):
+        """
+        Integrates all parameter vectors at once.
+
+        :param vectors: array with one parameter vector per row, in the
+        order of self.params
+        :return: array with one row of simulated discharge per vector,
+        starting at begin_calibration
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=float))
+        samples = len(vectors)
+        params = dict((param.name, vectors[:, i])
+                      for i, param in enumerate(self.params))
+        connections = self.connection_parameters(params)
+        dt = 1. / self.substeps
+
+        # Volumes of the storages in m³. The layers start half full, the
+        # warm up period before begin_calibration takes care of the rest.
+        volumes = {"river": np.zeros(samples), "out": np.zeros(samples)}
+        capacity = dict((name, depth * POROSITY * AREA)
+                        for name, depth in LAYER_DEPTHS.items())
+        for name in ["first", "second", "third"]:
+            if name == "first" or name in self.genes:
+                volumes[name] = np.full(samples, capacity[name] / 2)
+        snow = "snow" in self.genes
+        canopy = "canopy" in self.genes
+        if snow:
+            volumes["snow"] = np.zeros(samples)
+            threshold = params.get("snow_melt_temp", np.full(samples, 0.5))
+            melt_rate = params.get("snow_meltrate", np.full(samples, 7.))
+        if canopy:
+            volumes["canopy"] = np.zeros(samples)
+            closure = params.get("canopy_closure", np.full(samples, 1.0))
+            interception_capacity = INTERCEPTION_PER_LAI * params.get(
+                "canopy_lai", np.full(samples, 2.88))
+
+        discharge = np.zeros((samples, len(self.prec) + 1))
+        for day in range(len(self.prec)):
+            rain = np.full(samples, self.prec[day] * dt)
+            temperature = self.t_mean[day]
+            for _ in range(self.substeps):
+                pet = np.full(samples, self.pet[day] * dt)
+                surface = rain
+                if snow:
+                    snowfall = np.where(temperature < threshold, rain, 0.)
+                    volumes["snow"] += snowfall
+                    melt = np.minimum(volumes["snow"], melt_rate * dt *
+                                      np.maximum(temperature - threshold, 0))
+                    volumes["snow"] -= melt
+                    surface = rain - snowfall + melt
+                if canopy:
+                    intercepted = surface * closure
+                    volumes["canopy"] += intercepted
+                    overflow = np.maximum(volumes["canopy"] -
+                                          interception_capacity, 0)
+                    evaporation = np.minimum(volumes["canopy"] - overflow,
+                                             pet)
+                    volumes["canopy"] -= overflow + evaporation
+                    pet = pet - evaporation
+                    surface = surface - intercepted + overflow
+                volumes["first"] += surface
+                stress = np.clip(volumes["first"] / (capacity["first"] / 2),
+                                 0, 1)
+                volumes["first"] -= np.minimum(volumes["first"],
+                                               pet * stress)
+
+                # Kinematic waves, calculated with the volumes at the start
+                # of the step. A storage cannot lose more than it has.
+                fluxes = []
+                demand = dict((name, np.zeros(samples)) for name in volumes)
+                for source, target, tr, beta, v0 in connections:
+                    volume = np.maximum(volumes[source], 0)
+                    flux = v0 * (volume / v0) ** beta / tr * dt
+                    demand[source] += flux
+                    fluxes.append((source, target, flux))
+                for source, target, flux in fluxes:
+                    limit = np.minimum(1, volumes[source] /
+                                       np.where(demand[source] > 0,
+                                                demand[source], 1))
+                    flux = flux * np.maximum(limit, 0)
+                    volumes[source] = volumes[source] - flux
+                    volumes[target] = volumes[target] + flux
+                    demand[source] = demand[source] - flux
+                if "river" not in self.genes:
+                    volumes["out"] += volumes["river"]
+                    volumes["river"][:] = 0
+            # The outlet volume of a day is its mean flux in m³/day
+            discharge[:, day + 1] = volumes["out"]
+            volumes["out"] = np.zeros(samples)
+        return discharge[:, self.offset:self.offset + self.days]
+
+    def evaluation(self):
+        """
+        Returns the observed discharge of the calibration period.
+        """
+        return self.evaluation_data
+
+    def objectivefunction(self, simulations):
+        """
+        Calculates the Nash-Sutcliffe efficiency of every simulation over
+        the calibration period.
+
+        :param simulations: array with one simulation per row
+        :return: array of the Nash-Sutcliffe efficiencies
+        """
+        return metrics.nash_sutcliffe(simulations, self.evaluation())
+
+
+def nash_sutcliffe_rows(reference, simulations):
+    """
+    Nash-Sutcliffe efficiency of every row of simulations compared to the
+    same row of reference.
+
+    :param reference: array with one reference series per row
+    :param simulations: array of the same shape
+    :return: array of the efficiencies
+    """
+    sse = np.nansum((simulations - reference) ** 2, axis=1)
+    sst = np.nansum((reference - np.nanmean(reference, axis=1)[:, None])
+                    ** 2, axis=1)
+    return 1 - sse / sst
+
+
+def agreement_report(genes, data, begin_calibration, end_calibration,
+                     begin_validation, end_validation, vectors,
+                     substeps=8, et_method=None):
+    """
+    Compares the emulator with CMF for the same parameter sets.
+
+    :param genes: active genome
+    :param data: dictionary of all data needed for a run
+    :param begin_calibration:
+    :param end_calibration:
+    :param begin_validation:
+    :param end_validation:
+    :param vectors: array with one parameter vector per row
+    :param substeps: Amount of explicit steps per day of the emulator
+    :param et_method: Method of the potential evapotranspiration
+    :return: dictionary with the Nash-Sutcliffe efficiency of every
+    emulated run compared to CMF ("agreement"), the objective function
+    values of both ("emulator_objective", "cmf_objective"), their rank
+    correlation and the time per run of both
+    """
+    model = template.LumpedModelCMF(genes, data,
+                                    begin_calibration, end_calibration,
+                                    begin_validation, end_validation,
+                                    preallocate=True, calibrate_only=True,
+                                    et_method=et_method)
+    emulator = NumpyEmulator(genes, data,
+                             begin_calibration, end_calibration,
+                             begin_validation, end_validation,
+                             calibrate_only=True, substeps=substeps,
+                             et_method=et_method)
+    vectors = np.atleast_2d(vectors)
+    start_time = time.time()
+    emulated = emulator.simulate(vectors)
+    emulator_time = (time.time() - start_time) / len(vectors)
+
+    start_time = time.time()
+    simulated = np.array([np.array(model.simulation(vector))
+                          for vector in vectors])
+    cmf_time = (time.time() - start_time) / len(vectors)
+    model.close()
+
+    evaluation = model.evaluation()
+    cmf_objective = np.array([model.objectivefunction(simulation,
+                                                      evaluation)
+                              for simulation in simulated])
+    emulator_objective = emulator.objectivefunction(emulated)
+    return {"agreement": nash_sutcliffe_rows(simulated, emulated),
+            "emulator_objective": emulator_objective,
+            "cmf_objective": cmf_objective,
+            "rank_correlation": metrics.rank_correlation(
+                emulator_objective, cmf_objective),
+            "emulator_seconds_per_run": emulator_time,
+            "cmf_seconds_per_run": cmf_time}
+
+
+def write_agreement_report(report, test=False):
+    """
+    Writes an agreement report to a file, one line per parameter set.
+
+    :param report: dictionary as returned by agreement_report
+    :param test: Determines if the function is called in test mode,
+    which enables the deletion of the file at the end.
+    :return: None
+    """
+    name = 'acme_emulator_agreement_' + str(time.time()) + '.csv'
+    outfile = open(name, 'w')
+    outfile.write("# rank correlation: {}, emulator s/run: {}, "
+                  "cmf s/run: {}\n".format(report["rank_correlation"],
+                                           report["emulator_seconds_per_run"],
+                                           report["cmf_seconds_per_run"]))
+    outfile.write("agreement, emulator_objective, cmf_objective\n")
+    for line in zip(report["agreement"], report["emulator_objective"],
+                    report["cmf_objective"]):
+        outfile.write(", ".join(str(value) for value in line) + "\n")
+    outfile.close()
+
+    if test:
+        os.remove(name)
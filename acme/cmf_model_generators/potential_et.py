@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Vectorized calculation of the potential evapotranspiration from the daily
+temperatures. As the potential evapotranspiration only depends on the
+forcing, it can be calculated once per catchment and handed to CMF as a
+timeseries, instead of being evaluated by the solver in every step.
+
+All methods follow FAO-56 (Allen et al. 1998). Humidity, radiation and wind
+are not part of the forcing, so they are estimated as FAO-56 recommends for
+missing data: the actual vapour pressure from the minimum temperature, the
+solar radiation with the Hargreaves radiation formula and a wind speed of
+2 m/s.
+
+All temperatures are in °C, radiation in MJ/m²/day and the potential
+evapotranspiration in mm/day.
+"""
+import numpy as np
+
+# Solar constant in MJ/m²/min
+SOLAR_CONSTANT = 0.0820
+# Latent heat of vaporization in MJ/kg
+LATENT_HEAT = 2.45
+# Psychrometric constant at sea level in kPa/°C
+PSYCHROMETRIC_CONSTANT = 0.0665
+# Stefan-Boltzmann constant in MJ/K⁴/m²/day
+STEFAN_BOLTZMANN = 4.903e-9
+# Albedo of the reference grass
+ALBEDO = 0.23
+
+
+def extraterrestrial_radiation(day_of_year, latitude):
+    """
+    Calculates the extraterrestrial radiation (FAO-56 eq. 21).
+
+    :param day_of_year: array of the days of the year (1 - 366)
+    :param latitude: latitude in degree
+    :return: array of the extraterrestrial radiation
+    """
+    phi = np.radians(latitude)
+    angle = 2 * np.pi / 365 * day_of_year
+    inverse_distance = 1 + 0.033 * np.cos(angle)
+    declination = 0.409 * np.sin(angle - 1.39)
+    sunset_angle = np.arccos(np.clip(-np.tan(phi) * np.tan(declination),
+                                     -1, 1))
+    return (24 * 60 / np.pi * SOLAR_CONSTANT * inverse_distance *
+            (sunset_angle * np.sin(phi) * np.sin(declination) +
+             np.cos(phi) * np.cos(declination) * np.sin(sunset_angle)))
+
+
+def saturation_vapour_pressure(temperature):
+    """
+    Saturation vapour pressure in kPa (FAO-56 eq. 11).
+    """
+    return 0.6108 * np.exp(17.27 * temperature / (temperature + 237.3))
+
+
+def vapour_pressure_slope(temperature):
+    """
+    Slope of the saturation vapour pressure curve in kPa/°C
+    (FAO-56 eq. 13).
+    """
+    return (4098 * saturation_vapour_pressure(temperature) /
+            (temperature + 237.3) ** 2)
+
+
+def solar_radiation(t_min, t_max, ra, k_rs=0.16):
+    """
+    Estimates the solar radiation from the temperature range with the
+    Hargreaves radiation formula (FAO-56 eq. 50).
+    """
+    return k_rs * np.sqrt(np.maximum(t_max - t_min, 0)) * ra
+
+
+def net_radiation(t_min, t_max, ra):
+    """
+    Estimates the net radiation (FAO-56 eq. 38 - 40). The actual vapour
+    pressure is approximated by the saturation vapour pressure at the
+    minimum temperature.
+    """
+    rs = solar_radiation(t_min, t_max, ra)
+    # Clear sky radiation for an elevation close to sea level
+    rso = 0.75 * ra
+    e_a = saturation_vapour_pressure(t_min)
+    relative_shortwave = np.clip(rs / np.where(rso > 0, rso, np.inf), 0.3, 1)
+    rnl = (STEFAN_BOLTZMANN *
+           ((t_max + 273.16) ** 4 + (t_min + 273.16) ** 4) / 2 *
+           (0.34 - 0.14 * np.sqrt(e_a)) * (1.35 * relative_shortwave - 0.35))
+    return (1 - ALBEDO) * rs - rnl
+
+
+def hargreave(t_mean, t_min, t_max, ra):
+    """
+    Potential evapotranspiration after Hargreaves (FAO-56 eq. 52).
+    """
+    et = (0.0023 * ra / LATENT_HEAT * (t_mean + 17.8) *
+          np.sqrt(np.maximum(t_max - t_min, 0)))
+    return np.maximum(et, 0)
+
+
+def turc(t_mean, t_min, t_max, ra):
+    """
+    Potential evapotranspiration after Turc for humid conditions.
+    """
+    rs = solar_radiation(t_min, t_max, ra)
+    et = 0.013 * t_mean / (t_mean + 15) * (23.8846 * rs + 50)
+    return np.where(t_mean > 0, np.maximum(et, 0), 0)
+
+
+def priestley_taylor(t_mean, t_min, t_max, ra, alpha=1.26):
+    """
+    Potential evapotranspiration after Priestley and Taylor.
+    """
+    delta = vapour_pressure_slope(t_mean)
+    rn = net_radiation(t_min, t_max, ra)
+    et = (alpha * delta / (delta + PSYCHROMETRIC_CONSTANT) * rn /
+          LATENT_HEAT)
+    return np.maximum(et, 0)
+
+
+def penman_monteith(t_mean, t_min, t_max, ra, wind_speed=2.0):
+    """
+    FAO-56 Penman-Monteith reference evapotranspiration (FAO-56 eq. 6).
+    The soil heat flux is neglected for daily steps.
+    """
+    delta = vapour_pressure_slope(t_mean)
+    rn = net_radiation(t_min, t_max, ra)
+    e_s = (saturation_vapour_pressure(t_max) +
+           saturation_vapour_pressure(t_min)) / 2
+    e_a = saturation_vapour_pressure(t_min)
+    gamma = PSYCHROMETRIC_CONSTANT
+    et = ((0.408 * delta * rn +
+           gamma * 900 / (t_mean + 273) * wind_speed * (e_s - e_a)) /
+          (delta + gamma * (1 + 0.34 * wind_speed)))
+    return np.maximum(et, 0)
+
+
+def day_of_year(year, month, day, length):
+    """
+    Creates the days of the year of a daily series.
+
+    :param year: year of the first day
+    :param month: month of the first day
+    :param day: day of the month of the first day
+    :param length: amount of days
+    :return: array of the days of the year (1 - 366)
+    """
+    begin = np.datetime64("{:04d}-{:02d}-{:02d}".format(year, month, day))
+    dates = begin + np.arange(length)
+    return (dates - dates.astype("datetime64[Y]")).astype(int) + 1
+
+
+def calculate(et_function, doy, t_mean, t_min, t_max, latitude=51.0):
+    """
+    Calculates the potential evapotranspiration of a whole series at once.
+
+    :param et_function: one of the functions above, e.g. from
+    lookup.get_potential_evapotranspiration
+    :param doy: array of the days of the year
+    :param t_mean: array of the daily mean temperature
+    :param t_min: array of the daily minimum temperature
+    :param t_max: array of the daily maximum temperature
+    :param latitude: latitude of the catchment in degree
+    :return: array of the potential evapotranspiration in mm/day
+    """
+    ra = extraterrestrial_radiation(np.asarray(doy), latitude)
+    return et_function(np.asarray(t_mean, dtype=float),
+                       np.asarray(t_min, dtype=float),
+                       np.asarray(t_max, dtype=float), ra)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Predicts how long the evaluation of a structure takes. The prediction is
+a linear model of the genes (storages, connections and parameters), which
+is refitted every time a runtime is measured. Structures that were already
+measured are predicted with their mean measured runtime.
+
+Before any runtime is measured, the model uses prior weights, which only
+have to get the order of the structures right.
+"""
+import numpy as np
+
+# Storages whose presence is a feature of the runtime model
+STORAGES = ["snow", "canopy", "second", "third", "river"]
+# Prior weights in seconds: intercept, one per storage, per connection and
+# per parameter of a storage or connection (beta, v0, snow and canopy)
+PRIOR_WEIGHTS = np.array([1.0] + [0.5] * len(STORAGES) + [0.5, 0.1])
+
+
+class RuntimeModel:
+    def __init__(self, regularisation=1.0):
+        """
+        :param regularisation: Weight of the prior weights in the fit. The
+        more runtimes are measured, the less the prior matters.
+        """
+        self.regularisation = regularisation
+        self.weights = PRIOR_WEIGHTS.copy()
+        self.measured = {}
+        self.features = []
+        self.runtimes = []
+
+    @staticmethod
+    def structure_features(structure):
+        """
+        Describes a structure by the features of the runtime model.
+
+        :param structure: list of genes
+        :return: array of the features
+        """
+        connections = len([gene for gene in structure
+                           if gene.startswith("tr_")])
+        # The transition times are already counted with the connections
+        parameters = len([gene for gene in structure
+                          if gene not in STORAGES and
+                          not gene.startswith("tr_")])
+        return np.array([1.0] +
+                        [float(storage in structure) for storage in STORAGES] +
+                        [connections, parameters])
+
+    @staticmethod
+    def key(structure):
+        return " ".join(sorted(structure))
+
+    def predict(self, structure):
+        """
+        Predicts the runtime of a structure in seconds.
+
+        :param structure: list of genes
+        :return: predicted runtime
+        """
+        key = self.key(structure)
+        if key in self.measured:
+            return float(np.mean(self.measured[key]))
+        prediction = float(np.dot(self.structure_features(structure),
+                                  self.weights))
+        # The linear model may give nonsense for unusual structures
+        return max(prediction, 1e-3)
+
+    def record(self, structure, runtime):
+        """
+        Adds a measured runtime and refits the model.
+
+        :param structure: list of genes
+        :param runtime: measured runtime in seconds
+        :return: None
+        """
+        self.measured.setdefault(self.key(structure), []).append(runtime)
+        self.features.append(self.structure_features(structure))
+        self.runtimes.append(runtime)
+        self.fit()
+
+    def fit(self):
+        """
+        Fits the weights to the measured runtimes with a ridge regression
+        towards the prior weights.
+
+        :return: None
+        """
+        features = np.array(self.features)
+        runtimes = np.array(self.runtimes)
+        penalty = self.regularisation * np.eye(len(PRIOR_WEIGHTS))
+        self.weights = np.linalg.solve(
+            features.T.dot(features) + penalty,
+            features.T.dot(runtimes) + penalty.dot(PRIOR_WEIGHTS))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Everything a structure search learns while it runs. Every
+LumpedCMFGenerator has its own SearchState, so several searches (e.g. for
+different catchments) can run in one process at the same time or one after
+the other without sharing their caches.
+"""
+import uuid
+import acme.cmf_model_generators.runtime_model as runtime_model
+from acme.scheduler import SingleFlight
+
+
+class SearchState:
+    def __init__(self, output_directory="", log=None, name=None):
+        """
+        :param output_directory: directory the result files are written to.
+        The default is the current working directory.
+        :param log: open file the progress of the search is written to. None
+        prints it.
+        :param name: name of the search, which has to be the same in every
+        process working for it (see create_lumped_CMF_model.search_name).
+        None gives a random unique name.
+        """
+        # Name to find the setup of the search in a worker
+        self.name = uuid.uuid4().hex if name is None else name
+        self.output_directory = output_directory
+        self.log = log
+        # Dictionary to save all models that have been tested so far. The
+        # key is the genes in the model and the value the best objective
+        # function value.
+        self.models_so_far = {}
+        # Structures that were not promoted from a reduced fidelity level.
+        # Their value in models_so_far is the predicted objective function.
+        # The key is the same as in models_so_far, the value the level.
+        self.screened_structures = {}
+        # Best parameter sets found during calibration. The key is the same
+        # as in models_so_far, the value a list of (objective function
+        # value, parameter dictionary) tuples. Only filled when
+        # validation_top_k is set.
+        self.best_parameter_sets = {}
+        # Results of the validation pass. The key is the same as in
+        # models_so_far, the value a list of (calibration value, validation
+        # value, parameter dictionary) tuples.
+        self.validation_results = {}
+        # Counters of the pruning. The key is the same as in models_so_far,
+        # the value a dictionary with the amount of pruned runs and the
+        # simulated days saved by them.
+        self.pruning_statistics = {}
+        # Solver settings selected for each set of storages, when
+        # auto_select_solver is used. The key is the sorted storages of the
+        # structure joined by spaces.
+        self.solver_choices = {}
+        # Aggregated costs of the simulations of each structure, when
+        # collect_statistics is used. The key is the same as in
+        # models_so_far.
+        self.structure_costs = {}
+        # Predicts the runtime of the structures from their genes and the
+        # runtimes measured so far
+        self.runtime_predictor = runtime_model.RuntimeModel()
+        # Predicted and measured runtime (in seconds) of the evaluation of
+        # every structure
+        self.runtime_predictions = {}
+        # Timeout of a single simulation chosen for every structure and the
+        # amount of simulations that exceeded it (adaptive timeouts only)
+        self.timeout_statistics = {}
+        # Convergence of the calibration of every structure, see
+        # calibration.ConvergenceTrace.summary. The key is the same as in
+        # models_so_far.
+        self.convergence = {}
+        # Amount of jobs of every structure that failed due to a crashed or
+        # hung worker process
+        self.failed_structures = {}
+        # Evaluations in flight. A structure requested again before its
+        # evaluation finished waits for it instead of being evaluated twice.
+        self.in_flight = SingleFlight()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Settings of the CVode solver for the different evaluation tiers. A coarse
+tolerance is good enough to screen the structures during the search, the
+finalists are then evaluated with a tight tolerance.
+
+Also contains a function to automatically select the fastest settings for a
+given model structure, which still give the same results as the reference
+settings. The selection costs one reference run and a run of every
+combination of settings, so it is only done once for every set of storages
+(see create_lumped_CMF_model.get_fitness).
+"""
+import copy
+import datetime
+import time
+import numpy as np
+import cmf
+import spotpy
+
+
+# Settings of the solver for each tier. max_step is given in hours, None
+# means the default of CMF is used.
+TIERS = {
+    "screening": {"tolerance": 1e-4, "LinearSolver": None, "max_step": None},
+    "calibration": {"tolerance": 1e-6, "LinearSolver": None,
+                    "max_step": None},
+    "final": {"tolerance": 1e-8, "LinearSolver": None, "max_step": None}
+}
+
+# Linear solvers of the CVodeIntegrator: 0 = dense, 1 = banded,
+# 2 = diagonal, 3 = krylov
+LINEAR_SOLVERS = [0, 1, 2, 3]
+MAX_STEPS = [None, 1, 24]
+
+
+def get_solver_settings(tier):
+    """
+    Returns the solver settings of an evaluation tier.
+
+    :param tier: Name of the tier
+    :return: dictionary of the solver settings
+    """
+    if tier not in TIERS:
+        raise NameError("No such solver tier")
+    return copy.deepcopy(TIERS[tier])
+
+
+def create_solver(project, settings):
+    """
+    Creates the CVode solver of a project with the given settings.
+
+    :param project: cmf project
+    :param settings: dictionary of solver settings, see TIERS
+    :return: CVodeIntegrator
+    """
+    solver = cmf.CVodeIntegrator(project, settings["tolerance"])
+    if settings.get("LinearSolver") is not None:
+        solver.LinearSolver = settings["LinearSolver"]
+    if settings.get("max_step") is not None:
+        solver.max_step = cmf.h * settings["max_step"]
+    return solver
+
+
+def get_statistics(solver):
+    """
+    Returns the statistics of a CVode solver after a run. Newer CMF versions
+    provide all of them with get_info, older ones only the rhs evaluations
+    and nonlinear iterations. Missing values are NaN.
+
+    :param solver: CVodeIntegrator
+    :return: dictionary of the statistics
+    """
+    if hasattr(solver, "get_info"):
+        info = solver.get_info()
+        return {"steps": info.steps,
+                "rhs_evaluations": info.rhs_evaluations,
+                "failed_steps": info.error_test_fails,
+                "nonlinear_iterations": info.nonlinear_solver_iterations}
+    return {"steps": np.nan,
+            "rhs_evaluations": solver.get_rhsevals(),
+            "failed_steps": np.nan,
+            "nonlinear_iterations": solver.get_nonlinear_iterations()}
+
+
+def time_trial(model, settings, end):
+    """
+    Runs the model with the given settings until end and measures the time.
+    The storages are reset afterwards, so several trials start with the
+    same state.
+
+    :param model: parametrized LumpedModelCMF
+    :param settings: dictionary of solver settings
+    :param end: last day of the trial
+    :return: simulated discharge and the needed time in seconds
+    """
+    volumes = model.get_volumes()
+    old_settings = model.solver_settings
+    model.solver_settings = settings
+    start_time = time.time()
+    try:
+        simulation = np.array(model.run_model(verbose=False, end=end))
+    finally:
+        model.solver_settings = old_settings
+        model.set_volumes(volumes)
+    return simulation, time.time() - start_time
+
+
+def select_solver(model, tier="screening", trial_days=365, tolerance=0.01,
+                  param_dict=None):
+    """
+    Determines the fastest solver settings for a model structure. Every
+    combination of LINEAR_SOLVERS and MAX_STEPS is run with the tolerance of
+    the tier for a short trial period. The result is compared to a run
+    with the settings of the "final" tier. Of all settings whose result is
+    close enough to the reference, the fastest is returned. If the
+    reference run exceeds the timeout, the "final" settings are returned.
+
+    :param model: LumpedModelCMF, is parametrized with param_dict
+    :param tier: Name of the tier which provides the tolerance of the solver
+    :param trial_days: Length of the trial period after begin_calibration
+    :param tolerance: Maximal allowed deviation from the reference result.
+    It is measured as 1 - Nash-Sutcliffe efficiency of the trial result
+    compared to the reference result.
+    :param param_dict: Parameters for the trial. If None the optguess of
+    every parameter is used.
+    :return: dictionary of the solver settings
+    """
+    selection_start = time.time()
+    if param_dict is None:
+        param_dict = dict((param.name, param.optguess)
+                          for param in model.params)
+    model.setparameters(param_dict)
+    end = model.begin_calibration + datetime.timedelta(days=trial_days)
+
+    try:
+        reference, reference_time = time_trial(
+            model, get_solver_settings("final"), end)
+    # Raised by exit_after if the trial exceeds the timeout
+    except KeyboardInterrupt:
+        print("The reference trial exceeded the timeout, the final solver "
+              "settings are used")
+        return get_solver_settings("final")
+    best_settings = get_solver_settings("final")
+    best_time = reference_time
+    for linear_solver in LINEAR_SOLVERS:
+        for max_step in MAX_STEPS:
+            settings = get_solver_settings(tier)
+            settings["LinearSolver"] = linear_solver
+            settings["max_step"] = max_step
+            try:
+                simulation, needed_time = time_trial(model, settings, end)
+            # Raised by exit_after if the trial exceeds the timeout
+            except KeyboardInterrupt:
+                continue
+            deviation = 1 - spotpy.objectivefunctions.nashsutcliffe(
+                reference, simulation)
+            if deviation <= tolerance and needed_time < best_time:
+                best_settings = settings
+                best_time = needed_time
+    print("Selected solver settings: {} ({:.2f} s instead of {:.2f} s per "
+          "trial period, the selection took {:.2f} s)"
+          .format(best_settings, best_time, reference_time,
+                  time.time() - selection_start))
+    return best_settings
@@ -20,6 +20,8 @@ class SpotpyInterface:
         self.begin_calibration = None
         self.end_calibration = None
         self.end_validation = None
+        self.calibrate_only = False
+        self.timeouts = 0
 
     def simulation(self, vector):
         """
@@ -31,9 +33,29 @@ class SpotpyInterface:
         try:
             sim_discharge = self.run_model()
         except KeyboardInterrupt:
-            sim_discharge = np.array(self.obs_discharge[
-                            self.begin_calibration:self.end_validation])*np.nan
-        return np.array(sim_discharge)
+            # Raised by exit_after, when the run took too long
+            self.timeouts += 1
+            sim_discharge = self.failed_simulation()
+        # asarray does not copy the result if it is already a numpy array
+        return np.asarray(sim_discharge)
+
+    def simulation_end(self):
+        """
+        Returns the last day that has to be simulated. This is the end of
+        the calibration period for calibration only runs and the end of the
+        validation period otherwise.
+        """
+        if self.calibrate_only:
+            return self.end_calibration
+        return self.end_validation
+
+    def failed_simulation(self):
+        """
+        Returns the result of a failed run, an array of NaN as long as the
+        simulated period.
+        """
+        return np.array(self.obs_discharge[
+                        self.begin_calibration:self.simulation_end()]) * np.nan
 
     def evaluation(self):
         """
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Derives the timeout of a single simulation from the runtimes observed so
+far, instead of using the same fixed timeout for every structure.
+
+A structure with enough completed runs gets a high quantile of its own
+runtimes times a safety factor. Other structures get the runtime predicted
+from similar structures (see runtime_model), scaled by the same quantile of
+how much the measured runtimes exceeded their predictions. Until the first
+runtime is known, the default timeout is used.
+"""
+import numpy as np
+import acme.cmf_model_generators.runtime_model as runtime_model
+
+
+class TimeoutPolicy:
+    def __init__(self, quantile=0.95, safety_factor=3.0, min_runs=5,
+                 default=60, minimum=5, maximum=600):
+        """
+        :param quantile: quantile of the runtimes the timeout is based on
+        :param safety_factor: the quantile is multiplied with this factor
+        :param min_runs: amount of completed runs a structure needs, before
+        its own runtimes are used
+        :param default: timeout in seconds before any runtime is known
+        :param minimum: lower limit of the timeout in seconds
+        :param maximum: upper limit of the timeout in seconds
+        """
+        self.quantile = quantile
+        self.safety_factor = safety_factor
+        self.min_runs = min_runs
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.run_times = {}
+        # Measured runtime divided by the runtime predicted beforehand
+        self.ratios = []
+        self.predictor = runtime_model.RuntimeModel()
+
+    def timeout(self, structure):
+        """
+        Returns the timeout for a single simulation of a structure.
+
+        :param structure: list of genes
+        :return: timeout in seconds
+        """
+        run_times = self.run_times.get(runtime_model.RuntimeModel.key(
+            structure), [])
+        if len(run_times) >= self.min_runs:
+            base = np.quantile(run_times, self.quantile)
+        elif self.ratios:
+            base = (self.predictor.predict(structure) *
+                    np.quantile(self.ratios, self.quantile))
+        else:
+            return self.default
+        return float(np.clip(base * self.safety_factor, self.minimum,
+                             self.maximum))
+
+    def record(self, structure, run_times):
+        """
+        Adds the runtimes of completed simulations of a structure.
+
+        :param structure: list of genes
+        :param run_times: list of runtimes in seconds
+        :return: None
+        """
+        key = runtime_model.RuntimeModel.key(structure)
+        for run_time in run_times:
+            self.ratios.append(run_time / self.predictor.predict(structure))
+            self.run_times.setdefault(key, []).append(run_time)
+            self.predictor.record(structure, run_time)
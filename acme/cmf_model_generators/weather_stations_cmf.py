@@ -5,6 +5,86 @@ Created on Nov 22 13:13 2017
 
 Creates and returns the weather stations and everything neccessary around them
 """
+import datetime
+import numpy as np
+import cmf
+import acme.cmf_model_generators.lookup as lookup
+import acme.cmf_model_generators.potential_et as potential_et
+
+# Forcing timeseries, which are already clipped to the simulation window.
+# They are prepared only once per catchment and process and shared by all
+# projects, as cmf timeseries do not copy their data when assigned to a
+# station. The key is the id of the data dictionary, the end of the window
+# and the evapotranspiration method, the value the data dictionary itself
+# (so its id stays unique) and the forcing.
+_forcing_cache = {}
+
+
+def get_forcing(data, end, et_method=None, latitude=51.0):
+    """
+    Returns the forcing timeseries of a catchment clipped to the simulation
+    window. They are only created the first time and then taken from the
+    cache.
+
+    :param data: dictionary of all data needed for a run
+    :param end: last day that is simulated
+    :param et_method: If given, the potential evapotranspiration is
+    calculated with this method (see lookup.get_evapotranspiration)
+    :param latitude: latitude of the catchment in degree, needed for the
+    potential evapotranspiration
+    :return: dictionary with the timeseries "prec", "t_mean", "t_min",
+    "t_max" and "pet" if et_method is given
+    """
+    key = (id(data), end, et_method, latitude)
+    if key not in _forcing_cache:
+        # Keep one more day than needed, as the end of a slice is excluded
+        # and the last step still needs data to interpolate.
+        clip_end = end + datetime.timedelta(days=2)
+        forcing = {}
+        for name in ["prec", "t_mean", "t_min", "t_max"]:
+            timeseries = data[name]
+            forcing[name] = timeseries[timeseries.begin:clip_end]
+        if et_method is not None:
+            forcing["pet"] = potential_et_timeseries(
+                et_method, forcing["t_mean"], forcing["t_min"],
+                forcing["t_max"], latitude)
+        _forcing_cache[key] = (data, forcing)
+    return _forcing_cache[key][1]
+
+
+def potential_et_timeseries(et_method, t_mean, t_min, t_max, latitude):
+    """
+    Calculates the potential evapotranspiration for the whole temperature
+    timeseries at once.
+
+    :param et_method: name of the evapotranspiration method
+    :param t_mean: cmf.timeseries of the daily mean temperature
+    :param t_min: cmf.timeseries of the daily minimum temperature
+    :param t_max: cmf.timeseries of the daily maximum temperature
+    :param latitude: latitude of the catchment in degree
+    :return: cmf.timeseries of the potential evapotranspiration in mm/day
+    """
+    begin = t_mean.begin.AsDate()
+    doy = potential_et.day_of_year(begin.year, begin.month, begin.day,
+                                   len(t_mean))
+    pet = potential_et.calculate(
+        lookup.get_potential_evapotranspiration(et_method), doy,
+        np.array(t_mean), np.array(t_min), np.array(t_max), latitude)
+    return cmf.timeseries.from_array(t_mean.begin, cmf.day, pet)
+
+
+def clear_forcing_cache(data=None):
+    """
+    Removes the forcing of a catchment from the cache of this process, e.g.
+    when its search is done.
+
+    :param data: data dictionary of the catchment. None empties the whole
+    cache.
+    :return: None
+    """
+    for key in list(_forcing_cache):
+        if data is None or key[0] == id(data):
+            del _forcing_cache[key]
 
 
 def make_stations(project, prec, temp, temp_min, temp_max):
@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+A job queue in a shared directory, for clusters without MPI. The engine
+writes every job as a small file, any amount of worker processes on any
+node with access to the directory claim them and write the results back.
+
+Layout of the directory:
+    setup.pickle    generation, initializer and its arguments for the
+                    workers
+    pending/        jobs waiting for a worker
+    claimed/        jobs being worked on, named <job>@<worker>
+    results/        results waiting for the engine
+    tmp/            files being written
+    stop            exists when the engine is done
+
+Files are written to tmp first and then renamed, so nobody ever reads a
+half written file. A worker claims a job by renaming it from pending to
+claimed, which only one worker can do successfully. While working, the
+worker touches its claim regularly. Claims not touched for a while belong
+to dead workers (e.g. a crashed node) and are put back to pending by the
+engine. The clocks of the nodes have to be synchronized for this.
+
+Every engine starts a new generation of the queue: it removes the jobs and
+results left by an earlier engine and writes a new setup. The jobs carry
+the generation, so a worker that is still running reloads the setup when
+the first job of a new engine arrives.
+
+Start the workers with
+
+    acme-worker <directory>
+
+or python -m acme.file_queue <directory>.
+"""
+import os
+import sys
+import time
+import uuid
+import pickle
+import socket
+import argparse
+import threading
+import numpy as np
+from acme.scheduler import split_workers
+from acme.watchdog import SupervisedPool
+
+SUBDIRECTORIES = ["pending", "claimed", "results", "tmp"]
+
+
+def write_atomic(directory, path, content):
+    """
+    Pickles content to path. The file is written to the tmp folder first
+    and then renamed, so it appears complete or not at all.
+
+    :param directory: queue directory
+    :param path: final path of the file
+    :param content: picklable object
+    :return: None
+    """
+    temporary = os.path.join(directory, "tmp", uuid.uuid4().hex)
+    with open(temporary, "wb") as outfile:
+        pickle.dump(content, outfile)
+    os.rename(temporary, path)
+
+
+def read(path):
+    with open(path, "rb") as infile:
+        return pickle.load(infile)
+
+
+class FileScheduler:
+    """
+    Scheduler with the workers of a shared directory. Has the same interface
+    as scheduler.Scheduler.
+    """
+    def __init__(self, directory, workers, initializer=None, initargs=(),
+                 stale_after=300, max_retries=2, poll_interval=0.5):
+        """
+        :param directory: shared directory of the queue
+        :param workers: amount of worker processes expected to work on the
+        queue. Only used to split the work.
+        :param initializer: called once in every worker with initargs, e.g.
+        to hand over the data. Both have to be picklable.
+        :param initargs: arguments of initializer
+        :param stale_after: seconds after which a claim that was not touched
+        belongs to a dead worker
+        :param max_retries: how often a job of a dead worker is put back.
+        Afterwards it counts as failed.
+        :param poll_interval: seconds between looking for results
+        """
+        self.directory = directory
+        self.workers = workers
+        self.stale_after = stale_after
+        self.max_retries = max_retries
+        self.poll_interval = poll_interval
+        for subdirectory in SUBDIRECTORIES:
+            os.makedirs(os.path.join(directory, subdirectory), exist_ok=True)
+        self.remove_stale_files()
+        stop = os.path.join(directory, "stop")
+        if os.path.exists(stop):
+            os.remove(stop)
+        self.generation = uuid.uuid4().hex
+        write_atomic(directory, os.path.join(directory, "setup.pickle"),
+                     (self.generation, initializer, initargs))
+        # Latest counters sent by every worker
+        self.statistics = {}
+
+    def path(self, subdirectory, name):
+        return os.path.join(self.directory, subdirectory, name)
+
+    def remove_stale_files(self):
+        """
+        Removes the jobs, claims and results of an earlier engine and the
+        files in tmp older than stale_after, which were never finished.
+
+        :return: None
+        """
+        removed = 0
+        for subdirectory in SUBDIRECTORIES:
+            for name in os.listdir(os.path.join(self.directory,
+                                                subdirectory)):
+                path = self.path(subdirectory, name)
+                try:
+                    if (subdirectory == "tmp" and
+                            time.time() - os.path.getmtime(path) <=
+                            self.stale_after):
+                        continue
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        if removed:
+            print('Removed {} files of an earlier search from the '
+                  'queue'.format(removed), file=sys.stderr)
+
+    def plan(self, costs, max_share=None):
+        """
+        See scheduler.split_workers.
+        """
+        return split_workers(self.workers, costs, max_share)
+
+    def map(self, function, jobs, costs=None, timeouts=None):
+        """
+        Writes the jobs to the queue and waits for their results.
+
+        :param function: module level function with one argument
+        :param jobs: list of arguments for function
+        :param costs: expected costs of the jobs. If given, the workers
+        take the most expensive jobs first.
+        :param timeouts: list of timeouts in seconds for every job, after
+        which the worker gives up on it. None means no timeout.
+        :return: list of results in the order of jobs. Jobs that failed,
+        timed out or were lost too often return None.
+        """
+        order = list(range(len(jobs)))
+        if costs is not None:
+            order = list(np.argsort(-np.asarray(costs, dtype=float),
+                                    kind="stable"))
+        if timeouts is None:
+            timeouts = [None] * len(jobs)
+        batch = uuid.uuid4().hex[:12]
+        # Workers take the job with the lowest name first
+        names = {}
+        for position, index in enumerate(order):
+            name = "{:06d}_{}_{:06d}.job".format(position, batch, index)
+            names[name] = index
+            write_atomic(self.directory, self.path("pending", name),
+                         (self.generation, function, jobs[index],
+                          timeouts[index]))
+
+        results = [None] * len(jobs)
+        retries = {}
+        while names:
+            for name in list(names):
+                path = self.path("results", name)
+                if not os.path.exists(path):
+                    continue
+                message = read(path)
+                os.remove(path)
+                results[names.pop(name)] = message["result"]
+                self.statistics[message["worker"]] = message["statistics"]
+            for name in self.requeue_stale(batch):
+                retries[name] = retries.get(name, 0) + 1
+                if retries[name] > self.max_retries:
+                    print('Job {} lost too often, counts as '
+                          'failed'.format(name), file=sys.stderr)
+                    try:
+                        os.remove(self.path("pending", name))
+                    except FileNotFoundError:
+                        # Already claimed again, its result is ignored
+                        pass
+                    names.pop(name)
+            if names:
+                time.sleep(self.poll_interval)
+        self.remove_leftovers(batch)
+        return results
+
+    def requeue_stale(self, batch):
+        """
+        Puts the jobs of dead workers back to pending.
+
+        :param batch: only jobs of this batch are checked
+        :return: list of the names of the jobs put back
+        """
+        requeued = []
+        for claim in os.listdir(os.path.join(self.directory, "claimed")):
+            name, _, worker = claim.partition("@")
+            if batch not in name:
+                continue
+            path = self.path("claimed", claim)
+            try:
+                age = time.time() - os.path.getmtime(path)
+                if age > self.stale_after:
+                    os.rename(path, self.path("pending", name))
+                    print('Worker {} is dead, job {} is put back'.format(
+                        worker, name), file=sys.stderr)
+                    requeued.append(name)
+            except FileNotFoundError:
+                # The worker finished in the meantime
+                pass
+        return requeued
+
+    def remove_leftovers(self, batch):
+        """
+        Removes files of a finished batch, e.g. late results of jobs that
+        were already given up.
+        """
+        for subdirectory in ["pending", "claimed", "results"]:
+            for name in os.listdir(os.path.join(self.directory,
+                                                subdirectory)):
+                if batch in name:
+                    try:
+                        os.remove(self.path(subdirectory, name))
+                    except FileNotFoundError:
+                        pass
+
+    def report(self):
+        """
+        Returns the latest counters of every worker that sent a result, see
+        watchdog.SupervisedPool.report.
+        """
+        return [self.statistics[worker] for worker in sorted(self.statistics)]
+
+    def close(self):
+        """
+        Tells the workers that the engine is done.
+
+        :return: None
+        """
+        open(os.path.join(self.directory, "stop"), "w").close()
+
+
+class Heartbeat(threading.Thread):
+    """
+    Touches the claim of a worker regularly, so the engine knows it is
+    alive.
+    """
+    def __init__(self, path, interval):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                # Put back by the engine
+                return
+
+
+def claim(directory, worker):
+    """
+    Claims the pending job with the lowest name.
+
+    :param directory: queue directory
+    :param worker: name of the worker
+    :return: name of the job and path of the claim or (None, None)
+    """
+    for name in sorted(os.listdir(os.path.join(directory, "pending"))):
+        path = os.path.join(directory, "claimed", name + "@" + worker)
+        try:
+            os.rename(os.path.join(directory, "pending", name), path)
+        except FileNotFoundError:
+            # Another worker was faster
+            continue
+        # The claim is as old as the job file, so it has to be touched now
+        os.utime(path)
+        return name, path
+    return None, None
+
+
+def load_setup(directory, poll_interval, max_jobs, max_rss):
+    """
+    Waits for the setup of the engine and starts the worker process with
+    it.
+
+    :return: generation of the setup and SupervisedPool
+    """
+    setup = os.path.join(directory, "setup.pickle")
+    while not os.path.exists(setup):
+        time.sleep(poll_interval)
+    generation, initializer, initargs = read(setup)
+    return generation, SupervisedPool(1, initializer=initializer,
+                                      initargs=initargs, max_jobs=max_jobs,
+                                      max_rss=max_rss)
+
+
+def work(directory, poll_interval=0.5, heartbeat=30, idle_exit=None,
+         max_jobs=None, max_rss=None):
+    """
+    Runs jobs of the queue until the engine is done. Every job runs in a
+    supervised worker process (see watchdog.SupervisedPool), so a crashing
+    or hanging job only fails itself. A job of a new engine restarts the
+    worker process with the new setup.
+
+    :param directory: queue directory
+    :param poll_interval: seconds between looking for jobs
+    :param heartbeat: seconds between touching the claim of the current job.
+    Has to be well below the stale_after of the engine.
+    :param idle_exit: stop after this many seconds without a job. None
+    means only stop when the engine is done.
+    :param max_jobs: the worker process is recycled after this many jobs
+    :param max_rss: the worker process is recycled when its memory exceeds
+    this many bytes
+    :return: amount of jobs done
+    """
+    worker = "{}-{}".format(socket.gethostname(), os.getpid())
+    generation, pool = load_setup(directory, poll_interval, max_jobs,
+                                  max_rss)
+    done = 0
+    last_job = time.time()
+    try:
+        while True:
+            name, path = claim(directory, worker)
+            if name is None:
+                if os.path.exists(os.path.join(directory, "stop")):
+                    break
+                if (idle_exit is not None and
+                        time.time() - last_job > idle_exit):
+                    break
+                time.sleep(poll_interval)
+                continue
+            try:
+                job_generation, function, argument, timeout = read(path)
+            except FileNotFoundError:
+                # Put back by the engine in the meantime
+                continue
+            if job_generation != generation:
+                # A new engine started, the setup is written before its
+                # jobs
+                pool.close()
+                generation, pool = load_setup(directory, poll_interval,
+                                              max_jobs, max_rss)
+            beat = Heartbeat(path, heartbeat)
+            beat.start()
+            result = pool.map(function, [argument], [timeout])[0]
+            beat.finished.set()
+            statistics = pool.report()[0]
+            statistics["worker"] = worker
+            write_atomic(directory, os.path.join(directory, "results", name),
+                         {"result": result, "worker": worker,
+                          "statistics": statistics})
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            done += 1
+            last_job = time.time()
+    finally:
+        pool.close()
+    return done
+
+
+def main(args=None):
+    """
+    Entry point of acme-worker.
+    """
+    parser = argparse.ArgumentParser(
+        description="Works on the jobs of an ACME search in a shared "
+                    "directory.")
+    parser.add_argument("directory", help="directory of the queue")
+    parser.add_argument("--poll-interval", type=float, default=0.5,
+                        help="seconds between looking for jobs")
+    parser.add_argument("--heartbeat", type=float, default=30,
+                        help="seconds between signs of life")
+    parser.add_argument("--idle-exit", type=float, default=None,
+                        help="stop after this many seconds without a job")
+    parser.add_argument("--max-jobs", type=int, default=None,
+                        help="recycle the worker process after this many "
+                             "jobs")
+    parser.add_argument("--max-rss", type=float, default=None,
+                        help="recycle the worker process above this many "
+                             "bytes of memory")
+    options = parser.parse_args(args)
+    done = work(options.directory, options.poll_interval, options.heartbeat,
+                options.idle_exit, options.max_jobs, options.max_rss)
+    print("Worker finished after {} jobs".format(done))
+
+
+if __name__ == '__main__':
+    main()
@@ -54,9 +54,57 @@ class Strategies(Enum):
     crossover = 2
 
 
+class _Pending:
+    """
+    Placeholder for the fitness of a genotype, which is determined later
+    together with the rest of its generation.
+    """
+    def __init__(self, genes):
+        self.genes = genes
+
+
+class _Batch:
+    """
+    Fitness function, which defers the genotypes of a generation while it
+    is open and determines their fitness together with get_fitnesses.
+    """
+    def __init__(self, get_fitness, get_fitnesses):
+        self.get_fitness = get_fitness
+        self.get_fitnesses = get_fitnesses
+        self.open = False
+        self.pending = []
+
+    def __call__(self, genes):
+        if not self.open:
+            return self.get_fitness(genes)
+        pending = _Pending(genes)
+        self.pending.append(pending)
+        return pending
+
+    def resolve(self, chromosomes):
+        """
+        Determines the fitness of all deferred genotypes and closes the
+        generation.
+
+        :param chromosomes: Chromosome objects that might have a deferred
+        fitness
+        :return: None
+        """
+        fitnesses = self.get_fitnesses([pending.genes
+                                        for pending in self.pending])
+        found = {id(pending): fitness
+                 for pending, fitness in zip(self.pending, fitnesses)}
+        for chromosome in chromosomes:
+            if isinstance(chromosome.fitness, _Pending):
+                chromosome.fitness = found[id(chromosome.fitness)]
+        self.pending = []
+        self.open = False
+
+
 def get_best(get_fitness, target_len, optimal_fitness, gene_set, display,
              custom_mutate=None, custom_create=None, max_age=None,
-             pool_size=1, crossover=None, max_seconds=None):
+             pool_size=1, crossover=None, max_seconds=None,
+             get_fitnesses=None):
     """
     Reusable genetic engine to find the best solution for a given fitness.
     Responsible for displaying improvements and breaking the loop.
@@ -75,8 +123,16 @@ def get_best(get_fitness, target_len, optimal_fitness, gene_set, display,
     :param crossover: Function which defines how the crossover should
     happen. Is not directly implemented here, as it is very project specific
     :param max_seconds: Maximum time before timeout
+    :param get_fitnesses: Function which determines the fitness of a list
+    of genotypes at once. If given, every parent of the pool gets a child
+    before their fitness is determined together (e.g. on several workers)
+    and the children are then compared with their parents one by one.
     :return: The best found solution
     """
+    batch = None
+    if get_fitnesses is not None:
+        batch = _Batch(get_fitness, get_fitnesses)
+        get_fitness = batch
     # Switch between different mutating behaviours
     if custom_mutate is None:
         def fn_mutate(parent):
@@ -125,7 +181,7 @@ def get_best(get_fitness, target_len, optimal_fitness, gene_set, display,
     for timed_out, improvement in _get_improvement(fn_new_child,
                                                    fn_generate_parent,
                                                    max_age, pool_size,
-                                                   max_seconds):
+                                                   max_seconds, batch):
         # If the maximal time is used up, the best improvement so far is
         # returned
         if timed_out:
@@ -142,7 +198,7 @@ def get_best(get_fitness, target_len, optimal_fitness, gene_set, display,
 
 
 def _get_improvement(new_child, generate_parent, max_age, pool_size,
-                     max_seconds):
+                     max_seconds, batch=None):
     """
     Responsible for generating successively better gene sequences,
     which will be send back with yield.
@@ -153,6 +209,8 @@ def _get_improvement(new_child, generate_parent, max_age, pool_size,
     Needed for simulated annealing.
     :param pool_size: Amount of parents, for crossover
     :param max_seconds: Maximum time before timeout
+    :param batch: If given, the children of a generation are created with
+    this _Batch as fitness function and are evaluated together
     :return: Chromosome object of improved genotype
     """
     # Start a timer to know when the maximal time is reached.
@@ -190,52 +248,78 @@ def _get_improvement(new_child, generate_parent, max_age, pool_size,
         # check if the maximal time is reached.
         if max_seconds is not None and time.time() - start_time > max_seconds:
             yield True, best_parent
-        p_index = p_index - 1 if p_index > 0 else last_parent_index
-        parent = parents[p_index]
-        child = new_child(parent, p_index, parents)
-        # Try again if the best parent is better then the child
-        if parent.fitness > child.fitness:
-            if max_age is None:
-                continue
-            parent.age += 1
-            if max_age > parent.age:
+        if batch is None:
+            p_index = p_index - 1 if p_index > 0 else last_parent_index
+            parent = parents[p_index]
+            generation = [(p_index, parent,
+                           new_child(parent, p_index, parents))]
+        else:
+            generation = _new_generation(new_child, parents, batch)
+        for p_index, parent, child in generation:
+            # Try again if the best parent is better then the child
+            if parent.fitness > child.fitness:
+                if max_age is None:
+                    continue
+                parent.age += 1
+                if max_age > parent.age:
+                    continue
+                # Searches for child.fitness in historical fitnesses and
+                # returns its index
+                index = bisect_left(historical_fitnesses, child.fitness, 0,
+                                    len(historical_fitnesses))
+                # Comparison of how high the current genotype is ranked in the
+                # historical fitnesses
+                difference = len(historical_fitnesses) - index
+                # change the difference to a proportion
+                proportion_similar = difference / len(historical_fitnesses)
+                # Randomly decided to make the child a new parent or generate a
+                # new parent. exp(-proportion_similar) generates values between
+                # 0.36 (fitness close to best fitness) and 1 (fitness far away
+                # from best fitness)
+                if random.random() < exp(-proportion_similar):
+                    parents[p_index] = child
+                    continue
+                parents[p_index] = best_parent
+                parent.age = 0
                 continue
-            # Searches for child.fitness in historical fitnesses and returns
-            #  its index
-            index = bisect_left(historical_fitnesses, child.fitness, 0,
-                                len(historical_fitnesses))
-            # Comparison of how high the current genotype is ranked in the
-            # historical fitnesses
-            difference = len(historical_fitnesses) - index
-            # change the difference to a proportion
-            proportion_similar = difference / len(historical_fitnesses)
-            # Randomly decided to make the child a new parent or generate a
-            # new parent. exp(-proportion_similar) generates values between
-            # 0.36 (fitness close to best fitness) and 1 (fitness far away
-            # from best fitness)
-            if random.random() < exp(-proportion_similar):
+            # This if is used to retain children which have the same fitness as
+            # the parent. It if implement this way to avoid having to write an
+            # __eq__ function. But as the child is not better than the parent
+            # it is not returned but only used for further mutation.
+            if not child.fitness > parent.fitness:
+                child.age = parent.age + 1
                 parents[p_index] = child
                 continue
-            parents[p_index] = best_parent
-            parent.age = 0
-            continue
-        # This if is used to retain children which have the same fitness as
-        # the parent. It if implement this way to avoid having to write an
-        # __eq__ function. But as the child is not better than the parent
-        # it is not returned but only used for further mutation.
-        if not child.fitness > parent.fitness:
-            child.age = parent.age + 1
             parents[p_index] = child
-            continue
-        parents[p_index] = child
-        parent.age = 0
-        # Return the child if it better than the best parent so far.
-        if child.fitness > best_parent.fitness:
-            # Here False can be returned as default, as we have already
-            # check when we find a new best parent.
-            yield False, child
-            best_parent = child
-            historical_fitnesses.append(child.fitness)
+            parent.age = 0
+            # Return the child if it better than the best parent so far.
+            if child.fitness > best_parent.fitness:
+                # Here False can be returned as default, as we have already
+                # check when we find a new best parent.
+                yield False, child
+                best_parent = child
+                historical_fitnesses.append(child.fitness)
+
+
+def _new_generation(new_child, parents, batch):
+    """
+    Creates a child of every parent in the pool and determines the fitness
+    of all of them together.
+
+    :param new_child: Mutate function
+    :param parents: Pool of parents
+    :param batch: _Batch used as fitness function by new_child
+    :return: list of the index of the parent, the parent and its child
+    """
+    batch.open = True
+    generation = []
+    for p_index in reversed(range(len(parents))):
+        parent = parents[p_index]
+        generation.append((p_index, parent,
+                           new_child(parent, p_index, parents)))
+    # A crossover might have replaced a parent by a new one
+    batch.resolve([child for _, _, child in generation] + parents)
+    return generation
 
 
 def _generate_parent(length, gene_set, get_fitness):
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Runs the jobs of the structure search on several MPI ranks, e.g. on the
+nodes of a cluster. Rank 0 runs the genetic engine and hands the jobs out,
+all other ranks evaluate them. Every rank starts the same script, so the
+data is loaded by every rank itself and only the jobs and their results are
+sent.
+
+The ranks get their jobs one at a time: a rank that returns a result gets
+the most expensive job left, so faster ranks simply take more jobs. The
+results are stored on rank 0 only, so its cache of calculated structures is
+the complete one.
+
+Test it locally with e.g.
+
+    mpirun -n 4 python my_search.py
+
+Requires mpi4py. Without it, only a communicator with the same interface
+can be passed (e.g. for testing).
+
+A job that raises sends the error back instead of a result, so rank 0 can
+tell an error in the setup of a rank from a failed simulation.
+"""
+import os
+import sys
+import time
+import numpy as np
+from acme.scheduler import split_workers
+from acme.watchdog import get_rss
+try:
+    from mpi4py import MPI
+    ANY_SOURCE = MPI.ANY_SOURCE
+    ANY_TAG = MPI.ANY_TAG
+except ImportError:
+    MPI = None
+    ANY_SOURCE = -1
+    ANY_TAG = -1
+
+# Message tags
+JOB = 1
+RESULT = 2
+STOP = 3
+
+
+class MPIScheduler:
+    """
+    Scheduler with the MPI ranks except rank 0 as workers. Has the same
+    interface as scheduler.Scheduler.
+    """
+    def __init__(self, initializer=None, initargs=(), comm=None):
+        """
+        :param initializer: called once on every evaluating rank with
+        initargs, e.g. to hand over the data
+        :param initargs: arguments of initializer
+        :param comm: MPI communicator, default is COMM_WORLD
+        """
+        if comm is None:
+            if MPI is None:
+                raise ImportError("The MPI backend needs mpi4py")
+            comm = MPI.COMM_WORLD
+        self.comm = comm
+        self.rank = self.comm.Get_rank()
+        self.workers = self.comm.Get_size() - 1
+        if self.workers < 1:
+            raise ValueError("The MPI backend needs at least two ranks, got "
+                             "{}".format(self.comm.Get_size()))
+        self.initializer = initializer
+        self.initargs = initargs
+        self.closed = False
+        # Counters of every evaluating rank
+        self.statistics = [{"jobs": 0, "failed": 0, "busy": 0.0,
+                            "rss": float("nan"), "peak_rss": float("nan")}
+                           for _ in range(self.workers)]
+
+    @property
+    def is_master(self):
+        return self.rank == 0
+
+    def plan(self, costs, max_share=None):
+        """
+        See scheduler.split_workers.
+        """
+        return split_workers(self.workers, costs, max_share)
+
+    def serve(self):
+        """
+        Loop of the evaluating ranks. Runs the jobs received from rank 0
+        until it sends the signal to stop. If the initializer fails, every
+        job returns its error.
+
+        :return: None
+        """
+        setup_error = None
+        if self.initializer is not None:
+            try:
+                self.initializer(*self.initargs)
+            except Exception as error:
+                setup_error = 'Setup of rank {} failed: {}: {}'.format(
+                    self.rank, type(error).__name__, error)
+                print(setup_error, file=sys.stderr)
+        while True:
+            # Rank 0 sends None with the STOP tag
+            message = self.comm.recv(source=0, tag=ANY_TAG)
+            if message is None:
+                break
+            index, function, argument = message
+            start_time = time.time()
+            result = None
+            failure = setup_error
+            if failure is None:
+                try:
+                    result = function(argument)
+                except Exception as error:
+                    # Like a crashed worker, the job counts as failed
+                    failure = '{}: {}'.format(type(error).__name__, error)
+            self.comm.send((self.rank, index, result, failure,
+                            time.time() - start_time, get_rss(os.getpid())),
+                           dest=0, tag=RESULT)
+
+    def map(self, function, jobs, costs=None, timeouts=None):
+        """
+        Runs function for every job on the evaluating ranks.
+
+        :param function: module level function with one argument
+        :param jobs: list of arguments for function
+        :param costs: expected costs of the jobs. If given, the jobs are
+        handed out longest expected first.
+        :param timeouts: not supported by MPI, only accepted for the same
+        interface as scheduler.Scheduler.map. Hanging simulations have to
+        be stopped by the timeout of the model template.
+        :return: list of results in the order of jobs. Jobs which raised an
+        error return None, their errors are printed.
+        """
+        order = list(range(len(jobs)))
+        if costs is not None:
+            order = list(np.argsort(-np.asarray(costs, dtype=float),
+                                    kind="stable"))
+        results = [None] * len(jobs)
+        waiting = list(reversed(order))
+        busy = 0
+        # Every rank gets a first job
+        for rank in range(1, self.workers + 1):
+            if not waiting:
+                break
+            index = waiting.pop()
+            self.comm.send((index, function, jobs[index]), dest=rank, tag=JOB)
+            busy += 1
+        # Then each rank gets the next job as soon as it returns a result
+        while busy:
+            rank, index, result, failure, wall_time, rss = self.comm.recv(
+                source=ANY_SOURCE, tag=RESULT)
+            busy -= 1
+            results[index] = result
+            statistics = self.statistics[rank - 1]
+            statistics["jobs"] += 1
+            statistics["busy"] += wall_time
+            if failure is not None:
+                print('Job {} failed on rank {}: {}'.format(index, rank,
+                                                           failure),
+                      file=sys.stderr)
+            if result is None:
+                statistics["failed"] += 1
+            statistics["rss"] = rss
+            if not statistics["peak_rss"] >= rss:
+                statistics["peak_rss"] = rss
+            if waiting:
+                index = waiting.pop()
+                self.comm.send((index, function, jobs[index]), dest=rank,
+                               tag=JOB)
+                busy += 1
+        return results
+
+    def report(self):
+        """
+        Returns the counters of every evaluating rank with the same keys as
+        watchdog.SupervisedPool.report. Recycling, timeouts and restarts do
+        not exist with MPI and are always 0, startup times are NaN.
+        """
+        report = []
+        for statistics in self.statistics:
+            entry = dict(statistics)
+            entry.update({"recycled": 0, "timeouts": 0, "crashes": 0,
+                          "restarts": 0, "startup": float("nan"),
+                          "server_startup": float("nan")})
+            report.append(entry)
+        return report
+
+    def close(self):
+        """
+        Stops the evaluating ranks. Only does something on rank 0.
+
+        :return: None
+        """
+        if self.closed or not self.is_master:
+            return
+        for rank in range(1, self.workers + 1):
+            self.comm.send(None, dest=rank, tag=STOP)
+        self.closed = True
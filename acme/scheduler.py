@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Splits a fixed amount of worker processes between the structures waiting
+for their evaluation and the parameter sets within each structure.
+
+Early in the search there are many structures (e.g. the initial pool), so
+every structure gets one worker and several structures run at once. Late in
+the search only one or a few structures are evaluated at a time, so each
+gets several workers and its parameter sets are split between them. The
+more expensive a structure is expected to be, the more workers it gets.
+
+All work runs in one supervised pool of processes (see
+watchdog.SupervisedPool), so a crashing or hanging job does not stop the
+others. A structure with several workers is split into as many jobs as it
+has workers. The jobs are handed out longest
+expected first: every free worker takes the most expensive job left, so
+the short jobs fill the gaps at the end instead of a long job starting
+last.
+
+SingleFlight makes sure that a structure requested again while it is still
+evaluated is not evaluated twice.
+"""
+import threading
+from concurrent.futures import Future
+import numpy as np
+from acme.watchdog import SupervisedPool
+
+
+def split_workers(workers, costs, max_share=None):
+    """
+    Decides how many workers each waiting task gets.
+
+    If there are at least as many tasks as workers, every task gets one
+    worker and they are queued. Otherwise every task gets one worker and
+    the remaining workers are given to the tasks in proportion to their
+    cost.
+
+    :param workers: amount of available workers
+    :param costs: list of the expected costs of the waiting tasks
+    :param max_share: maximal amount of workers for a single task, e.g. the
+    amount of parameter sets of a structure. None means no limit.
+    :return: list with the amount of workers of every task
+    """
+    costs = np.asarray(costs, dtype=float)
+    shares = np.ones(len(costs), dtype=int)
+    if len(costs) >= workers:
+        return shares.tolist()
+
+    limit = workers if max_share is None else max(1, max_share)
+    weights = np.where(costs > 0, costs, 0) + 1e-12
+    for _ in range(workers - len(costs)):
+        # Give the next worker to the task with the highest cost per worker,
+        # as long as it can still use one
+        open_tasks = shares < limit
+        if not open_tasks.any():
+            break
+        load = np.where(open_tasks, weights / shares, -np.inf)
+        shares[np.argmax(load)] += 1
+    return shares.tolist()
+
+
+class Scheduler:
+    """
+    A pool of worker processes and the plan how to split them.
+    """
+    def __init__(self, workers, initializer=None, initargs=(), isolate=False,
+                 max_jobs=None, max_rss=None, fork_server=False, preload=()):
+        """
+        :param workers: amount of worker processes
+        :param initializer: called once in every worker process with
+        initargs, e.g. to hand over the data. With the fork start method
+        initargs do not need to be picklable.
+        :param initargs: arguments of initializer
+        :param isolate: Use a worker process even for a single worker.
+        Otherwise a single worker runs in this process.
+        :param max_jobs: a worker process is recycled after this many jobs
+        :param max_rss: a worker process is recycled when its memory
+        exceeds this many bytes
+        :param fork_server: Fork the worker processes from a server, which
+        already imported the modules in preload and ran the initializer
+        :param preload: names of the modules to import in the fork server
+        """
+        self.workers = workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self.isolate = isolate
+        self.max_jobs = max_jobs
+        self.max_rss = max_rss
+        self.fork_server = fork_server
+        self.preload = preload
+        # The pool (and its fork server) is created right away, while this
+        # process has only one thread. Searches sharing the scheduler run
+        # in their own threads (see multi_catchment).
+        self.pool = None
+        if workers > 1 or isolate:
+            self.pool = SupervisedPool(max(workers, 1),
+                                       initializer=initializer,
+                                       initargs=initargs,
+                                       max_jobs=max_jobs, max_rss=max_rss,
+                                       fork_server=fork_server,
+                                       preload=preload)
+        # Only used without worker processes
+        self.lock = threading.Lock()
+        self.initialized = False
+
+    def plan(self, costs, max_share=None):
+        """
+        See split_workers.
+        """
+        return split_workers(self.workers, costs, max_share)
+
+    def map(self, function, jobs, costs=None, timeouts=None):
+        """
+        Runs function for every job in the worker processes.
+
+        :param function: module level function with one argument
+        :param jobs: list of arguments for function
+        :param costs: expected costs of the jobs. If given, the jobs are
+        handed out longest expected first.
+        :param timeouts: list of timeouts in seconds for every job, after
+        which its worker is replaced. None means no timeout.
+        :return: list of results in the order of jobs. Jobs whose worker
+        crashed, hung or raised an error return None. Several threads may
+        call map at the same time and share the workers.
+        """
+        # A single worker runs in this process
+        if self.workers <= 1 and not self.isolate:
+            order = list(range(len(jobs)))
+            if costs is not None:
+                order = list(np.argsort(-np.asarray(costs, dtype=float),
+                                        kind="stable"))
+            results = [None] * len(jobs)
+            with self.lock:
+                if self.initializer is not None and not self.initialized:
+                    self.initializer(*self.initargs)
+                    self.initialized = True
+            for index in order:
+                results[index] = function(jobs[index])
+            return results
+        if self.pool is None:
+            raise RuntimeError("The scheduler is closed")
+        # Every worker takes the most expensive job left as soon as it is
+        # free, also between the jobs of several threads
+        priorities = None
+        if costs is not None:
+            priorities = [-float(cost) for cost in costs]
+        return self.pool.map(function, jobs, timeouts, priorities)
+
+    def report(self):
+        """
+        Returns the counters of every worker process, see
+        SupervisedPool.report.
+        """
+        if self.pool is None:
+            return []
+        return self.pool.report()
+
+    def close(self):
+        """
+        Stops the worker processes.
+
+        :return: None
+        """
+        if self.pool is not None:
+            self.pool.close()
+        self.pool = None
+
+
+class SingleFlight:
+    """
+    Registry of the evaluations in flight. The first request for a key
+    starts the evaluation, later requests for the same key wait for its
+    result instead of evaluating again (they are coalesced).
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        # Amount of requests that waited for another one
+        self.coalesced = 0
+
+    def claim(self, key):
+        """
+        Registers a request for key.
+
+        :param key: hashable key of the evaluation
+        :return: Future of the result and True, if the caller is the first
+        and has to evaluate and resolve (or fail) the key
+        """
+        with self.lock:
+            if key in self.in_flight:
+                self.coalesced += 1
+                return self.in_flight[key], False
+            future = Future()
+            self.in_flight[key] = future
+            return future, True
+
+    def resolve(self, key, result):
+        """
+        Hands the result of an evaluation to all waiting requests.
+
+        :return: None
+        """
+        with self.lock:
+            future = self.in_flight.pop(key)
+        future.set_result(result)
+
+    def fail(self, key, error):
+        """
+        Hands the error of an evaluation to all waiting requests.
+
+        :return: None
+        """
+        with self.lock:
+            future = self.in_flight.pop(key)
+        future.set_exception(error)
+
+    def do(self, key, function):
+        """
+        Calls function, unless an evaluation of key is already in flight.
+        Then its result is returned.
+
+        :param key: hashable key of the evaluation
+        :param function: callable without arguments
+        :return: result of function
+        """
+        future, first = self.claim(key)
+        if not first:
+            return future.result()
+        try:
+            result = function()
+        except BaseException as error:
+            self.fail(key, error)
+            raise
+        self.resolve(key, result)
+        return result
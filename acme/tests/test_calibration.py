@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+import numpy as np
+import acme.cmf_model_generators.calibration as calibration
+
+
+class CalibrationTests(unittest.TestCase):
+    def test_trace(self):
+        """
+        Tests if the trace holds the best value so far after every
+        evaluation and ignores failed runs.
+
+        :return: None
+        """
+        trace = calibration.ConvergenceTrace()
+        for objective in [0.2, np.nan, 0.1, 0.5, 0.4]:
+            trace.record(objective)
+        summary = trace.summary()
+        print("\n test_trace")
+        print(summary)
+        self.assertTrue(summary["trace"] == [0.2, 0.2, 0.2, 0.5, 0.5]
+                        and
+                        summary["best"] == 0.5
+                        and
+                        summary["evaluations"] == 5
+                        and
+                        not summary["stopped"])
+
+    def test_stall(self):
+        """
+        Tests if the calibration stops after the given amount of
+        evaluations without an improvement large enough and ignores the
+        evaluations afterwards.
+
+        :return: None
+        """
+        trace = calibration.ConvergenceTrace(stall_evaluations=3,
+                                             min_improvement=0.01)
+        for objective in [0.2, 0.5, 0.505, 0.3, 0.4, 0.9]:
+            trace.record(objective)
+        print("\n test_stall")
+        print(trace.summary())
+        self.assertTrue(trace.stopped
+                        and
+                        trace.summary()["evaluations"] == 5
+                        and
+                        trace.best_objective() == 0.505)
+
+    def test_no_success(self):
+        """
+        Tests if a calibration without a successful run has no best value.
+
+        :return: None
+        """
+        trace = calibration.ConvergenceTrace()
+        trace.record(np.nan)
+        print("\n test_no_success")
+        print(trace.summary())
+        self.assertTrue(np.isnan(trace.best_objective()))
+
+    def test_sample_options(self):
+        """
+        Tests if a budget too small for an algorithm is refused and if the
+        settings of the algorithm are sized to the budget.
+
+        :return: None
+        """
+        with self.assertRaises(ValueError):
+            calibration.sample_options("sceua", 10, 5)
+        options = calibration.sample_options("sceua", 100, 5)
+        sampling = calibration.sample_options("lhs", 10, 5)
+        print("\n test_sample_options")
+        print(options, sampling)
+        self.assertTrue(options == {"ngs": 4}
+                        and
+                        sampling == {})
+
+    def test_sampler_objective(self):
+        """
+        Tests if failed runs get the worst objective function of maximizing
+        and minimizing algorithms.
+
+        :return: None
+        """
+        print("\n test_sampler_objective")
+        self.assertTrue(calibration.sampler_objective(np.nan, False) ==
+                        -np.inf
+                        and
+                        calibration.sampler_objective(np.nan, True) == np.inf
+                        and
+                        calibration.sampler_objective(0.5, True) == -0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
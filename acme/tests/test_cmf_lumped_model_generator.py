@@ -5,9 +5,13 @@ Created on Aug 17 14:17 2017
 """
 import unittest
 from acme.cmf_model_generators import create_lumped_CMF_model as generator
+from acme.cmf_model_generators import multi_catchment
 import acme.genetics as genetics
 import datetime
 import math
+import os
+import tempfile
+import numpy as np
 import utilities_for_tests as utils
 
 
@@ -156,26 +160,302 @@ class GeneratorsTests(unittest.TestCase):
                   "{}".format(set(self.gene_set) - set(genes)))
             self.assertTrue(False)
 
+    def test_writers(self):
+        """
+        Tests if every writer creates one file with its header and one row
+        per entry of a populated search state.
+
+        :return: None
+        """
+        state = generator.search_state.SearchState()
+        structures = ["snow tr_first_out",
+                      "second tr_first_second tr_second_river"]
+        trace = generator.calibration.ConvergenceTrace(stall_evaluations=2)
+        for objective in [0.3, 0.5, 0.4, 0.2]:
+            trace.record(objective)
+        levels = generator.FidelityLevels(
+            [(datetime.datetime(1980, 1, 1), datetime.datetime(1980, 12, 31)),
+             (datetime.datetime(1980, 1, 1), datetime.datetime(1982, 12, 31))])
+        cost_keys = ["objective", "runs", "timeouts", "steps",
+                     "rhs_evaluations", "failed_steps", "nonlinear_iterations",
+                     "wall_time", "seconds_per_year"]
+        for genes in structures:
+            state.models_so_far[genes] = 0.7
+            state.validation_results[genes] = [(0.78, 0.65, {"ETV1": 60.})]
+            state.structure_costs[genes] = dict((key, 1.0)
+                                                for key in cost_keys)
+            state.runtime_predictions[genes] = {"predicted": 3.0,
+                                                "actual": 2.5}
+            state.timeout_statistics[genes] = {"timeout": 12.5,
+                                               "timeouts": 1}
+            state.convergence[genes] = trace.summary()
+            levels.promote(genes, 0, 0.4, 1.0)
+            levels.record(genes, 0.6, 10.0)
+        state.screened_structures[structures[0]] = 0
+        report = [{"jobs": 4, "failed": 1, "recycled": 0, "timeouts": 0,
+                   "crashes": 1, "restarts": 1, "rss": 1e8, "peak_rss": 2e8,
+                   "startup": 0.01, "server_startup": 2.5}] * 3
+
+        # Writer, header and amount of rows
+        writers = [
+            (lambda directory: generator.write_all_models(state),
+             "Like, Screened, Genes", 2),
+            (lambda directory: generator.write_validation_results(state),
+             "Calibration, Validation, Genes", 2),
+            (lambda directory: generator.write_structure_costs(state),
+             ", ".join(cost_keys) + ", Genes", 2),
+            (lambda directory: generator.write_runtime_predictions(state),
+             "Predicted, Actual, Genes", 2),
+            (lambda directory: generator.write_timeouts(state),
+             "Timeout, Timeouts, Genes", 2),
+            (lambda directory: generator.write_convergence(state),
+             "Evaluations, Stalled, Best, Trace, Genes", 2),
+            (lambda directory: generator.write_fidelity_levels(state,
+                                                               levels),
+             "Begin, End, Evaluated, Screened, Correlation, Seconds, "
+             "Full Seconds, Saved Seconds", 2),
+            (lambda directory: generator.write_worker_report(
+                report, directory=directory),
+             "Worker, jobs, failed, recycled, timeouts, crashes, restarts, "
+             "rss, peak_rss, startup, server_startup", 3)]
+        print("\n test_writers")
+        for write, header, rows in writers:
+            with self.subTest(header=header), \
+                    tempfile.TemporaryDirectory() as directory:
+                state.output_directory = directory
+                write(directory)
+                files = os.listdir(directory)
+                with open(os.path.join(directory, files[0])) as infile:
+                    lines = infile.read().splitlines()
+                print(files[0], len(lines) - 1)
+                self.assertTrue(len(files) == 1
+                                and
+                                lines[0] == header
+                                and
+                                len(lines) - 1 == rows)
+
+    def test_select_best_parameter_sets(self):
+        """
+        Tests if the best parameter sets are selected from a spotpy like
+        result array and failed runs (NaN) are ranked last.
+
+        :return: None
+        """
+        results = np.array([(0.2, 1.0, 10.), (np.nan, 2.0, 20.),
+                            (0.7, 3.0, 30.), (0.5, 4.0, 40.)],
+                           dtype=[("like1", float), ("parETV1", float),
+                                  ("partr_first_out", float)])
+        best_sets = generator.select_best_parameter_sets(results, 3)
+        print("\n test_select_best_parameter_sets")
+        print(best_sets)
+        self.assertTrue([like for like, params in best_sets] ==
+                        [0.7, 0.5, 0.2]
+                        and
+                        best_sets[0][1] == {"ETV1": 3.0,
+                                            "tr_first_out": 30.})
+
+    def test_separate_search_states(self):
+        """
+        Tests if the results of one search are not known to another one.
+
+        :return: None
+        """
+        genes = ["snow", "tr_first_out"]
+        results = np.array([(0.4, 1.0), (0.6, 2.0)],
+                           dtype=[("like1", float), ("parETV1", float)])
+        first = generator.search_state.SearchState()
+        second = generator.search_state.SearchState()
+        fitness = generator.store_fitness(first, genes, results)
+        print("\n test_separate_search_states")
+        print(fitness, first.models_so_far, second.models_so_far)
+        self.assertTrue(fitness == 0.6
+                        and
+                        generator.known_fitness(first, genes, genes) == 0.6
+                        and
+                        generator.known_fitness(second, genes, genes) is None)
+
+    def test_create_generators(self):
+        """
+        Tests if every catchment gets its own generator with its own output
+        directory, search state and worker setup.
+
+        :return: None
+        """
+        precipitation, temperature_avg, temperature_min, \
+            temperature_max, discharge = utils.load_data(
+                "observed_discharge.txt",
+                "temperature_max_min_avg.txt",
+                "precipitation.txt",
+                2976.41
+            )
+        catchments = [{"name": name,
+                       "begin_calibration": datetime.datetime(1980, 1, 1),
+                       "end_calibration": datetime.datetime(1981, 12, 31),
+                       "begin_validation": datetime.datetime(1982, 1, 1),
+                       "end_validation": datetime.datetime(1983, 12, 31),
+                       "prec": precipitation, "discharge": discharge,
+                       "t_mean": temperature_avg, "t_min": temperature_min,
+                       "t_max": temperature_max}
+                      for name in ["upper", "lower"]]
+        with tempfile.TemporaryDirectory() as directory:
+            generators = multi_catchment.create_generators(
+                catchments, 2, directory, optimal_fitness=0.5)
+            directories = [os.path.basename(search.state.output_directory)
+                           for search in generators]
+            created = sorted(os.listdir(directory))
+            with self.assertRaises(ValueError):
+                multi_catchment.create_generators(catchments[:1] * 2, 2,
+                                                  directory,
+                                                  optimal_fitness=0.5)
+        setups = [search.worker_setup() for search in generators]
+        print("\n test_create_generators")
+        print(directories, created)
+        self.assertTrue(directories == ["upper", "lower"]
+                        and
+                        created == ["lower", "upper"]
+                        and
+                        setups[0][0] != setups[1][0]
+                        and
+                        all(search.workers == 2 for search in generators))
+
+    def test_same_search_name(self):
+        """
+        Tests if a generator built the same way in another process (e.g. on
+        another MPI rank) evaluates the jobs of the first one with its own
+        worker setup.
+
+        :return: None
+        """
+        def build():
+            # Every rank loads the data itself
+            precipitation, temperature_avg, temperature_min, \
+                temperature_max, discharge = utils.load_data(
+                    "observed_discharge.txt",
+                    "temperature_max_min_avg.txt",
+                    "precipitation.txt",
+                    2976.41
+                )
+            return generator.LumpedCMFGenerator(
+                datetime.datetime(1980, 1, 1), datetime.datetime(1980, 12, 31),
+                datetime.datetime(1981, 1, 1), datetime.datetime(1981, 12, 31),
+                0.5, precipitation, discharge, temperature_avg,
+                temperature_min, temperature_max)
+
+        master = build()
+        structure = ["tr_first_out"]
+        vectors = np.full((2, len(generator.template.LumpedModelCMF.
+                                  create_params_from_genes(structure))), 1.5)
+        job = (master.state.name, structure, vectors, None)
+        master.clear_caches()
+
+        worker = build()
+        generator.init_worker(*worker.worker_setup())
+        found = job[0] in generator._worker_setup
+        results = generator.evaluate_chunk(job)["results"]
+        worker.clear_caches()
+        print("\n test_same_search_name")
+        print(master.state.name, worker.state.name)
+        self.assertTrue(master.state.name == worker.state.name
+                        and
+                        found
+                        and
+                        len(results) == 2)
+
+    def test_solve_closes_scheduler(self):
+        """
+        Tests if the scheduler of a search is closed when the search fails.
+
+        :return: None
+        """
+        precipitation, temperature_avg, temperature_min, \
+            temperature_max, discharge = utils.load_data(
+                "observed_discharge.txt",
+                "temperature_max_min_avg.txt",
+                "precipitation.txt",
+                2976.41
+            )
+
+        class FailingScheduler:
+            closed = False
+
+            def plan(self, costs, max_share=None):
+                raise RuntimeError("The workers are gone")
+
+            def close(self):
+                self.closed = True
+
+        scheduler = FailingScheduler()
+        with tempfile.TemporaryDirectory() as directory:
+            search = generator.LumpedCMFGenerator(
+                datetime.datetime(1980, 1, 1), datetime.datetime(1981, 12, 31),
+                datetime.datetime(1982, 1, 1), datetime.datetime(1983, 12, 31),
+                0.5, precipitation, discharge, temperature_avg,
+                temperature_min, temperature_max, workers=2,
+                output_directory=directory)
+            search.create_scheduler = lambda: scheduler
+            with self.assertRaises(RuntimeError):
+                search.solve()
+        print("\n test_solve_closes_scheduler")
+        self.assertTrue(scheduler.closed)
+
     @staticmethod
-    def test_write_all_models():
+    def test_failed_chunk():
+        """
+        Tests if the parameter sets of a crashed job count as failed runs.
+
+        :return: None
+        """
+        structure = ["tr_first_out"]
+        vectors = np.ones((3, len(generator.template.LumpedModelCMF.
+                                  create_params_from_genes(structure))))
+        results = generator.failed_chunk(structure, vectors)["results"]
+        assert len(results) == 3 and np.isnan(results["like1"]).all()
+
+    def test_summarize_run_statistics(self):
+        """
+        Tests if the run statistics are averaged and missing values (NaN)
+        are ignored.
+
+        :return: None
+        """
+        run_statistics = [
+            {"steps": 100, "rhs_evaluations": 300, "failed_steps": np.nan,
+             "nonlinear_iterations": 150, "wall_time": 2.0,
+             "seconds_per_year": 0.5},
+            {"steps": 300, "rhs_evaluations": 500, "failed_steps": np.nan,
+             "nonlinear_iterations": 250, "wall_time": 4.0,
+             "seconds_per_year": 1.0}]
+        summary = generator.summarize_run_statistics(run_statistics, 1)
+        print("\n test_summarize_run_statistics")
+        print(summary)
+        self.assertTrue(summary["runs"] == 2
+                        and
+                        summary["timeouts"] == 1
+                        and
+                        summary["steps"] == 200
+                        and
+                        summary["seconds_per_year"] == 0.75
+                        and
+                        np.isnan(summary["failed_steps"]))
+
+    def test_latin_hypercube(self):
         """
-        Tests if a file is written by calling the method write_all_models.
+        Tests if every stratum of every parameter range is used exactly
+        once.
 
         :return: None
         """
-        model_1 = ["snow", "second", "beta_second_river"]
-        model_1_str = " ".join(model_1)
-        model_1_like = 0.78
-        model_2 = ["canopy", "third"]
-        model_2_str = " ".join(model_2)
-        model_2_like = 0.71
-        models_so_far = generator.LumpedCMFGenerator.models_so_far
-        models_so_far[model_1_str] = model_1_like
-        models_so_far[model_2_str] = model_2_like
-        generator.write_all_models(test=True)
-        # Delete them again, to not cause trouble when the program itself runs
-        del models_so_far[model_1_str]
-        del models_so_far[model_2_str]
+        params = generator.template.LumpedModelCMF.create_params_from_genes(
+            ["tr_first_out", "snow_meltrate"])
+        samples = generator.latin_hypercube(params, 10,
+                                            np.random.RandomState(42))
+        print("\n test_latin_hypercube")
+        print(samples)
+        for i, param in enumerate(params):
+            position = ((samples[:, i] - param.minbound) /
+                        (param.maxbound - param.minbound))
+            self.assertEqual(sorted(np.floor(position * 10).astype(int)),
+                             list(range(10)))
 
     def test_get_fitness(self):
         """
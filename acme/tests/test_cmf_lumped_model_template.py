@@ -10,6 +10,7 @@ import copy
 import utilities_for_tests as utils
 import datetime
 import spotpy
+import numpy as np
 import acme.cmf_model_generators.cmf_descriptor as descriptor
 
 
@@ -118,6 +119,136 @@ class GeneratorsTemplate(unittest.TestCase):
         # Compare, should be equal
         self.assertTrue(acme_hash == bench_hash)
 
+    def test_preallocated_output(self):
+        """
+        Tests if the preallocated collection mode returns the outlet column
+        of the recorded buffer without copying it and records the chosen
+        storages in the other columns.
+
+        :return: None
+        """
+        model = GeneratorsTemplate.test_model_parametrization()
+        model.preallocate = True
+        model.record_nodes = ["snow", "second"]
+        simulation = model.simulation(
+            [param[0] for param in model.parameters()])
+
+        self.assertTrue(simulation.dtype == np.float64
+                        and
+                        model.recorded.shape == (len(simulation), 3)
+                        and
+                        np.shares_memory(simulation, model.recorded))
+
+    def test_streamed_objective(self):
+        """
+        Tests if a streamed run keeps no series and reaches the same
+        objective function as a recorded run.
+
+        :return: None
+        """
+        model = GeneratorsTemplate.test_model_parametrization()
+        model.preallocate = True
+        vector = [param[0] for param in model.parameters()]
+        evaluation = model.evaluation()
+        recorded = model.objectivefunction(model.simulation(vector),
+                                           evaluation)
+        model.stream_objective = True
+        model.observed = evaluation
+        simulation = model.simulation(vector)
+        streamed = model.objectivefunction(simulation, evaluation)
+        print("\n test_streamed_objective")
+        print(recorded, streamed)
+        self.assertTrue(len(simulation) == 0
+                        and
+                        np.isclose(recorded, streamed))
+
+    def test_pruning(self):
+        """
+        Tests if a run is stopped when it cannot reach the prune threshold
+        and if the counters of pruned runs and saved days are increased.
+
+        :return: None
+        """
+        model = GeneratorsTemplate.test_model_parametrization()
+        model.preallocate = True
+        model.prune = True
+        # No model reaches a NSE of 1, so every run has to be pruned
+        model.prune_threshold = 1.0
+        simulation = model.simulation(
+            [param[0] for param in model.parameters()])
+        print("\n test_pruning")
+        print("Days saved: " + str(model.days_saved))
+
+        self.assertTrue(model.last_run_pruned
+                        and
+                        model.pruned_runs == 1
+                        and
+                        model.days_saved > 0
+                        and
+                        np.isnan(simulation).all())
+
+    def test_spin_up(self):
+        """
+        Tests if a model with spin up starts at begin_calibration, only
+        simulates the evaluation window and starts with the cached volumes.
+        Other solver settings get their own spin up.
+
+        :return: None
+        """
+        model = GeneratorsTemplate.test_model_parametrization()
+        model.preallocate = True
+        model.collect_statistics = True
+        model.initial_volumes = model.get_spin_up_volumes()
+        cached_volumes = model.get_spin_up_volumes()
+        simulation = model.simulation(
+            [param[0] for param in model.parameters()])
+        days = (model.end_validation - model.begin_calibration).days + 1
+        model.solver_settings = dict(model.solver_settings, tolerance=1e-4)
+        coarse_volumes = model.get_spin_up_volumes()
+        print("\n test_spin_up")
+        print(model.last_run_statistics["simulated_days"], days)
+
+        # Without the spin up the run would start at the begin of the data
+        self.assertTrue(model.initial_volumes is cached_volumes
+                        and
+                        coarse_volumes is not cached_volumes
+                        and
+                        model.last_run_statistics["simulated_days"] == days
+                        and
+                        len(simulation) == days
+                        and
+                        not np.isnan(simulation).any())
+
+    def test_batched_model(self):
+        """
+        Tests if a batch of identical parameter sets gives the same
+        discharge in every cell as the lumped model and if parameter sets
+        with different snow thresholds can not be batched.
+
+        :return: None
+        """
+        lumped = GeneratorsTemplate.test_model_parametrization()
+        lumped.preallocate = True
+        vector = [param[0] for param in lumped.parameters()]
+        expected = np.array(lumped.simulation(vector))
+
+        batched = template.BatchedLumpedModelCMF(
+            lumped.genes, lumped.data,
+            lumped.begin_calibration, lumped.end_calibration,
+            lumped.begin_validation, lumped.end_validation, cells=3)
+        simulations = batched.simulation_batch([vector, vector])
+        print("\n test_batched_model")
+        print(simulations.shape)
+        names = [param.name for param in batched.params]
+        warmer = list(vector)
+        warmer[names.index("snow_melt_temp")] += 1.0
+        with self.assertRaises(ValueError):
+            batched.simulation_batch([vector, warmer])
+
+        self.assertTrue(simulations.shape == (2, len(expected))
+                        and
+                        np.allclose(simulations, expected, rtol=1e-4))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+import datetime
+import numpy as np
+import cmf
+import acme.cmf_model_generators.fidelity as fidelity
+
+
+class FidelityTests(unittest.TestCase):
+    def test_select_window(self):
+        """
+        Tests if the window of two years spans the wettest and the driest
+        year, if an earlier window with a smaller spread is taken if it
+        qualifies and if a window as long as the period is the period.
+
+        :return: None
+        """
+        begin = datetime.datetime(1980, 1, 1)
+        precipitation = cmf.timeseries(begin, cmf.day)
+        # 1982 is wet and 1983 is dry
+        for day in range(5 * 365 + 1):
+            year = (begin + datetime.timedelta(days=day)).year
+            precipitation.add({1982: 5.0, 1983: 0.5}.get(year, 2.0))
+        end = datetime.datetime(1984, 12, 31)
+        window = fidelity.select_window(precipitation, begin, end, 2)
+        earlier = fidelity.select_window(precipitation, begin, end, 2,
+                                         min_spread=0.5)
+        whole = fidelity.select_window(precipitation, begin, end, 5)
+        print("\n test_select_window")
+        print(window, earlier, whole)
+        self.assertTrue(window == (datetime.datetime(1982, 1, 1),
+                                   datetime.datetime(1983, 12, 31))
+                        and
+                        earlier == (datetime.datetime(1981, 1, 1),
+                                    datetime.datetime(1982, 12, 31))
+                        and
+                        whole == (begin, end))
+
+    def test_promotion(self):
+        """
+        Tests if every structure is promoted until enough structures are
+        known on both levels and afterwards only the promising ones, and if
+        the saved time accounts for the runtime on the level.
+
+        :return: None
+        """
+        levels = fidelity.FidelityLevels([(None, None)], min_pairs=5)
+        promoted = []
+        for number in range(5):
+            key = "structure {}".format(number)
+            promoted.append(levels.promote(key, 0, number / 10, 1.0))
+            levels.record(key, number / 10 + 0.2, 10.0)
+        bad = levels.promote("bad", 0, 0.0, 1.0)
+        good = levels.promote("good", 0, 0.5, 1.0)
+        print("\n test_promotion")
+        print(promoted, bad, good, levels.summary())
+        self.assertTrue(all(promoted)
+                        and
+                        not bad
+                        and
+                        good
+                        and
+                        np.isclose(levels.screened_fitness("bad"), 0.2)
+                        and
+                        levels.screened_fitness("good") is None
+                        and
+                        levels.summary()[0]["screened"] == 1
+                        and
+                        np.isclose(levels.summary()[0]["seconds"], 1.0)
+                        and
+                        np.isclose(levels.summary()[0]["saved"], 3.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+import os
+import sys
+import math
+import time
+import shutil
+import tempfile
+import subprocess
+from acme import file_queue
+
+
+class FileQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def start_workers(self, amount):
+        """
+        Starts worker processes on the queue, which stop when the engine is
+        done.
+
+        :param amount: amount of worker processes
+        :return: list of the processes
+        """
+        # The workers have to find acme, even if it is not installed
+        environment = dict(os.environ)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(
+            file_queue.__file__)))
+        environment["PYTHONPATH"] = os.pathsep.join(
+            [root, environment.get("PYTHONPATH", "")])
+        return [subprocess.Popen([sys.executable, "-m", "acme.file_queue",
+                                  self.directory, "--poll-interval", "0.05",
+                                  "--idle-exit", "60"], env=environment)
+                for _ in range(amount)]
+
+    def test_map(self):
+        """
+        Tests if several local worker processes work on the same directory,
+        the results keep their order and a failing job returns None.
+
+        :return: None
+        """
+        queue = file_queue.FileScheduler(self.directory, 2,
+                                         poll_interval=0.05)
+        workers = self.start_workers(2)
+        results = queue.map(abs, [-1, -2, -3, -4, -5],
+                            costs=[1, 5, 2, 4, 3])
+        failed = queue.map(math.sqrt, [4, -1])
+        report = queue.report()
+        queue.close()
+        for worker in workers:
+            worker.wait(60)
+        print("\n test_map")
+        print(results, failed, report)
+        self.assertTrue(results == [1, 2, 3, 4, 5]
+                        and
+                        failed == [2.0, None]
+                        and
+                        all(worker.returncode == 0 for worker in workers)
+                        and
+                        not os.listdir(os.path.join(self.directory,
+                                                    "pending")))
+
+    def test_stale_claim(self):
+        """
+        Tests if the job of a dead worker is put back to pending.
+
+        :return: None
+        """
+        queue = file_queue.FileScheduler(self.directory, 1, stale_after=1)
+        name = "000000_batch_000000.job"
+        file_queue.write_atomic(self.directory,
+                                queue.path("pending", name),
+                                (queue.generation, abs, -1, None))
+        claimed_name, path = file_queue.claim(self.directory, "dead-worker")
+        fresh = queue.requeue_stale("batch")
+        old = time.time() - 10
+        os.utime(path, (old, old))
+        stale = queue.requeue_stale("batch")
+        print("\n test_stale_claim")
+        print(fresh, stale)
+        self.assertTrue(claimed_name == name
+                        and
+                        fresh == []
+                        and
+                        stale == [name]
+                        and
+                        os.path.exists(queue.path("pending", name)))
+
+    def test_new_engine(self):
+        """
+        Tests if a new engine removes the files of the earlier one and if a
+        running worker reloads the setup for the jobs of the new engine.
+
+        :return: None
+        """
+        first = os.path.realpath(tempfile.mkdtemp(dir=self.directory))
+        second = os.path.realpath(tempfile.mkdtemp(dir=self.directory))
+        queue = file_queue.FileScheduler(self.directory, 1,
+                                         initializer=os.chdir,
+                                         initargs=(first,),
+                                         poll_interval=0.05)
+        workers = self.start_workers(1)
+        before = queue.map(os.path.abspath, ["."])
+        leftover = queue.path("results", "000000_earlier_000000.job")
+        file_queue.write_atomic(self.directory, leftover,
+                                {"result": None, "worker": "earlier",
+                                 "statistics": {}})
+        queue = file_queue.FileScheduler(self.directory, 1,
+                                         initializer=os.chdir,
+                                         initargs=(second,),
+                                         poll_interval=0.05)
+        removed = not os.path.exists(leftover)
+        after = queue.map(os.path.abspath, ["."])
+        queue.close()
+        for worker in workers:
+            worker.wait(60)
+        print("\n test_new_engine")
+        print(before, after, removed)
+        self.assertTrue(before == [first]
+                        and
+                        after == [second]
+                        and
+                        removed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -44,7 +44,31 @@ class GeneticTests(unittest.TestCase):
                             7, 6]
         self.solve(id_to_location_lookup, optimal_sequence)
 
-    def solve(self, id_to_location_lookup, optimal_sequence):
+    def test_8_queens_batched(self):
+        """
+        Tests if the engine still finds the solution, when the children of
+        a generation are evaluated together.
+
+        :return: None
+        """
+        id_to_location_lookup = {
+            'A': [4, 7],
+            'B': [2, 6],
+            'C': [0, 5],
+            'D': [1, 3],
+            'E': [3, 0],
+            'F': [5, 1],
+            'G': [7, 2],
+            'H': [6, 4]
+        }
+        optimal_sequence = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
+        batches = []
+        self.solve(id_to_location_lookup, optimal_sequence, batches)
+        print("\n test_8_queens_batched")
+        print(len(batches), max(batches))
+        self.assertTrue(max(batches) >= 25)
+
+    def solve(self, id_to_location_lookup, optimal_sequence, batches=None):
         gene_set = [i for i in id_to_location_lookup.keys()]
 
         def fn_create():
@@ -62,12 +86,19 @@ class GeneticTests(unittest.TestCase):
         def fn_crossover(parent, donor):
             return crossover(parent, donor, fn_get_fitness)
 
+        fn_get_fitnesses = None
+        if batches is not None:
+            def fn_get_fitnesses(genes_list):
+                batches.append(len(genes_list))
+                return [fn_get_fitness(genes) for genes in genes_list]
+
         optimal_fitness = fn_get_fitness(optimal_sequence)
         start_time = datetime.datetime.now()
         best = genetic.get_best(fn_get_fitness, None, optimal_fitness, None,
                                 fn_display, fn_mutate, fn_create,
                                 max_age=500, pool_size=25,
-                                crossover=fn_crossover, max_seconds=None)
+                                crossover=fn_crossover, max_seconds=None,
+                                get_fitnesses=fn_get_fitnesses)
         self.assertTrue(not optimal_fitness > best.fitness)
 
 
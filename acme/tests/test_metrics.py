@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+import numpy as np
+import spotpy
+import acme.cmf_model_generators.metrics as metrics
+import acme.cmf_model_generators.lookup as lookup
+
+
+class MetricsTests(unittest.TestCase):
+    evaluation = 2 + np.sin(np.linspace(0, 12, 200))
+    simulations = np.array([evaluation * 1.1, evaluation + 0.3,
+                            evaluation[::-1]])
+
+    def test_equal_to_spotpy(self):
+        """
+        Tests if the vectorized objective functions, alone and all at once,
+        give the same values as the ones of spotpy for every row.
+
+        :return: None
+        """
+        values = metrics.calculate(self.simulations, self.evaluation)
+        functions = {"nse": spotpy.objectivefunctions.nashsutcliffe,
+                     "log_nse": spotpy.objectivefunctions.lognashsutcliffe,
+                     "kge": spotpy.objectivefunctions.kge,
+                     "pbias": spotpy.objectivefunctions.pbias,
+                     "rmse": spotpy.objectivefunctions.rmse}
+        print("\n test_equal_to_spotpy")
+        for name, function in functions.items():
+            expected = [function(self.evaluation, simulation)
+                        for simulation in self.simulations]
+            print(name, values[name], expected)
+            single = lookup.get_metric(name)(self.simulations,
+                                             self.evaluation)
+            np.testing.assert_allclose(values[name], expected, atol=1e-12)
+            np.testing.assert_allclose(single, expected, atol=1e-12)
+
+    def test_lookup_objectives_only(self):
+        """
+        Tests if the lookup contains every objective function, but no
+        signature, as they are called with other arguments.
+
+        :return: None
+        """
+        for name in metrics.OBJECTIVES:
+            self.assertTrue(callable(lookup.get_metric(name)))
+        for name in metrics.SIGNATURES:
+            with self.assertRaises(NameError):
+                lookup.get_metric(name)
+
+    def test_missing_values(self):
+        """
+        Tests if missing observations are left out and failed simulations
+        get NaN.
+
+        :return: None
+        """
+        evaluation = self.evaluation.copy()
+        evaluation[10:20] = np.nan
+        simulations = self.simulations.copy()
+        simulations[2, 50] = np.nan
+        values = metrics.calculate(simulations, evaluation)
+        valid = ~np.isnan(evaluation)
+        expected = metrics.nash_sutcliffe(self.simulations[:2, valid],
+                                          self.evaluation[valid])
+        print("\n test_missing_values")
+        print(values["nse"], expected)
+        self.assertTrue(np.allclose(values["nse"][:2], expected)
+                        and
+                        all(np.isnan(values[name][2])
+                            for name in metrics.OBJECTIVES))
+
+    def test_signatures(self):
+        """
+        Tests the signatures with series of known properties.
+
+        :return: None
+        """
+        constant = np.full(100, 2.0)
+        flashy = np.where(np.arange(100) % 10 == 0, 20.0, 0.5)
+        values = metrics.calculate([constant, flashy], constant,
+                                   precipitation=np.full(100, 4.0))
+        print("\n test_signatures")
+        print(values["fdc_slope"], values["baseflow_index"],
+              values["runoff_ratio"])
+        self.assertTrue(values["fdc_slope"][0] == 0
+                        and
+                        values["baseflow_index"][0] == 1
+                        and
+                        values["baseflow_index"][1] < 0.5
+                        and
+                        values["runoff_ratio"][0] == 0.5)
+
+
+    def test_streaming(self):
+        """
+        Tests if the streamed objective functions of single simulations and
+        of several at once equal the ones of the whole series.
+
+        :return: None
+        """
+        evaluation = self.evaluation.copy()
+        evaluation[10:20] = np.nan
+        together = metrics.StreamingMetrics(len(self.simulations))
+        alone = [metrics.StreamingMetrics() for _ in self.simulations]
+        for t, observed in enumerate(evaluation):
+            together.update(self.simulations[:, t], observed)
+            for simulation, accumulator in zip(self.simulations, alone):
+                accumulator.update(simulation[t], observed)
+        expected = metrics.calculate(self.simulations, evaluation)
+        print("\n test_streaming")
+        print(together.results(), expected)
+        for name in metrics.OBJECTIVES:
+            np.testing.assert_allclose(together.results()[name],
+                                       expected[name], atol=1e-12)
+            np.testing.assert_allclose([accumulator.results()[name]
+                                        for accumulator in alone],
+                                       expected[name], atol=1e-12)
+
+    def test_rank_correlation(self):
+        """
+        Tests if the rank correlation only depends on the order of the
+        values.
+
+        :return: None
+        """
+        first = [0.1, 0.5, 0.3, 0.9]
+        same_order = [1.0, 20.0, 3.0, 400.0]
+        reversed_order = [4.0, 1.0, 2.0, 0.5]
+        print("\n test_rank_correlation")
+        self.assertTrue(np.isclose(metrics.rank_correlation(first,
+                                                            same_order), 1.0)
+                        and
+                        np.isclose(metrics.rank_correlation(first,
+                                                            reversed_order),
+                                   -1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
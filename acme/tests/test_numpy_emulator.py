@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+import datetime
+import numpy as np
+import utilities_for_tests as utils
+import acme.cmf_model_generators.numpy_emulator as numpy_emulator
+from acme.cmf_model_generators import create_lumped_CMF_model as generator
+
+
+def load_test_data():
+    """
+    Loads the data of the benchmark catchment.
+
+    :return: dictionary of all data needed for a run
+    """
+    precipitation, temperature_avg, temperature_min, \
+        temperature_max, discharge = utils.load_data(
+            "observed_discharge.txt",
+            "temperature_max_min_avg.txt",
+            "precipitation.txt",
+            2976.41
+        )
+    return {
+        "prec": precipitation,
+        "discharge": discharge,
+        "t_mean": temperature_avg,
+        "t_min": temperature_min,
+        "t_max": temperature_max
+    }
+
+
+DATES = [datetime.datetime(1980, 1, 1), datetime.datetime(1981, 12, 31),
+         datetime.datetime(1982, 1, 1), datetime.datetime(1983, 12, 31)]
+GENES = ["snow", "canopy", "second", "river", "tr_first_second",
+         "tr_first_out", "tr_second_river", "tr_river_out",
+         "beta_first_out", "snow_meltrate", "snow_melt_temp", "canopy_lai",
+         "canopy_closure"]
+
+
+class NumpyEmulatorTests(unittest.TestCase):
+    def test_simulate(self):
+        """
+        Tests if many parameter sets are emulated at once and every set
+        gives the same result as when it is emulated alone.
+
+        :return: None
+        """
+        emulator = numpy_emulator.NumpyEmulator(GENES, load_test_data(),
+                                                *DATES)
+        vectors = generator.latin_hypercube(emulator.params, 100,
+                                            np.random.RandomState(1))
+        simulations = emulator.simulate(vectors)
+        single = emulator.simulate(vectors[3])
+        days = (DATES[3] - DATES[0]).days + 1
+        print("\n test_simulate")
+        print(simulations.shape)
+        self.assertTrue(simulations.shape == (100, days)
+                        and
+                        np.all(simulations >= 0)
+                        and
+                        np.allclose(single[0], simulations[3]))
+
+    def test_agreement_report(self):
+        """
+        Compares the emulator with CMF on the benchmark catchment and
+        prints the agreement.
+
+        :return: None
+        """
+        emulator = numpy_emulator.NumpyEmulator(GENES, load_test_data(),
+                                                *DATES)
+        vectors = generator.latin_hypercube(emulator.params, 5,
+                                            np.random.RandomState(1))
+        report = numpy_emulator.agreement_report(GENES, load_test_data(),
+                                                 *DATES, vectors=vectors)
+        print("\n test_agreement_report")
+        print(report)
+        numpy_emulator.write_agreement_report(report, test=True)
+        self.assertTrue(len(report["agreement"]) == 5
+                        and
+                        report["emulator_seconds_per_run"] <
+                        report["cmf_seconds_per_run"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+import numpy as np
+import acme.cmf_model_generators.potential_et as potential_et
+import acme.cmf_model_generators.lookup as lookup
+
+
+class PotentialETTests(unittest.TestCase):
+    def test_extraterrestrial_radiation(self):
+        """
+        Tests the extraterrestrial radiation against example 8 of FAO-56
+        (3rd September, 20° S: 32.2 MJ/m²/day).
+
+        :return: None
+        """
+        ra = potential_et.extraterrestrial_radiation(np.array([246]), -20)
+        self.assertTrue(abs(ra[0] - 32.2) < 0.1)
+
+    def test_day_of_year(self):
+        """
+        Tests if the days of the year start again after new year.
+
+        :return: None
+        """
+        doy = potential_et.day_of_year(1979, 12, 30, 4)
+        self.assertTrue(list(doy) == [364, 365, 1, 2])
+
+    def test_all_methods(self):
+        """
+        Tests if all methods of the lookup give a non negative series with a
+        summer maximum for a year of synthetic temperatures.
+
+        :return: None
+        """
+        doy = potential_et.day_of_year(1980, 1, 1, 366)
+        t_mean = 8 - 10 * np.cos(2 * np.pi * doy / 366)
+        t_min = t_mean - 4
+        t_max = t_mean + 4
+        for method in ["Hargreave", "PenmanMonteith", "PriestleyTaylor",
+                       "Turc"]:
+            pet = potential_et.calculate(
+                lookup.get_potential_evapotranspiration(method), doy,
+                t_mean, t_min, t_max)
+            print("{}: {:.0f} mm/year".format(method, pet.sum()))
+            self.assertTrue(len(pet) == 366
+                            and
+                            (pet >= 0).all()
+                            and
+                            150 < np.argmax(pet) < 220)
+
+
+if __name__ == '__main__':
+    unittest.main()
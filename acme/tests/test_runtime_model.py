@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+import acme.cmf_model_generators.runtime_model as runtime_model
+
+
+class RuntimeModelTests(unittest.TestCase):
+    def test_prior_order(self):
+        """
+        Tests if a larger structure is predicted to take longer before any
+        runtime is measured.
+
+        :return: None
+        """
+        model = runtime_model.RuntimeModel()
+        small = ["tr_first_out"]
+        large = ["snow", "canopy", "second", "third", "river",
+                 "tr_first_second", "tr_second_third", "tr_third_river",
+                 "tr_river_out", "snow_meltrate", "canopy_lai"]
+        print("\n test_prior_order")
+        print(model.predict(small), model.predict(large))
+        self.assertTrue(model.predict(large) > model.predict(small))
+
+    def test_learns_from_runtimes(self):
+        """
+        Tests if measured structures are predicted with their runtime and
+        the fit carries over to similar structures.
+
+        :return: None
+        """
+        model = runtime_model.RuntimeModel(regularisation=0.01)
+        for _ in range(5):
+            model.record(["tr_first_out"], 2.0)
+            model.record(["snow", "tr_first_out"], 20.0)
+        similar = model.predict(["snow", "tr_first_out", "snow_meltrate"])
+        print("\n test_learns_from_runtimes")
+        print(model.predict(["snow", "tr_first_out"]), similar)
+        self.assertTrue(model.predict(["snow", "tr_first_out"]) == 20.0
+                        and
+                        similar > 10)
+
+    def test_features(self):
+        """
+        Tests if the connections are not counted as parameters as well.
+
+        :return: None
+        """
+        features = runtime_model.RuntimeModel.structure_features(
+            ["snow", "tr_first_out", "tr_first_river", "snow_meltrate",
+             "beta_first_out"])
+        print("\n test_features")
+        print(features)
+        self.assertTrue(list(features[-2:]) == [2.0, 2.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+import os
+import time
+import threading
+import queue
+from acme import scheduler
+from acme import mpi_scheduler
+
+
+def square(value):
+    return value ** 2, os.getpid()
+
+
+def fail_odd(value):
+    if value % 2:
+        raise ValueError("odd value {}".format(value))
+    return value
+
+
+class FakeComm:
+    """
+    Communicator of one rank with the interface of an mpi4py communicator,
+    the ranks are threads of this process sharing their mailboxes.
+    """
+    def __init__(self, rank, mailboxes, log):
+        self.rank = rank
+        self.mailboxes = mailboxes
+        self.log = log
+
+    def Get_rank(self):
+        return self.rank
+
+    def Get_size(self):
+        return len(self.mailboxes)
+
+    def send(self, message, dest, tag):
+        self.log.append((self.rank, dest, tag))
+        self.mailboxes[dest].put(message)
+
+    def recv(self, source, tag):
+        return self.mailboxes[self.rank].get(timeout=30)
+
+
+def fake_ranks(size, initializer=None, initargs=()):
+    """
+    Starts the evaluating ranks of a fake communicator in threads.
+
+    :return: scheduler of rank 0, threads of the other ranks, message log
+    """
+    mailboxes = [queue.Queue() for _ in range(size)]
+    log = []
+    threads = []
+    for rank in range(1, size):
+        ranks = mpi_scheduler.MPIScheduler(initializer, initargs,
+                                           FakeComm(rank, mailboxes, log))
+        threads.append(threading.Thread(target=ranks.serve))
+        threads[-1].start()
+    master = mpi_scheduler.MPIScheduler(initializer, initargs,
+                                        FakeComm(0, mailboxes, log))
+    return master, threads, log
+
+
+class SchedulerTests(unittest.TestCase):
+    def test_split_workers_many_tasks(self):
+        """
+        Tests if every task gets one worker, when there are more tasks than
+        workers.
+
+        :return: None
+        """
+        shares = scheduler.split_workers(3, [1, 5, 2, 4, 3])
+        print("\n test_split_workers_many_tasks")
+        print(shares)
+        self.assertEqual(shares, [1, 1, 1, 1, 1])
+
+    def test_split_workers_few_tasks(self):
+        """
+        Tests if the remaining workers go to the expensive tasks, but not
+        more than a task can use.
+
+        :return: None
+        """
+        shares = scheduler.split_workers(8, [1, 3])
+        limited = scheduler.split_workers(8, [1, 3], max_share=4)
+        print("\n test_split_workers_few_tasks")
+        print(shares, limited)
+        self.assertTrue(shares == [2, 6]
+                        and
+                        limited == [4, 4])
+
+    def test_map(self):
+        """
+        Tests if the jobs are run in separate processes and the results
+        keep their order.
+
+        :return: None
+        """
+        pool = scheduler.Scheduler(2)
+        results = pool.map(square, list(range(6)), costs=[1, 6, 2, 5, 3, 4])
+        pool.close()
+        print("\n test_map")
+        print(results)
+        self.assertTrue([result for result, pid in results] ==
+                        [0, 1, 4, 9, 16, 25]
+                        and
+                        all(pid != os.getpid() for result, pid in results))
+
+    def test_shared_map(self):
+        """
+        Tests if two threads can use the same scheduler at once and both get
+        their own results from the same worker processes. The pool has to
+        exist before the threads start.
+
+        :return: None
+        """
+        pool = scheduler.Scheduler(2, isolate=True, fork_server=True)
+        created = pool.pool is not None
+        results = {}
+
+        def run(offset):
+            results[offset] = pool.map(square, [offset + value
+                                                for value in range(4)])
+
+        threads = [threading.Thread(target=run, args=(offset,))
+                   for offset in [0, 10]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report = pool.report()
+        pool.close()
+        print("\n test_shared_map")
+        print(results, report)
+        self.assertTrue([result for result, pid in results[0]] ==
+                        [0, 1, 4, 9]
+                        and
+                        [result for result, pid in results[10]] ==
+                        [100, 121, 144, 169]
+                        and
+                        sum(entry["jobs"] for entry in report) == 8
+                        and
+                        len(report) == 2
+                        and
+                        created)
+
+    def test_fake_mpi_handshake(self):
+        """
+        Tests the messages between rank 0 and the evaluating ranks without
+        mpi4py: every evaluating rank runs the initializer, the jobs come back in
+        order and the evaluating ranks stop after close.
+
+        :return: None
+        """
+        setups = []
+        master, threads, log = fake_ranks(3, setups.append, ("data",))
+        results = master.map(square, list(range(5)), costs=[1, 5, 2, 4, 3])
+        report = master.report()
+        master.close()
+        for thread in threads:
+            thread.join(30)
+        jobs = [entry for entry in log if entry[2] == mpi_scheduler.JOB]
+        stops = [entry for entry in log if entry[2] == mpi_scheduler.STOP]
+        print("\n test_fake_mpi_handshake")
+        print(results, report, log)
+        self.assertTrue([result for result, pid in results] ==
+                        [0, 1, 4, 9, 16]
+                        and
+                        setups == ["data"] * 2
+                        and
+                        len(jobs) == 5 and all(entry[0] == 0 for entry in jobs)
+                        and
+                        sorted(entry[1] for entry in stops) == [1, 2]
+                        and
+                        sum(entry["jobs"] for entry in report) == 5
+                        and
+                        not any(thread.is_alive() for thread in threads))
+
+    def test_fake_mpi_errors(self):
+        """
+        Tests if failed jobs and a failed setup return None and are counted
+        as failed, while the other jobs still run.
+
+        :return: None
+        """
+        master, threads, log = fake_ranks(2)
+        results = master.map(fail_odd, list(range(4)))
+        failed = master.report()[0]["failed"]
+        master.close()
+
+        def broken_setup():
+            raise IOError("no data")
+        broken, broken_threads, log = fake_ranks(2, broken_setup)
+        broken_results = broken.map(square, [1, 2])
+        broken.close()
+        for thread in threads + broken_threads:
+            thread.join(30)
+        print("\n test_fake_mpi_errors")
+        print(results, broken_results)
+        self.assertTrue(results == [0, None, 2, None]
+                        and
+                        failed == 2
+                        and
+                        broken_results == [None, None])
+
+    @unittest.skipIf(mpi_scheduler.MPI is None, "mpi4py not installed")
+    def test_mpi_map(self):
+        """
+        Tests if the MPI ranks return the results in order. Run with e.g.
+        mpirun -n 3 python test_scheduler.py, a single rank has to be
+        refused.
+
+        :return: None
+        """
+        from mpi4py import MPI
+        if MPI.COMM_WORLD.Get_size() < 2:
+            with self.assertRaises(ValueError):
+                mpi_scheduler.MPIScheduler()
+            return
+        ranks = mpi_scheduler.MPIScheduler()
+        if not ranks.is_master:
+            ranks.serve()
+            return
+        results = ranks.map(square, list(range(6)), costs=[1, 6, 2, 5, 3, 4])
+        report = ranks.report()
+        ranks.close()
+        print("\n test_mpi_map")
+        print(results, report)
+        self.assertTrue([result for result, pid in results] ==
+                        [0, 1, 4, 9, 16, 25]
+                        and
+                        sum(entry["jobs"] for entry in report) == 6)
+
+    def test_single_flight(self):
+        """
+        Tests if concurrent requests for the same key are evaluated once and
+        the later ones are counted as coalesced.
+
+        :return: None
+        """
+        flight = scheduler.SingleFlight()
+        calls = []
+        results = []
+
+        def evaluate():
+            calls.append(1)
+            time.sleep(0.3)
+            return 42
+
+        def request():
+            results.append(flight.do("snow tr_first_out", evaluate))
+
+        threads = [threading.Thread(target=request) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print("\n test_single_flight")
+        print(calls, results, flight.coalesced)
+        self.assertTrue(len(calls) == 1
+                        and
+                        results == [42, 42, 42]
+                        and
+                        flight.coalesced == 2
+                        and
+                        not flight.in_flight)
+
+
+if __name__ == '__main__':
+    unittest.main()
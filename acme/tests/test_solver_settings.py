@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+import datetime
+import time
+import cmf
+import numpy as np
+import acme.cmf_model_generators.solver_settings as solver_settings
+
+
+class FakeParameter:
+    def __init__(self, name, optguess):
+        self.name = name
+        self.optguess = optguess
+
+
+class FakeModel:
+    """
+    Stands in for a LumpedModelCMF in the solver selection. Trials with the
+    tolerance of the final tier are slower than the others.
+    """
+    def __init__(self, hanging=()):
+        """
+        :param hanging: LinearSolvers whose trial exceeds the timeout
+        """
+        self.hanging = hanging
+        self.params = [FakeParameter("tr_first_out", 10.0)]
+        self.begin_calibration = datetime.datetime(1980, 1, 1)
+        self.solver_settings = None
+        self.volumes = [1.0]
+        self.parameters = None
+
+    def setparameters(self, param_dict):
+        self.parameters = param_dict
+
+    def get_volumes(self):
+        return list(self.volumes)
+
+    def set_volumes(self, volumes):
+        self.volumes = volumes
+
+    def run_model(self, verbose=False, end=None):
+        linear_solver = self.solver_settings["LinearSolver"]
+        if linear_solver in self.hanging:
+            raise KeyboardInterrupt
+        if self.solver_settings["tolerance"] == 1e-8:
+            time.sleep(0.05)
+        self.volumes = [0.0]
+        return np.linspace(1, 2, 10)
+
+
+class SolverSettingsTests(unittest.TestCase):
+    def test_tiers_get_finer(self):
+        """
+        Tests if the tolerance gets tighter from screening to final.
+
+        :return: None
+        """
+        tolerances = [solver_settings.get_solver_settings(tier)["tolerance"]
+                      for tier in ["screening", "calibration", "final"]]
+        self.assertTrue(tolerances == sorted(tolerances, reverse=True))
+
+    def test_settings_are_copies(self):
+        """
+        Tests if changing the returned settings leaves the tiers untouched.
+
+        :return: None
+        """
+        settings = solver_settings.get_solver_settings("final")
+        settings["tolerance"] = 1
+        self.assertTrue(solver_settings.TIERS["final"]["tolerance"] == 1e-8)
+
+    def test_unknown_tier(self):
+        """
+        Tests if an unknown tier raises a NameError like the lookup does.
+
+        :return: None
+        """
+        with self.assertRaises(NameError):
+            solver_settings.get_solver_settings("coarse")
+
+    def test_create_solver(self):
+        """
+        Tests if the solver gets the tolerance, linear solver and maximal
+        step of the settings and keeps the defaults of CMF for None.
+
+        :return: None
+        """
+        project = cmf.project()
+        cell = project.NewCell(0, 0, 0, 1000)
+        cell.add_storage("Soil", "S")
+        default = cmf.CVodeIntegrator(project, 1e-6)
+        solver = solver_settings.create_solver(
+            project, {"tolerance": 1e-6, "LinearSolver": 1, "max_step": 24})
+        unchanged = solver_settings.create_solver(
+            project, solver_settings.get_solver_settings("screening"))
+        self.assertTrue(solver.LinearSolver == 1
+                        and
+                        solver.max_step == cmf.h * 24
+                        and
+                        unchanged.LinearSolver == default.LinearSolver
+                        and
+                        unchanged.max_step == default.max_step)
+
+    def test_select_solver(self):
+        """
+        Tests if the trials leave the model as they found it and a trial
+        exceeding the timeout is skipped.
+
+        :return: None
+        """
+        model = FakeModel(hanging=[0])
+        settings = solver_settings.select_solver(model, "screening")
+        print("\n test_select_solver")
+        print(settings)
+        self.assertTrue(settings["tolerance"] == 1e-4
+                        and
+                        settings["LinearSolver"] != 0
+                        and
+                        model.volumes == [1.0]
+                        and
+                        model.solver_settings is None
+                        and
+                        model.parameters == {"tr_first_out": 10.0})
+
+    def test_select_solver_reference_timeout(self):
+        """
+        Tests if the final settings are returned, when the reference trial
+        exceeds the timeout.
+
+        :return: None
+        """
+        model = FakeModel(hanging=[None])
+        settings = solver_settings.select_solver(model, "screening")
+        self.assertTrue(settings ==
+                        solver_settings.get_solver_settings("final"))
+
+
+if __name__ == '__main__':
+    unittest.main()
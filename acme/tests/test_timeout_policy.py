@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+from acme.cmf_model_generators.timeout_policy import TimeoutPolicy
+
+
+class TimeoutPolicyTests(unittest.TestCase):
+    def test_default_timeout(self):
+        """
+        Tests if the default is used as long as no runtime is known.
+
+        :return: None
+        """
+        policy = TimeoutPolicy(default=60)
+        print("\n test_default_timeout")
+        self.assertEqual(policy.timeout(["tr_first_out"]), 60)
+
+    def test_own_runtimes(self):
+        """
+        Tests if a structure with enough runs gets the quantile of its own
+        runtimes times the safety factor, within the limits.
+
+        :return: None
+        """
+        policy = TimeoutPolicy(quantile=1.0, safety_factor=2.0, min_runs=3,
+                               minimum=1, maximum=100)
+        policy.record(["tr_first_out"], [2.0, 3.0, 4.0])
+        policy.record(["snow", "tr_first_out"], [80.0, 90.0, 100.0])
+        print("\n test_own_runtimes")
+        print(policy.timeout(["tr_first_out"]),
+              policy.timeout(["snow", "tr_first_out"]))
+        self.assertTrue(policy.timeout(["tr_first_out"]) == 8.0
+                        and
+                        policy.timeout(["snow", "tr_first_out"]) == 100)
+
+    def test_similar_structures(self):
+        """
+        Tests if a structure without runs gets a timeout from similar
+        structures instead of the default.
+
+        :return: None
+        """
+        policy = TimeoutPolicy(default=60, minimum=0.1)
+        policy.record(["tr_first_out"], [0.5] * 10)
+        timeout = policy.timeout(["tr_first_out", "beta_first_out"])
+        print("\n test_similar_structures")
+        print(timeout)
+        self.assertTrue(0.1 <= timeout < 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
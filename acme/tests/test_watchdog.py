@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+import os
+import time
+import threading
+from acme.watchdog import WatchdogWorker, SupervisedPool, ForkServer
+
+
+def create_sleeper():
+    """
+    Factory for the worker. Returns a function which sleeps for the given
+    time and returns it afterwards.
+    """
+    def sleep(seconds):
+        time.sleep(seconds)
+        return seconds
+    return sleep
+
+
+def create_crasher():
+    """
+    Factory for the worker. Returns a function which kills its own process,
+    like a segmentation fault would.
+    """
+    def crash():
+        os._exit(1)
+    return crash
+
+
+def crash_or_return(value):
+    """
+    Job of the pool tests. Kills its process for a negative value.
+    """
+    if value < 0:
+        os._exit(1)
+    return value
+
+
+def slow_initializer(seconds):
+    """
+    Initializer of the pool tests, which takes as long as loading the
+    modules and data of a real worker.
+    """
+    time.sleep(seconds)
+
+
+class WatchdogTests(unittest.TestCase):
+    def test_result(self):
+        """
+        Tests if the result of a call in time is returned.
+
+        :return: None
+        """
+        worker = WatchdogWorker(create_sleeper, timeout=5)
+        result = worker.call(0.01)
+        worker.close()
+        self.assertTrue(result == 0.01 and worker.timeouts == 0)
+
+    def test_timeout(self):
+        """
+        Tests if a call that takes too long returns the fallback, the worker
+        is replaced and the next call works again.
+
+        :return: None
+        """
+        worker = WatchdogWorker(create_sleeper, timeout=5)
+        result = worker.call(10, timeout=0.2, fallback="timeout")
+        next_result = worker.call(0.01)
+        worker.close()
+        print("\n test_timeout")
+        print("Timeouts: {}\tRestarts: {}".format(worker.timeouts,
+                                                  worker.restarts))
+        self.assertTrue(result == "timeout"
+                        and
+                        next_result == 0.01
+                        and
+                        worker.timeouts == 1
+                        and
+                        worker.restarts == 1)
+
+    def test_crash(self):
+        """
+        Tests if a crashing worker leads to the fallback.
+
+        :return: None
+        """
+        worker = WatchdogWorker(create_crasher, timeout=5)
+        result = worker.call(fallback="crashed")
+        worker.close()
+        self.assertTrue(result == "crashed" and worker.crashes == 1)
+
+    def test_supervised_pool(self):
+        """
+        Tests if a crashing job only fails itself, the pool goes on and the
+        workers are recycled after the given amount of jobs.
+
+        :return: None
+        """
+        pool = SupervisedPool(2, max_jobs=2)
+        results = pool.map(crash_or_return, [1, -1, 2, 3, 4])
+        report = pool.report()
+        pool.close()
+        print("\n test_supervised_pool")
+        print(report)
+        self.assertTrue(results == [1, None, 2, 3, 4]
+                        and
+                        sum(entry["crashes"] for entry in report) == 1
+                        and
+                        sum(entry["jobs"] for entry in report) == 5
+                        and
+                        sum(entry["recycled"] for entry in report) >= 1)
+
+    def test_unpicklable_job(self):
+        """
+        Tests if a job that cannot be sent to the worker fails on its own
+        instead of blocking map, and the pool goes on.
+
+        :return: None
+        """
+        pool = SupervisedPool(1)
+        results = pool.map(crash_or_return, [threading.Lock()])
+        after = pool.map(crash_or_return, [5])
+        pool.close()
+        print("\n test_unpicklable_job")
+        print(results, after)
+        self.assertTrue(results == [None]
+                        and
+                        after == [5])
+
+    @unittest.skipUnless(ForkServer.available(), "os.fork not available")
+    def test_fork_server(self):
+        """
+        Tests if workers started from a fork server do not repeat the
+        initialization and a crashed worker is replaced by a new fork.
+
+        :return: None
+        """
+        pool = SupervisedPool(2, initializer=slow_initializer,
+                              initargs=(0.5,), fork_server=True,
+                              preload=["numpy"])
+        results = pool.map(crash_or_return, [1, -1, 2, 3])
+        report = pool.report()
+        pool.close()
+        print("\n test_fork_server")
+        print(report)
+        self.assertTrue(results == [1, None, 2, 3]
+                        and
+                        report[0]["server_startup"] >= 0.5
+                        and
+                        max(entry["startup"] for entry in report) < 0.5
+                        and
+                        sum(entry["restarts"] for entry in report) == 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
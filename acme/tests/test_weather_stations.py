@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+"""
+import unittest
+import datetime
+import utilities_for_tests as utils
+import acme.cmf_model_generators.weather_stations_cmf as weather_stations
+
+
+class WeatherStationsTests(unittest.TestCase):
+    def test_forcing_cache(self):
+        """
+        Tests if the forcing is clipped to the simulation window, only
+        prepared once for the same catchment and only removed from the cache
+        for its own catchment.
+
+        :return: None
+        """
+        precipitation, temperature_avg, temperature_min, \
+            temperature_max, discharge = utils.load_data(
+                "observed_discharge.txt",
+                "temperature_max_min_avg.txt",
+                "precipitation.txt",
+                2976.41
+            )
+        data = {
+            "prec": precipitation,
+            "discharge": discharge,
+            "t_mean": temperature_avg,
+            "t_min": temperature_min,
+            "t_max": temperature_max
+        }
+        end = datetime.datetime(1983, 12, 31)
+        first = weather_stations.get_forcing(data, end)
+        weather_stations.clear_forcing_cache(dict(data))
+        second = weather_stations.get_forcing(data, end)
+        weather_stations.clear_forcing_cache(data)
+        third = weather_stations.get_forcing(data, end)
+        weather_stations.clear_forcing_cache()
+
+        # 1979 to 1983 and two extra days
+        days = (end - datetime.datetime(1979, 1, 1)).days + 2
+        print("\n test_forcing_cache")
+        print("Length: {}\tExpected: {}".format(len(first["prec"]), days))
+        self.assertTrue(first is second
+                        and
+                        third is not first
+                        and
+                        len(first["prec"]) == days
+                        and
+                        len(first["prec"]) < len(precipitation))
+
+    def test_potential_et_forcing(self):
+        """
+        Tests if the precalculated potential evapotranspiration is as long
+        as the temperature forcing and starts on the same day.
+
+        :return: None
+        """
+        precipitation, temperature_avg, temperature_min, \
+            temperature_max, discharge = utils.load_data(
+                "observed_discharge.txt",
+                "temperature_max_min_avg.txt",
+                "precipitation.txt",
+                2976.41
+            )
+        data = {
+            "prec": precipitation,
+            "discharge": discharge,
+            "t_mean": temperature_avg,
+            "t_min": temperature_min,
+            "t_max": temperature_max
+        }
+        forcing = weather_stations.get_forcing(
+            data, datetime.datetime(1983, 12, 31), "Hargreave")
+        weather_stations.clear_forcing_cache()
+        self.assertTrue(len(forcing["pet"]) == len(forcing["t_mean"])
+                        and
+                        forcing["pet"].begin == forcing["t_mean"].begin
+                        and
+                        min(forcing["pet"]) >= 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,574 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Oct 19 2026
+@author(s): agent
+
+Runs a function in a separate worker process and watches it. Contrary to
+exit_after this works from every thread, does not interrupt unrelated code
+and is also able to stop calls that block inside of C++ (e.g. CMF). A worker
+that takes too long or crashes is killed and replaced by a new one.
+
+SupervisedPool runs many jobs in several such workers.
+
+ForkServer is a small process, which imports the needed modules and loads
+the data once and then forks the workers on request. New workers (also
+those replacing crashed or recycled ones) therefore start in milliseconds,
+do not inherit the memory the main process collects during the search and
+are never forked from a process with running threads.
+"""
+import os
+import sys
+import time
+import signal
+import functools
+import importlib
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import multiprocessing.reduction
+import queue
+import threading
+from concurrent.futures import Future
+
+
+def get_context():
+    """
+    Returns the multiprocessing context for the workers. Fork is preferred,
+    as the worker then inherits everything from the parent and nothing has
+    to be pickled.
+
+    :return: multiprocessing context
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def _serve(connection, factory):
+    """
+    Main loop of the worker process. Creates the function with the factory
+    once and calls it for every arguments tuple received.
+
+    :param connection: Connection to the parent process
+    :param factory: Callable without arguments, which returns the function
+    :return: None
+    """
+    function = factory()
+    # Tells the parent that the worker is ready
+    connection.send(("ready", None))
+    while True:
+        try:
+            args = connection.recv()
+        except EOFError:
+            break
+        # None is the signal to stop
+        if args is None:
+            break
+        try:
+            connection.send(("ok", function(*args)))
+        except Exception as error:
+            # Not all exceptions can be pickled, so only the message is sent
+            connection.send(("error", "{}: {}".format(type(error).__name__,
+                                                      error)))
+    connection.close()
+
+
+class ForkedProcess:
+    """
+    A worker process forked by a ForkServer. Offers the parts of the
+    interface of multiprocessing.Process, which the WatchdogWorker uses.
+    """
+    def __init__(self, pid):
+        self.pid = pid
+
+    def is_alive(self):
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def terminate(self):
+        self._signal(signal.SIGTERM)
+
+    def kill(self):
+        self._signal(signal.SIGKILL)
+
+    def join(self, timeout=None):
+        start_time = time.time()
+        while self.is_alive():
+            if timeout is not None and time.time() - start_time > timeout:
+                return
+            time.sleep(0.005)
+
+    def _signal(self, signal_number):
+        try:
+            os.kill(self.pid, signal_number)
+        except ProcessLookupError:
+            pass
+
+
+def _run_fork_server(connection, preload, initializer, initargs):
+    """
+    Main loop of the fork server. Forks a worker for every factory received
+    and sends back its process id and its end of the pipe.
+
+    :param connection: Connection to the parent process
+    :param preload: names of the modules to import
+    :param initializer: called once with initargs, before any worker is
+    forked
+    :param initargs: arguments of initializer
+    :return: None
+    """
+    # The workers are reaped automatically, as only the parent watches them
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    for module in preload:
+        importlib.import_module(module)
+    if initializer is not None:
+        initializer(*initargs)
+    connection.send("ready")
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        factory, parent_pid = request
+        parent_end, child_end = multiprocessing.Pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Worker
+            exit_code = 0
+            try:
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                connection.close()
+                parent_end.close()
+                _serve(child_end, factory)
+            except BaseException:
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        child_end.close()
+        connection.send(pid)
+        multiprocessing.reduction.send_handle(connection,
+                                              parent_end.fileno(),
+                                              parent_pid)
+        parent_end.close()
+    connection.close()
+
+
+class ForkServer:
+    """
+    A process, which forks new workers with everything already imported and
+    initialized. Only available where os.fork exists.
+    """
+    def __init__(self, preload=(), initializer=None, initargs=()):
+        """
+        :param preload: names of the modules to import in the server
+        :param initializer: called once in the server with initargs, e.g. to
+        load the data. With the fork start method initargs do not need to
+        be picklable.
+        :param initargs: arguments of initializer
+        """
+        context = multiprocessing.get_context("fork")
+        self.connection, server_connection = context.Pipe()
+        self.process = context.Process(target=_run_fork_server,
+                                       args=(server_connection,
+                                             list(preload), initializer,
+                                             initargs),
+                                       daemon=True)
+        start_time = time.time()
+        self.process.start()
+        server_connection.close()
+        try:
+            self.connection.recv()
+        except EOFError:
+            raise RuntimeError("Fork server failed to start")
+        # Time the server needed to import and initialize everything, which
+        # the workers forked from it save
+        self.startup_time = time.time() - start_time
+        # Several threads may start workers at once
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        return hasattr(os, "fork") and \
+            "fork" in multiprocessing.get_all_start_methods()
+
+    def fork(self, factory):
+        """
+        Forks a new worker, which serves the function created by factory.
+
+        :param factory: picklable callable without arguments
+        :return: ForkedProcess and the connection to the worker
+        """
+        with self.lock:
+            try:
+                self.connection.send((factory, os.getpid()))
+                pid = self.connection.recv()
+                handle = multiprocessing.reduction.recv_handle(
+                    self.connection)
+            except (EOFError, BrokenPipeError, ConnectionResetError):
+                raise RuntimeError("Fork server is not running")
+        return (ForkedProcess(pid),
+                multiprocessing.connection.Connection(handle))
+
+    def close(self):
+        """
+        Stops the server. Workers already forked keep running.
+
+        :return: None
+        """
+        try:
+            self.connection.send(None)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.connection.close()
+
+
+class WatchdogWorker:
+    """
+    A single worker process, which calls a function with a timeout.
+
+    The function is created inside of the worker by factory, so it can hold
+    objects which cannot be send between processes (e.g. a CMF project).
+    """
+    def __init__(self, factory, timeout=60, fork_server=None):
+        """
+        :param factory: Callable without arguments, which returns the
+        function to call in the worker
+        :param timeout: Default timeout in seconds. None means no timeout.
+        :param fork_server: ForkServer to start the worker process from. The
+        factory then has to be picklable. None forks this process.
+        """
+        self.factory = factory
+        self.timeout = timeout
+        self.fork_server = fork_server
+        self.process = None
+        self.connection = None
+        # Counters
+        self.timeouts = 0
+        self.crashes = 0
+        self.restarts = 0
+        # Seconds until every started worker process was ready
+        self.startup_times = []
+
+    def start(self):
+        """
+        Starts the worker process and waits until it is ready.
+
+        :return: None
+        """
+        start_time = time.time()
+        if self.fork_server is not None:
+            self.process, self.connection = self.fork_server.fork(
+                self.factory)
+        else:
+            context = get_context()
+            self.connection, child_connection = context.Pipe()
+            self.process = context.Process(target=_serve,
+                                           args=(child_connection,
+                                                 self.factory),
+                                           daemon=True)
+            self.process.start()
+            child_connection.close()
+        try:
+            self.connection.recv()
+        except (EOFError, ConnectionResetError):
+            self.kill()
+            raise RuntimeError("Worker failed to start")
+        self.startup_times.append(time.time() - start_time)
+
+    def kill(self):
+        """
+        Kills the worker process without waiting for it to finish.
+
+        :return: None
+        """
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+            self.connection.close()
+        self.process = None
+        self.connection = None
+
+    def restart(self):
+        """
+        Replaces the worker process with a new one.
+
+        :return: None
+        """
+        self.kill()
+        self.restarts += 1
+        self.start()
+
+    def call(self, *args, timeout=None, fallback=None):
+        """
+        Calls the function in the worker process.
+
+        :param args: Arguments for the function
+        :param timeout: Timeout in seconds for this call. If None the
+        default timeout of the worker is used.
+        :param fallback: Value returned if the call timed out or the worker
+        crashed
+        :return: Return value of the function or fallback
+        """
+        if timeout is None:
+            timeout = self.timeout
+        if self.process is None:
+            self.start()
+        elif not self.process.is_alive():
+            self.restart()
+
+        try:
+            self.connection.send(args)
+            if self.connection.poll(timeout):
+                status, result = self.connection.recv()
+                if status == "error":
+                    raise RuntimeError(result)
+                return result
+            self.timeouts += 1
+            print('Worker took longer than {} s'.format(timeout),
+                  file=sys.stderr)
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            self.crashes += 1
+            print('Worker crashed', file=sys.stderr)
+        sys.stderr.flush()
+        self.restart()
+        return fallback
+
+    def close(self):
+        """
+        Stops the worker process.
+
+        :return: None
+        """
+        if self.process is None:
+            return
+        try:
+            self.connection.send(None)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.process.join(1)
+        self.kill()
+
+
+def get_rss(pid):
+    """
+    Returns the resident set size (memory in RAM) of a process. Only works
+    where /proc exists (Linux).
+
+    :param pid: process id
+    :return: resident set size in bytes or NaN if unknown
+    """
+    try:
+        with open("/proc/{}/status".format(pid)) as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return float(line.split()[1]) * 1024
+    except (IOError, OSError, ValueError):
+        pass
+    return float("nan")
+
+
+def _call_function(function, argument):
+    """
+    Called in the workers of a SupervisedPool for every job.
+    """
+    return function(argument)
+
+
+def _create_caller(initializer, initargs):
+    """
+    Factory of the workers of a SupervisedPool. Runs the initializer once in
+    the new worker process.
+    """
+    if initializer is not None:
+        initializer(*initargs)
+    return _call_function
+
+
+class SupervisedPool:
+    """
+    A pool of watched worker processes. A worker that crashes, hangs or
+    raises an error only fails its current job, it is then replaced and the
+    pool goes on. Workers are also replaced (recycled) after a given amount
+    of jobs or when their memory exceeds a watermark, so leaks of long runs
+    do not add up.
+    """
+    def __init__(self, workers, initializer=None, initargs=(),
+                 max_jobs=None, max_rss=None, fork_server=False, preload=()):
+        """
+        :param workers: amount of worker processes
+        :param initializer: called once in every new worker process with
+        initargs. With a fork server it is only called once in the server.
+        :param initargs: arguments of initializer
+        :param max_jobs: a worker is recycled after this many jobs. None
+        means never.
+        :param max_rss: a worker is recycled when its resident set size
+        exceeds this many bytes after a job. None means never.
+        :param fork_server: Start the workers from a ForkServer, if the
+        platform allows it
+        :param preload: names of the modules the fork server imports
+        """
+        self.fork_server = None
+        if fork_server and ForkServer.available():
+            self.fork_server = ForkServer(preload, initializer, initargs)
+            factory = functools.partial(_create_caller, None, ())
+        else:
+            factory = functools.partial(_create_caller, initializer,
+                                        initargs)
+        self.workers = [WatchdogWorker(factory, None, self.fork_server)
+                        for _ in range(workers)]
+        self.max_jobs = max_jobs
+        self.max_rss = max_rss
+        # Counters of every worker
+        self.statistics = [{"jobs": 0, "jobs_since_start": 0, "failed": 0,
+                            "recycled": 0, "rss": float("nan"),
+                            "peak_rss": float("nan")}
+                           for _ in range(workers)]
+        # Jobs of all callers of map, ordered by their priority. The
+        # threads handing them to the workers start with the first map.
+        self.jobs = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.threads = None
+        self.lock = threading.Lock()
+
+    def _work(self, number):
+        """
+        Loop of the thread that hands the jobs to one worker.
+        """
+        worker = self.workers[number]
+        statistics = self.statistics[number]
+        while True:
+            priority, _, job = self.jobs.get()
+            # None is the signal to stop
+            if job is None:
+                return
+            future, function, argument, timeout = job
+            try:
+                result = worker.call(function, argument, timeout=timeout)
+            except Exception as error:
+                # Raised in the worker, while sending the job (e.g. it
+                # cannot be pickled) or while starting the worker. The job
+                # fails, but the thread has to go on.
+                print('Job failed in worker: {}: {}'.format(
+                    type(error).__name__, error), file=sys.stderr)
+                if isinstance(error, OSError):
+                    # The connection is broken, the next job starts a new
+                    # worker
+                    worker.kill()
+                result = None
+            future.set_result(result)
+            if result is None:
+                statistics["failed"] += 1
+            statistics["jobs"] += 1
+            statistics["jobs_since_start"] += 1
+            if worker.process is not None and worker.process.is_alive():
+                rss = get_rss(worker.process.pid)
+                statistics["rss"] = rss
+                if not statistics["peak_rss"] >= rss:
+                    statistics["peak_rss"] = rss
+                if ((self.max_jobs is not None and
+                     statistics["jobs_since_start"] >= self.max_jobs) or
+                        (self.max_rss is not None and rss > self.max_rss)):
+                    try:
+                        worker.restart()
+                    except Exception as error:
+                        # The next job starts the worker again
+                        print('Recycling the worker failed: {}: {}'.format(
+                            type(error).__name__, error), file=sys.stderr)
+                        worker.kill()
+                    statistics["recycled"] += 1
+                    statistics["jobs_since_start"] = 0
+            else:
+                statistics["jobs_since_start"] = 0
+
+    def map(self, function, arguments, timeouts=None, priorities=None):
+        """
+        Runs function for all arguments in the workers. Every free worker
+        takes the job with the lowest priority value, jobs with the same
+        priority in the order they were added. Several threads may call map
+        at the same time, their jobs then share the workers.
+
+        :param function: module level function with one argument
+        :param arguments: list of arguments
+        :param timeouts: list of timeouts in seconds for every job. None
+        means no timeout.
+        :param priorities: list of the priorities of the jobs, e.g. the
+        negative expected cost. None hands the jobs out in their order.
+        :return: list of the results in the order of arguments. Failed jobs
+        return None.
+        """
+        if timeouts is None:
+            timeouts = [None] * len(arguments)
+        if priorities is None:
+            priorities = [0] * len(arguments)
+        with self.lock:
+            if self.threads is None:
+                self.threads = [threading.Thread(target=self._work,
+                                                 args=(number,),
+                                                 daemon=True)
+                                for number in range(len(self.workers))]
+                for thread in self.threads:
+                    thread.start()
+        futures = []
+        for argument, timeout, priority in zip(arguments, timeouts,
+                                               priorities):
+            future = Future()
+            self.jobs.put((priority, next(self.sequence),
+                           (future, function, argument, timeout)))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def report(self):
+        """
+        Returns the counters of every worker.
+
+        :return: list of dictionaries with the amount of jobs, failed jobs,
+        recycles, restarts after timeouts or crashes, the last and peak
+        resident set size in bytes, the mean startup time of the worker
+        processes and the startup time of the fork server (NaN without)
+        """
+        report = []
+        for worker, statistics in zip(self.workers, self.statistics):
+            entry = dict(statistics)
+            del entry["jobs_since_start"]
+            entry["timeouts"] = worker.timeouts
+            entry["crashes"] = worker.crashes
+            entry["restarts"] = worker.restarts
+            entry["startup"] = (sum(worker.startup_times) /
+                                len(worker.startup_times)
+                                if worker.startup_times else float("nan"))
+            entry["server_startup"] = (self.fork_server.startup_time
+                                       if self.fork_server is not None
+                                       else float("nan"))
+            report.append(entry)
+        return report
+
+    def close(self):
+        """
+        Stops all workers.
+
+        :return: None
+        """
+        if self.threads is not None:
+            for _ in self.threads:
+                self.jobs.put((float("inf"), next(self.sequence), None))
+            for thread in self.threads:
+                thread.join()
+            self.threads = None
+        for worker in self.workers:
+            worker.close()
+        if self.fork_server is not None:
+            self.fork_server.close()
@@ -34,6 +34,8 @@ setup(
   packages=["acme", "acme.examples", "acme.genetics",
             "acme.cmf_model_generators", "acme.visualization", "acme.tests"],
   include_package_data=True,
+  entry_points={
+      'console_scripts': ['acme-worker=acme.file_queue:main']},
   zip_save=False,
   keywords=['Evolution', 'lumped models', 'Genetic Algorithms', 'Hydrology',
             'Simulated Annealing', 'CMF', 'ROPE', 'Uncertainty',